@@ -6,13 +6,35 @@ Mistral AIを使った大富豪のAIプレイヤー
 import json
 import random
 import re
+import threading
 from typing import List, Optional, Dict, Tuple
 
 import os
-from mistralai import Mistral
 
 from models import Card, AIPersonality, CharacterType, PlayerStats, SkillType
 from game_logic import DaifugoGame
+from move_gate import MoveGate, best_heuristic_move, heuristic_confidence, score_moves
+from move_policy import get_decision_log, load_policy, move_features
+from model_router import LOCAL, ModelRouter
+from llm_metrics import REGISTRY, track_call
+from client_registry import get_registry
+from llm_scheduler import RequestShed, default_scheduler
+from chat_memory import ConversationWindow
+from contest_table import (
+    CHEAT_APPROACHES, CHEAT_CONFIDENCES, CHEAT_METHODS, COUNTER_LIBRARY, format_cheat_prompt,
+    parse_cheat_prompt,
+)
+from personality_pool import personality_from_data, validate_personality_data
+from llm_guard import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, HEDGE_AFTER, deadline_for,
+    run_with_deadline,
+)
+from single_flight import get_single_flight, request_fingerprint
+from prompt_builder import (
+    build_move_prompt, build_move_hints, build_personality_prompt,
+    build_chat_system_prompt, build_chat_user_message, build_observation_prompt,
+    build_counter_prompt, build_contest_prompt, build_chat_context, build_summary_prompt,
+)
 
 
 _DEFAULT_PERSONALITIES = [
@@ -47,18 +69,155 @@ _DEFAULT_PERSONALITIES = [
         "backstory": "数学科卒。全ての手を計算してから動く。"
     },
 ]
+# チャット返答に失敗したときの返答（返答キャッシュには入れない）
+SILENT_REPLY = "...（無言）"
+
+# 実行中の同じリクエストに合流してよい呼び出し種別（同じズルへの判定は全員で共有してよい）。
+# それ以外はサンプリングした返答なので、temperature == 0 のときだけ合流する
+# （合流させると別セッションに同じ「ランダムな」返答や個性が配られる）
+COALESCED_CALL_TYPES = frozenset({"contest", "counter_measure"})
 
 
 class MistralAIPlayer:
     """Mistral AIを使ったプレイヤー"""
 
-    def __init__(self, api_key: Optional[str] = None):
-        if api_key is None:
-            api_key = os.getenv("MISTRAL_API_KEY")
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEYが設定されていません")
-        self.client = Mistral(api_key=api_key)
-        self.model = "mistral-small-latest"
+    def __init__(self, api_key: Optional[str] = None, hedge_moves: Optional[bool] = None,
+                 client=None, server_url: Optional[str] = None):
+        """
+        client を渡すとそれを使う（テスト・負荷試験用のモックなど）。
+        渡さなければプロセス共有のクライアントを API キーごとに使い回す。
+        server_url（未指定時は MISTRAL_SERVER_URL）で接続先を差し替えられる。
+        MISTRAL_MOCK=1 ならプロセス内モックを使う。
+        """
+        if client is None and os.getenv("MISTRAL_MOCK") == "1":
+            from mock_mistral import MockMistralClient
+            client = MockMistralClient.from_env()
+        self._client = client
+        self._api_key = None
+        self._server_url = None
+        if client is None:
+            if api_key is None:
+                api_key = os.getenv("MISTRAL_API_KEY")
+            if server_url is None:
+                server_url = os.getenv("MISTRAL_SERVER_URL") or None
+            if not api_key and server_url:
+                api_key = "local"  # ローカル代替サーバーはキーを検証しない
+            if not api_key:
+                raise ValueError("MISTRAL_API_KEYが設定されていません")
+            self._api_key = api_key
+            self._server_url = server_url
+            get_registry().acquire(api_key, server_url)  # 接続プールを先に用意
+        self.router = ModelRouter.from_env()
+        self.gate = MoveGate(policy=load_policy())
+        self.decision_log = get_decision_log()
+        self.metrics = REGISTRY
+        if self._client is None:
+            self.breaker = get_registry().breaker(self._api_key, self._server_url)
+            self.scheduler = get_registry().scheduler(self._api_key, self._server_url)
+        else:
+            self.breaker = CircuitBreaker()
+            self.scheduler = default_scheduler()
+        if hedge_moves is None:
+            hedge_moves = os.getenv("MISTRAL_HEDGE_MOVES", "") == "1"
+        self.hedge_moves = hedge_moves
+        self.flights = get_single_flight()
+
+    @property
+    def client(self):
+        """注入されたクライアント、なければプロセス共有のクライアント"""
+        if self._client is not None:
+            return self._client
+        return get_registry().acquire(self._api_key, self._server_url)
+
+    # -----------------------------------------------------------------------
+    # API 呼び出し（全メソッド共通）
+    # -----------------------------------------------------------------------
+
+    def _escalate(self, call_type: str, tier: str, reason: str) -> None:
+        """次の段に昇格したことを記録する（reason: parse_failure / low_confidence）"""
+        self.metrics.inc(call_type, "escalations")
+        self.router.record_escalation(tier, reason)
+
+    def _fingerprint(self, call_type: str, model: str, messages: List[Dict],
+                     temperature: float, max_tokens: int) -> str:
+        # 同じクライアント（＝同じ API キー・接続先）への同じ内容のリクエストだけを合流させる
+        return request_fingerprint(id(self.client), model, call_type,
+                                   messages, temperature, max_tokens)
+
+    def _complete(self, call_type: str, messages: List[Dict],
+                  temperature: float, max_tokens: int, hedge: bool = False,
+                  tier: Optional[str] = None) -> str:
+        """
+        chat.complete を計測付きで呼び、本文を返す。例外はそのまま送出する。
+        呼び出し種別ごとのデッドラインを超えると DeadlineExceeded、
+        ブレーカーが開いていれば CircuitOpenError、混雑で間引かれれば RequestShed
+        （いずれも呼び出し元でフォールバック）。
+        リクエストは優先度付きスケジューラ経由で API に送られる。
+        合流してよい種別（COALESCED_CALL_TYPES・temperature == 0）は、同じ内容のリクエストが
+        実行中なら API は呼ばずにその結果を共有する。
+        tier 未指定時は種別のルートで最初のリモート段のモデルを使う。
+        """
+        tier = tier or self.router.remote_ladder(call_type)[0]
+        if call_type not in COALESCED_CALL_TYPES and temperature != 0:
+            return self._complete_uncoalesced(call_type, tier, messages, temperature,
+                                              max_tokens, hedge)
+        key = self._fingerprint(call_type, self.router.model(tier), messages,
+                                temperature, max_tokens)
+        content, coalesced = self.flights.do(
+            key,
+            lambda: self._complete_uncoalesced(call_type, tier, messages, temperature,
+                                               max_tokens, hedge),
+            timeout=deadline_for(call_type)
+        )
+        if coalesced:
+            self.metrics.inc(call_type, "coalesced")
+        return content
+
+    def _complete_uncoalesced(self, call_type: str, tier: str, messages: List[Dict],
+                              temperature: float, max_tokens: int, hedge: bool) -> str:
+        if not self.breaker.allow():
+            self.metrics.inc(call_type, "short_circuits")
+            raise CircuitOpenError(f"{call_type}: circuit open")
+
+        # スケジューラの待ち行列を抜けて実際に送信したか（ローカルの混雑と API の失敗を分ける）
+        sent = threading.Event()
+
+        def call_api():
+            sent.set()
+            return self.client.chat.complete(
+                model=self.router.model(tier),
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+
+        with track_call(call_type, self.metrics) as call:
+            try:
+                response = run_with_deadline(
+                    call_api, deadline_for(call_type),
+                    hedge_after=HEDGE_AFTER.get(call_type) if hedge else None,
+                    submit=lambda fn: self.scheduler.submit(call_type, fn)
+                )
+            except RequestShed:
+                # 混雑による間引きは API の失敗ではない
+                self.breaker.release_probe()
+                raise
+            except DeadlineExceeded:
+                if not sent.is_set():
+                    # 待ち行列にいる間に時間切れ: 送信していないので API の失敗としては数えない
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                self.router.record(tier, call.elapsed(), error=True)
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                self.router.record(tier, call.elapsed(), error=True)
+                raise
+            self.breaker.record_success()
+            call.set_usage(response)
+            self.router.record(tier, call.elapsed(), call.prompt_tokens, call.completion_tokens)
+            return response.choices[0].message.content
 
     # -----------------------------------------------------------------------
     # 個性生成
@@ -66,89 +225,95 @@ class MistralAIPlayer:
 
     def generate_personality(self, player_name: str) -> AIPersonality:
         """Mistral にキャラクター設定をJSON生成させる。失敗時はフォールバック。"""
-        try:
-            prompt = f"""大富豪カードゲームのAIプレイヤー「{player_name}」のキャラクター設定を作ってください。
-
-以下のJSONのみを返してください（他の文字は一切含めないこと）:
-{{
-  "character_name": "キャラ名（日本語2〜4文字）",
-  "personality_desc": "性格説明（日本語2〜3文）",
-  "speech_style": "話し方の特徴（丁寧語/友達口調/謎めいた等、日本語1文）",
-  "cheat_tendency": 0.0から1.0の数値,
-  "cooperation_tendency": 0.0から1.0の数値,
-  "honesty": 0.0から1.0の数値,
-  "aggression": 0.0から1.0の数値,
-  "backstory": "一言プロフィール（日本語1文）"
-}}"""
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=1.0,
-                max_tokens=300
-            )
-            content = response.choices[0].message.content
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-                return AIPersonality(
-                    player_name=player_name,
-                    character_name=data.get("character_name", player_name),
-                    personality_desc=data.get("personality_desc", ""),
-                    speech_style=data.get("speech_style", "普通の口調"),
-                    cheat_tendency=float(data.get("cheat_tendency", 0.3)),
-                    cooperation_tendency=float(data.get("cooperation_tendency", 0.5)),
-                    honesty=float(data.get("honesty", 0.5)),
-                    aggression=float(data.get("aggression", 0.5)),
-                    backstory=data.get("backstory", "")
-                )
-        except Exception as e:
-            print(f"generate_personality error: {e}")
+        data = self.generate_personality_data(player_name)
+        if data is not None:
+            return personality_from_data(player_name, data)
 
         # フォールバック
         player_num = int(player_name.replace("Player ", "")) - 2
         d = _DEFAULT_PERSONALITIES[player_num % len(_DEFAULT_PERSONALITIES)]
         return AIPersonality(player_name=player_name, **d)
 
+    def generate_personality_data(self, player_name: str) -> Optional[Dict]:
+        """
+        キャラクター設定の生 dict を返す（失敗時は None。プール補充でも使う）
+        JSON が壊れていたら次の段のモデルでやり直す。
+        """
+        prompt = build_personality_prompt(player_name)
+        ladder = self.router.remote_ladder("personality")
+        for tier in ladder:
+            try:
+                content = self._complete(
+                    "personality",
+                    [{"role": "user", "content": prompt}],
+                    temperature=1.0,
+                    max_tokens=300,
+                    tier=tier
+                )
+            except Exception as e:
+                print(f"generate_personality error: {e}")
+                return None
+            try:
+                json_match = re.search(r'\{.*\}', content, re.DOTALL)
+                if json_match:
+                    data = validate_personality_data(json.loads(json_match.group()))
+                    if data is not None:
+                        return data
+            except json.JSONDecodeError as e:
+                print(f"generate_personality parse error: {e}")
+            self.metrics.record_parse_failure("personality")
+            if tier != ladder[-1]:
+                self._escalate("personality", tier, "parse_failure")
+        return None
+
     # -----------------------------------------------------------------------
     # チャット応答
     # -----------------------------------------------------------------------
 
     def generate_chat_response(self, message: str, sender: str,
                                target_personality: AIPersonality,
-                               context: dict) -> str:
-        """AIキャラクターとして会話に返答する"""
-        p = target_personality
-        system_prompt = (
-            f"あなたは大富豪ゲームをプレイしている「{p.character_name}」です。\n"
-            f"性格: {p.personality_desc}\n"
-            f"話し方: {p.speech_style}\n"
-            f"プロフィール: {p.backstory}\n"
-        )
-        if p.honesty < 0.4:
-            system_prompt += "あなたは戦略を隠す傾向があります。本音は明かさず、相手を惑わすような返答をしてください。\n"
-        if p.cooperation_tendency > 0.7:
-            system_prompt += "あなたは協力的な姿勢を見せやすいです。\n"
-
-        rel = context.get("relationship", 0)
-        if rel < -30:
-            system_prompt += "この相手とは関係が悪いので、やや警戒した返答をしてください。\n"
-        elif rel > 30:
-            system_prompt += "この相手とは仲が良いので、フレンドリーに返してください。\n"
+                               context: dict,
+                               history: Optional[ConversationWindow] = None) -> str:
+        """
+        AIキャラクターとして会話に返答する。
+        history（chat_memory.build_window の結果）を渡すと要約と直近の会話を文脈に含める。
+        """
+        system_prompt = build_chat_system_prompt(
+            target_personality, context.get("relationship", 0))
+        memory = []
+        if history is not None:
+            memory = build_chat_context(history.summary, history.turns,
+                                        target_personality.player_name)
 
         try:
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
+            return self._complete(
+                "chat",
+                [
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"{sender}より: {message}"}
+                    *memory,
+                    {"role": "user", "content": build_chat_user_message(sender, message)}
                 ],
                 temperature=0.9,
                 max_tokens=100
-            )
-            return response.choices[0].message.content.strip()
+            ).strip()
         except Exception as e:
             print(f"generate_chat_response error: {e}")
-            return "...（無言）"
+            return SILENT_REPLY
+
+    def summarize_conversation(self, player_a: str, player_b: str,
+                               previous: str, turns: List[Dict]) -> Optional[str]:
+        """会話メモリ用のローリング要約。失敗時は None（前回の要約を使い続ける）"""
+        try:
+            return self._complete(
+                "summary",
+                [{"role": "user",
+                  "content": build_summary_prompt(player_a, player_b, previous, turns)}],
+                temperature=0.3,
+                max_tokens=120
+            ).strip()
+        except Exception as e:
+            print(f"summarize_conversation error: {e}")
+            return None
 
     # -----------------------------------------------------------------------
     # 観察ヒント生成
@@ -159,29 +324,21 @@ class MistralAIPlayer:
         """observeアクション用のヒントを生成する"""
         card_count = game_info.get("player_card_count", {}).get(target, "不明")
         is_honest = personality.honesty > 0.5 or random.random() < personality.honesty
+        template = f"{target}は{card_count}枚の手札を持っているようだ。"
+        if self.router.ladder("observation")[0] == LOCAL:
+            self.router.record(LOCAL, 0.0)
+            return template
         try:
-            if is_honest:
-                prompt = (
-                    f"大富豪ゲームで{target}を観察しています。"
-                    f"{target}は現在{card_count}枚の手札を持っています。"
-                    f"{target}の個性: {personality.personality_desc}\n"
-                    f"戦略的な観察ヒントを日本語1文（40字以内）で返してください。"
-                )
-            else:
-                prompt = (
-                    f"大富豪ゲームで{target}を観察したふりをしています。"
-                    f"相手を惑わすような嘘のヒントを日本語1文（40字以内）で返してください。"
-                )
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            prompt = build_observation_prompt(target, personality, card_count, is_honest)
+            return self._complete(
+                "observation",
+                [{"role": "user", "content": prompt}],
                 temperature=0.8,
                 max_tokens=80
-            )
-            return response.choices[0].message.content.strip()
+            ).strip()
         except Exception as e:
             print(f"generate_observation error: {e}")
-            return f"{target}は{card_count}枚の手札を持っているようだ。"
+            return template
 
     # -----------------------------------------------------------------------
     # AI自発アクション
@@ -250,112 +407,86 @@ class MistralAIPlayer:
         """
         Mistral AIがカードの出し方を決定する
         感情マトリクス（Affinity + Fear）とキャラクター性を考慮
+        自明な局面・評価関数が確信できる局面では LLM を呼ばない
         """
-        game_info = game.get_game_info()
-        hand = game.player_hands[player_name]
-        
-        # キャラクター性に基づく基本的な動きの傾向
-        char_type = game.character_types.get(player_name, CharacterType.LOGICAL)
-        
-        # 関係値による追加ヒント
-        alliance = game.alliances.get(player_name)
-        rels = game.relationships.get(player_name, {})
-        fears = game.fear_levels.get(player_name, {})
-        
-        enemies = [p for p, v in rels.items()
-                   if v <= -60
-                   and p not in game.ranking
-                   and p not in game.caught_players]
-        
-        relationship_hint = f"\n【関係値ヒント】\n"
-        if alliance and alliance not in game.ranking and alliance not in game.caught_players:
-            relationship_hint += f"- {alliance}と同盟中。{alliance}を有利にするプレイも考慮。\n"
-        if enemies:
-            relationship_hint += f"- 敵対関係: {', '.join(enemies)}。妨害を優先。\n"
-        
-        for p, fear_level in fears.items():
-            if fear_level > 60:
-                relationship_hint += f"- {p}を恐れている。強気に出られない。\n"
-            elif fear_level < -60:
-                relationship_hint += f"- {p}を見下している。大胆に行動できる。\n"
-        
-        relationship_hint += f"\n【キャラクター性】\n{char_type.value}型"
-
-        prompt = self._build_move_prompt(
-            player_name, hand, valid_moves, game_info, 
-            relationship_hint, personality=game.personalities.get(player_name)
+        gated = self.gate.check(game, player_name, valid_moves)
+        if gated is not None:
+            self.metrics.inc("move", "gated")
+            if gated.apply_emotion:
+                return self._apply_emotion_matrix(game, player_name, gated.move, valid_moves)
+            return gated.move
+
+        # 評価関数の確信度が低い局面は最初の段を飛ばして大きいモデルに聞く
+        confidence = max(heuristic_confidence(score_moves(game, player_name, valid_moves)))
+        ladder = self.router.ladder("move", confidence)
+        if ladder != self.router.ladder("move"):
+            self._escalate("move", self.router.ladder("move")[0], "low_confidence")
+        if ladder[0] == LOCAL:
+            self.router.record(LOCAL, 0.0)
+            move = best_heuristic_move(game, player_name, valid_moves)
+            return self._apply_emotion_matrix(game, player_name, move, valid_moves)
+
+        built = build_move_prompt(
+            player_name, game.player_hands[player_name], valid_moves,
+            game.get_game_info(), build_move_hints(game, player_name),
+            personality=game.personalities.get(player_name)
         )
-        
+        # 表示順に並べた候補（回答番号はこのリストのインデックス）
+        candidates = [valid_moves[i] for i in built.index_map]
+
         try:
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=200
-            )
-            selected_move = self._parse_move_response(response.choices[0].message.content, valid_moves)
-            
+            # 番号が読み取れなければ次の段でやり直し、最後まで駄目なら先頭の手
+            selected_move = candidates[0] if candidates else []
+            for tier in ladder:
+                content = self._complete(
+                    "move",
+                    [{"role": "user", "content": built.text}],
+                    temperature=0.7,
+                    max_tokens=200,
+                    hedge=self.hedge_moves,
+                    tier=tier
+                )
+                idx = self._parse_move_index(content, candidates)
+                if idx is not None:
+                    selected_move = candidates[idx]
+                    self._log_decision(game, player_name, valid_moves, built.index_map[idx])
+                    break
+                self.metrics.record_parse_failure("move")
+                if tier != ladder[-1]:
+                    self._escalate("move", tier, "parse_failure")
+
             # 感情マトリクスの修正適用（AIが選んだ後、キャラクター性で微調整）
             modified = self._apply_emotion_matrix(game, player_name, selected_move, valid_moves)
             return modified
         except Exception as e:
             print(f"decide_move error: {e}")
-            return valid_moves[0] if valid_moves else []
-
-    def _build_move_prompt(self, player_name: str, hand: List[Card],
-                           valid_moves: List[List[Card]], game_info: dict,
-                           relationship_hint: str = "", personality=None) -> str:
-        hand_str = ", ".join(str(c) for c in hand)
-        last_str = (", ".join(str(c) for c in game_info['last_played'])
-                    if game_info['last_played'] else "なし")
-        moves_str = "\n".join(
-            f"{i}: {', '.join(str(c) for c in m) if m else 'パス'}"
-            for i, m in enumerate(valid_moves[:5])
-        )
-        
-        character_context = ""
-        if personality:
-            character_context = f"\n【あなたの個性】\n{personality.character_name}\n{personality.personality_desc}\n"
-        
-        return f"""あなたは大富豪というトランプゲームをプレイしています。
-
-現在のプレイヤー: {player_name}
-あなたの手札: {hand_str}{character_context}
-
-ゲーム状況:
-- 最後に出されたカード: {last_str}
-- 最後に出したプレイヤー: {game_info['last_played_by']}
-- 各プレイヤーの手札枚数: {', '.join(f"{p}: {n}枚" for p, n in game_info['player_card_count'].items())}
-- 現在の順位: {', '.join(game_info['ranking']) if game_info['ranking'] else 'なし'}
+            return best_heuristic_move(game, player_name, valid_moves)
 
-可能な手（最初の5個）:
-{moves_str}
-
-{relationship_hint}
-
-戦略:
-1. 自分が上がることを優先
-2. 強いカード（2, A, K）は温存
-3. 関係値と恐怖度を考慮した判断
-4. 同盟相手には協力的に
-5. 敵対相手には妨害的に
-6. あなたのキャラクター性に合わせたプレイスタイル
-
-あなたの判断と選択肢番号（0-{min(4, len(valid_moves)-1)}）を述べてください。"""
-
-    def _parse_move_response(self, response: str,
-                             valid_moves: List[List[Card]]) -> List[Card]:
+    def _parse_move_index(self, response: str,
+                          valid_moves: List[List[Card]]) -> Optional[int]:
+        """回答から候補番号を読む。読めなければ None"""
         numbers = re.findall(r'\d+', response)
         if numbers:
             try:
                 idx = int(numbers[-1])
                 if 0 <= idx < len(valid_moves):
-                    return valid_moves[idx]
+                    return idx
             except (ValueError, IndexError):
                 pass
-        if any(w in response for w in ["パス", "出さない", "パスします"]):
-            return valid_moves[0]
-        return valid_moves[0] if valid_moves else []
+        if valid_moves and any(w in response for w in ["パス", "出さない", "パスします"]):
+            return 0
+        return None
+
+    def _log_decision(self, game: DaifugoGame, player_name: str,
+                      valid_moves: List[List[Card]], chosen: int) -> None:
+        """LLM の選択を蒸留ポリシーの学習データとして記録する"""
+        if self.decision_log is None:
+            return
+        try:
+            self.decision_log.record(move_features(game, player_name, valid_moves),
+                                     chosen, player_name)
+        except OSError as e:
+            print(f"decision log error: {e}")
 
     def _apply_emotion_matrix(self, game: DaifugoGame, player_name: str,
                               ai_move: List[Card], valid_moves: List[List[Card]]) -> List[Card]:
@@ -393,62 +524,65 @@ class MistralAIPlayer:
 
     def generate_counter_measure(self, game: DaifugoGame,
                                  target_player: str, cheat_prompt: str) -> str:
-        """ズルへの対策文を生成する"""
+        """
+        ズルへの対策文を生成する。
+        local 段ではメニュー由来のズルに定型文で答え、自由入力のズルだけモデルに回す。
+        """
+        ladder = self.router.ladder("counter_measure")
+        if ladder[0] == LOCAL:
+            if parse_cheat_prompt(cheat_prompt, target_player) is not None or len(ladder) == 1:
+                self.router.record(LOCAL, 0.0)
+                return random.choice(COUNTER_LIBRARY)
+            self._escalate("counter_measure", LOCAL, "low_confidence")
         try:
-            prompt = f"""大富豪ゲームでズルが試みられています。
-
-ズルの内容: {cheat_prompt}
-あなたは{target_player}として対策を取ります。
-
-対策の一文を日本語で答えてください（20字以内）。"""
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            prompt = build_counter_prompt(target_player, cheat_prompt)
+            return self._complete(
+                "counter_measure",
+                [{"role": "user", "content": prompt}],
                 temperature=0.8,
                 max_tokens=60
-            )
-            return response.choices[0].message.content.strip()
+            ).strip()
         except Exception:
-            return "カードをしっかり守る"
+            return random.choice(COUNTER_LIBRARY)
 
     def evaluate_cheat_contest(self, cheat_prompt: str, counter_prompt: str,
-                               game_info: dict) -> dict:
-        """ズル対決の強度をMistralに評価させる（JSON返却）"""
+                               game_info: dict, fallback: bool = True) -> Optional[dict]:
+        """
+        ズル対決の強度をMistralに評価させる（JSON返却）。
+        失敗時はデフォルト判定を返す（fallback=False なら None。テーブル作成用）
+        """
         default = {"cheat_bonus": 1, "counter_bonus": 1,
                    "effect_type": "peek", "reasoning": "デフォルト判定"}
-        try:
-            prompt = f"""大富豪ゲームのズル対決を評価してください。
-
-ズルプロンプト: {cheat_prompt}
-対策プロンプト: {counter_prompt}
-
-以下のJSONのみを返してください（他の文字を含めないこと）:
-{{"cheat_bonus": 0から3の整数, "counter_bonus": 0から3の整数, "effect_type": "peek or swap or skip or extra_cards", "reasoning": "判定理由（日本語20字以内）"}}
-
-effect_typeの選び方:
-- 手札を見る・覗く → peek
-- 手札を交換する・入れ替える → swap
-- 妨害する・スキップ → skip
-- カードを押し付ける・追加する → extra_cards"""
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=150
-            )
-            content = response.choices[0].message.content
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-                result["cheat_bonus"] = max(0, min(3, int(result.get("cheat_bonus", 1))))
-                result["counter_bonus"] = max(0, min(3, int(result.get("counter_bonus", 1))))
-                if result.get("effect_type") not in ["peek", "swap", "skip", "extra_cards"]:
-                    result["effect_type"] = "peek"
-                result.setdefault("reasoning", "")
-                return result
-        except Exception as e:
-            print(f"evaluate_cheat_contest error: {e}")
-        return default
+        prompt = build_contest_prompt(cheat_prompt, counter_prompt)
+        ladder = self.router.remote_ladder("contest")
+        for tier in ladder:
+            try:
+                content = self._complete(
+                    "contest",
+                    [{"role": "user", "content": prompt}],
+                    temperature=0.5,
+                    max_tokens=150,
+                    tier=tier
+                )
+            except Exception as e:
+                print(f"evaluate_cheat_contest error: {e}")
+                break
+            try:
+                json_match = re.search(r'\{.*\}', content, re.DOTALL)
+                if json_match:
+                    result = json.loads(json_match.group())
+                    result["cheat_bonus"] = max(0, min(3, int(result.get("cheat_bonus", 1))))
+                    result["counter_bonus"] = max(0, min(3, int(result.get("counter_bonus", 1))))
+                    if result.get("effect_type") not in ["peek", "swap", "skip", "extra_cards"]:
+                        result["effect_type"] = "peek"
+                    result.setdefault("reasoning", "")
+                    return result
+            except (json.JSONDecodeError, TypeError, ValueError) as e:
+                print(f"evaluate_cheat_contest parse error: {e}")
+            self.metrics.record_parse_failure("contest")
+            if tier != ladder[-1]:
+                self._escalate("contest", tier, "parse_failure")
+        return default if fallback else None
 
     def decide_cheat_attempt(self, game: DaifugoGame,
                              player_name: str) -> Optional[Dict]:
@@ -473,12 +607,11 @@ effect_typeの選び方:
         rels = game.relationships.get(player_name, {})
         target = min(candidates, key=lambda p: rels.get(p, 0))
 
-        method = random.choice(["手札を盗み見る", "手札を入れ替える",
-                                 "行動を妨害する", "余分なカードを押し付ける"])
-        approach = random.choice(["素早い動きで", "言葉で惑わして", "隙をついて", "表情で騙して"])
-        confidence = random.choice(["完璧な計画で", "運を頼りに", "慎重に", "大胆に"])
+        method = random.choice(CHEAT_METHODS)
+        approach = random.choice(CHEAT_APPROACHES)
+        confidence = random.choice(CHEAT_CONFIDENCES)
         return {"target": target,
-                "prompt": f"{confidence}、{approach}、{target}の{method}"}
+                "prompt": format_cheat_prompt(confidence, approach, target, method)}
 
 
 def make_random_move(valid_moves: List[List[Card]]) -> List[Card]:
@@ -7,10 +7,16 @@ import os
 from dotenv import load_dotenv
 
 from game_logic import DaifugoGame, GameState
-from ai_player import MistralAIPlayer
-from ui.game import render_game_status, render_player_hand_and_action, play_ai_turn
+from ui.assets import app_css, relationships_markdown, rules_markdown
+from ui.game import render_game_status, render_player_hand_and_action, render_ai_replay
+from ui.worker import render_worker_poller, start_worker, sync_worker
 from ui.cheat import render_cheat_phase
-from ui.interaction import render_right_panel
+from ui.interaction import render_right_panel, sync_replies
+from ui.timing import render_rerun_timing, timed
+from ui.profiler import (
+    ENGINE, profile_rerun, profile_section, profiling_enabled, render_profile_panel,
+)
+from ui.session import get_slot, load_session, render_footprint, reset_slot, save_session
 
 load_dotenv()
 
@@ -24,60 +30,13 @@ st.set_page_config(
     layout="wide"
 )
 
-st.markdown("""
-<style>
-.stButton > button {
-    min-height: 44px;
-    touch-action: manipulation;
-    font-size: clamp(0.8rem, 2vw, 1rem);
-}
-.card-display {
-    font-size: clamp(1rem, 3vw, 1.4em);
-}
-.chat-bubble-player {
-    background: #1a73e8;
-    color: white;
-    border-radius: 12px 12px 2px 12px;
-    padding: 6px 12px;
-    margin: 4px 0 4px 40px;
-    display: inline-block;
-    max-width: 90%;
-    word-break: break-word;
-}
-.chat-bubble-ai {
-    background: #333;
-    color: #f0f0f0;
-    border-radius: 12px 12px 12px 2px;
-    padding: 6px 12px;
-    margin: 4px 40px 4px 0;
-    display: inline-block;
-    max-width: 90%;
-    word-break: break-word;
-}
-.chat-sender {
-    font-size: 0.72em;
-    color: #aaa;
-    margin-bottom: 1px;
-}
-.rel-meter {
-    font-size: 1.2em;
-    letter-spacing: 2px;
-}
-@media (max-width: 768px) {
-    .main .block-container { padding: 0.5rem; }
-    .stMetric { padding: 0.25rem; }
-}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(app_css(), unsafe_allow_html=True)
 
 # -----------------------------------------------------------------------
 # セッション状態のデフォルト値
 # -----------------------------------------------------------------------
 
 _SS_DEFAULTS = {
-    'game': None,
-    'ai_player': None,
-    'game_log': [],
     'card_select_key': 0,
     'cheat_phase_peek_target': None,
     'cheat_phase_peek_time': None,
@@ -85,14 +44,21 @@ _SS_DEFAULTS = {
     'selected_chat_target': None,
     'player_notes': {},
     'chat_input_key': 0,
-    'action_results': [],
-    'ai_personalities': {},
+    'worker_seen_version': -1,
+    'poller_running': False,
 }
 
 for _key, _default in _SS_DEFAULTS.items():
     if _key not in st.session_state:
         st.session_state[_key] = _default
 
+
+def reset_session():
+    """ゲーム・ログ・ワーカーを捨て、UI の状態を既定値に戻す"""
+    reset_slot()
+    for key, val in _SS_DEFAULTS.items():
+        st.session_state[key] = val
+
 # -----------------------------------------------------------------------
 # ゲーム初期化
 # -----------------------------------------------------------------------
@@ -102,22 +68,33 @@ def initialize_game(num_players: int, use_ai: bool):
     game.start_game()
 
     # セッションをリセット
-    for key, val in _SS_DEFAULTS.items():
-        st.session_state[key] = val
-    st.session_state.game = game
+    reset_session()
+    get_slot().game = game
 
     if use_ai:
+        # AI を使うときだけ読み込む（ai_player は依存モジュールが多く、初回表示を遅くする）
+        from ai_player import MistralAIPlayer
+        from personality_pool import get_pool
+
         try:
             ai = MistralAIPlayer()
-            st.session_state.ai_player = ai
+            get_slot().ai_player = ai
+            pool = get_pool()
             for player in game.players[1:]:
-                with st.spinner(f"{player}の個性を生成中..."):
-                    personality = ai.generate_personality(player)
-                    game.personalities[player] = personality
-                    st.session_state.ai_personalities[player] = personality
+                # プールから即時に配る。空のときだけその場で生成
+                used = [p.character_name for p in game.personalities.values()]
+                personality = pool.draw(player, exclude_names=used)
+                if personality is None:
+                    with st.spinner(f"{player}の個性を生成中..."):
+                        personality = ai.generate_personality(player)
+                game.personalities[player] = personality
+            pool.request_refill(ai.generate_personality_data)
         except ValueError as e:
             st.error(f"AI初期化エラー: {e}")
 
+    # AIの手番はワーカースレッドが進める
+    start_worker(game, get_slot().ai_player)
+
 # -----------------------------------------------------------------------
 # サイドバー
 # -----------------------------------------------------------------------
@@ -126,7 +103,7 @@ def render_sidebar():
     with st.sidebar:
         st.header("⚙️ ゲーム設定")
 
-        if st.session_state.game is None:
+        if get_slot().game is None:
             num_players = st.slider("プレイヤー数", 2, 4, 4)
             use_ai = st.checkbox("Mistral AI プレイヤーを使用", value=True)
 
@@ -143,39 +120,26 @@ def render_sidebar():
                 st.rerun()
         else:
             if st.button("🔄 新しいゲームを開始", use_container_width=True):
-                for key, val in _SS_DEFAULTS.items():
-                    st.session_state[key] = val
+                reset_session()
                 st.rerun()
             if st.button("❌ ゲームを終了", use_container_width=True):
-                st.session_state.game = None
-                st.session_state.game_log = []
+                reset_slot()
                 st.rerun()
 
         st.markdown("---")
         st.subheader("📖 ルール")
-        st.write("""
-        - ♠3を持つプレイヤーが先手
-        - 場より強いカードを出す
-        - 同ランク複数枚（ペア等）も可
-        - 出せない・出したくない場合はパス
-        - 全員パスで **ズルフェーズ** 開始
-        - ズル成功→効果発動 / ズルバレ→最下位
-        - 手札がなくなったら上がり
-
-        **ランク順（弱→強）:**
-        3 < 4 < 5 < 6 < 7 < 8 < 9 < 10 < J < Q < K < A < 2
-        """)
+        st.markdown(rules_markdown())
         st.markdown("---")
         st.subheader("💡 関係値")
-        st.write("""
-        | 値 | 状態 |
-        |---|---|
-        | +60〜+100 | 🤝 同盟 |
-        | +30〜+59 | 😊 友好 |
-        | -29〜+29 | 😐 中立 |
-        | -30〜-59 | 😒 警戒 |
-        | -60〜-100 | 😡 敵対 |
-        """)
+        st.markdown(relationships_markdown())
+        st.markdown("---")
+        with st.expander("⏱ 再実行時間"):
+            render_rerun_timing()
+        with st.expander("💾 セッションのメモリ"):
+            render_footprint()
+        if profiling_enabled():
+            with st.expander("🔬 プロファイル"):
+                render_profile_panel()
 
 # -----------------------------------------------------------------------
 # メイン
@@ -187,26 +151,35 @@ def main():
 
     render_sidebar()
 
-    if st.session_state.game is None:
+    if get_slot().game is None:
         st.info("ゲームを開始するには、サイドバーで設定をしてください。")
         return
 
-    game: DaifugoGame = st.session_state.game
+    game: DaifugoGame = get_slot().game
+
+    # ワーカーが進めたAIの手番を取り込み、結果を1回だけ描画する
+    with profile_section("ai_turns", ENGINE):
+        ai_batch = sync_worker()
+    # 生成の終わったキャラクターの返答を反映する
+    with profile_section("replies", ENGINE):
+        sync_replies()
 
     left_col, right_col = st.columns([7, 3])
 
     with left_col:
-        render_game_status()
+        with profile_section("render_game_status"):
+            render_game_status()
+        render_worker_poller()
+        if ai_batch:
+            with profile_section("render_ai_replay"):
+                render_ai_replay(ai_batch)
 
         if game.game_state == GameState.CHEAT_PHASE:
-            render_cheat_phase()
-        elif game.game_state == GameState.PLAYING:
-            render_player_hand_and_action()
-            if game.get_current_player() != "Player 1":
-                play_ai_turn()
-                st.rerun()
+            with profile_section("render_cheat_phase"):
+                render_cheat_phase()
         elif game.game_state != GameState.GAME_OVER:
-            render_player_hand_and_action()
+            with profile_section("render_player_hand_and_action"):
+                render_player_hand_and_action()
 
         if game.game_state == GameState.GAME_OVER:
             st.markdown("---")
@@ -218,8 +191,17 @@ def main():
                 st.write(f"{medals[idx] if idx < len(medals) else '　'} 第{idx+1}位: {player}{caught_mark}")
 
     with right_col:
-        render_right_panel()
+        with profile_section("render_right_panel"):
+            render_right_panel()
 
 
 if __name__ == "__main__":
-    main()
+    with timed("app"), profile_rerun(get_slot().session_id):
+        with profile_section("load_session", ENGINE):
+            load_session()
+        try:
+            main()
+        finally:
+            # st.rerun() で抜けるときも、この再実行での変更をまとめて1回で保存する
+            with profile_section("save_session", ENGINE):
+                save_session()
@@ -0,0 +1,157 @@
+"""
+会話メモリ
+ペアごとの会話を「直近の発言ウィンドウ（トークン上限付き）＋古い発言のローリング要約」で保持する
+
+チャット1回あたりのプロンプトは会話がどれだけ長くなっても
+TOKEN_BUDGETS["chat_window"] + TOKEN_BUDGETS["summary"] 程度で頭打ちになる。
+要約の更新は返答生成とは別スレッドで、スケジューラの LOW 優先度（"summary"）で行う。
+別スレッドでは要約文を作るだけでゲームには触らない。反映は呼び出し側がゲームのロックの下で
+apply_summary() で行う（要約中に退避・復元でゲームが差し替わっても今のゲームに書く）。
+
+要約は DaifugoGame.conversation_summaries に conversation_history と同じキーで保存する:
+    {"summary": 要約文, "covered": 要約に含めた発言数}
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_logic import DaifugoGame
+from prompt_builder import TOKEN_BUDGETS, clip_text, estimate_tokens
+
+
+# ウィンドウに入れる発言数の上限（トークン上限より先に効くことがある）
+MAX_WINDOW_TURNS = 8
+
+# ウィンドウから外れた未要約の発言がこの数たまったら要約を更新する
+SUMMARY_BATCH = 4
+
+# 1発言あたりの上限（長文1つでウィンドウが埋まらないように）
+_MAX_TURN_TOKENS = 60
+
+# 要約関数: (前回の要約, 新しく要約に含める発言) -> 新しい要約（失敗時 None）
+Summarizer = Callable[[str, List[Dict]], Optional[str]]
+
+
+@dataclass
+class ConversationWindow:
+    """チャット返答プロンプトに載せる会話文脈"""
+    summary: str = ""
+    turns: List[Dict] = field(default_factory=list)
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(t["message"]) for t in self.turns)
+
+
+def _split_window(history: List[Dict], budget: int) -> int:
+    """末尾から budget に収まる発言を数え、ウィンドウの開始位置を返す"""
+    used = 0
+    start = len(history)
+    while start > 0 and len(history) - start < MAX_WINDOW_TURNS:
+        cost = min(estimate_tokens(history[start - 1]["message"]), _MAX_TURN_TOKENS)
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def build_window(game: DaifugoGame, player_a: str, player_b: str,
+                 drop_last: int = 0) -> ConversationWindow:
+    """
+    要約＋直近ウィンドウを作る。
+    drop_last: いま返答しようとしている発言がすでに履歴に積まれている場合、その数
+    """
+    history = game.get_conversation(player_a, player_b)
+    if drop_last:
+        history = history[:-drop_last]
+    start = _split_window(history, TOKEN_BUDGETS["chat_window"])
+    turns = [
+        {**t, "message": clip_text(t["message"], _MAX_TURN_TOKENS)}
+        for t in history[start:]
+    ]
+    summary = game.get_conversation_summary(player_a, player_b).get("summary", "")
+    return ConversationWindow(summary=clip_text(summary, TOKEN_BUDGETS["summary"]),
+                              turns=turns)
+
+
+def pending_turns(game: DaifugoGame, player_a: str, player_b: str) -> Tuple[int, int]:
+    """ウィンドウから外れたのにまだ要約されていない範囲 (begin, end) を返す"""
+    history = game.get_conversation(player_a, player_b)
+    covered = game.get_conversation_summary(player_a, player_b).get("covered", 0)
+    end = _split_window(history, TOKEN_BUDGETS["chat_window"])
+    return covered, max(covered, end)
+
+
+# -----------------------------------------------------------------------
+# 要約の遅延更新
+# -----------------------------------------------------------------------
+
+class SummaryRefresher:
+    """要約文の生成をバックグラウンドで行う（同じ会話の多重実行は呼び出し側で避ける）"""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="chat-summary")
+
+    def maybe_refresh(self, game: DaifugoGame, player_a: str, player_b: str,
+                      summarize: Summarizer, batch: int = SUMMARY_BATCH) -> Optional[Future]:
+        """
+        未要約の発言が batch 以上たまっていれば要約の生成を予約する（ゲームのロックの下で呼ぶ）。
+        フューチャーの結果は (要約 or None, begin, end)。反映は apply_summary() で
+        """
+        begin, end = pending_turns(game, player_a, player_b)
+        if end - begin < batch:
+            return None
+        previous = game.get_conversation_summary(player_a, player_b).get("summary", "")
+        turns = game.get_conversation(player_a, player_b)[begin:end]
+        return self._executor.submit(_summarize, summarize, previous, turns, begin, end)
+
+
+def _summarize(summarize: Summarizer, previous: str, turns: List[Dict],
+               begin: int, end: int) -> Tuple[Optional[str], int, int]:
+    try:
+        summary = summarize(previous, turns)
+    except Exception as e:
+        print(f"summary refresh error: {e}")
+        summary = None
+    return summary, begin, end
+
+
+def apply_summary(game: DaifugoGame, player_a: str, player_b: str,
+                  summary: Optional[str], begin: int, end: int) -> bool:
+    """begin〜end を畳み込んだ要約を保存する（ゲームのロックの下で呼ぶ）。保存できたら True"""
+    if not summary:
+        return False
+    # 要約中に別の更新が先に済んでいたら捨てる
+    if game.get_conversation_summary(player_a, player_b).get("covered", 0) != begin:
+        return False
+    game.set_conversation_summary(player_a, player_b,
+                                  clip_text(summary.strip(), TOKEN_BUDGETS["summary"]), end)
+    return True
+
+
+def refresh_summary(game: DaifugoGame, player_a: str, player_b: str,
+                    summarize: Summarizer) -> bool:
+    """未要約の範囲を前回の要約に畳み込む（同期版）。更新できたら True"""
+    begin, end = pending_turns(game, player_a, player_b)
+    if end <= begin:
+        return False
+    previous = game.get_conversation_summary(player_a, player_b).get("summary", "")
+    summary, _, _ = _summarize(summarize, previous,
+                               game.get_conversation(player_a, player_b)[begin:end], begin, end)
+    return apply_summary(game, player_a, player_b, summary, begin, end)
+
+
+_refresher: Optional[SummaryRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher() -> SummaryRefresher:
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = SummaryRefresher()
+        return _refresher
@@ -0,0 +1,136 @@
+"""
+プロセス共有の Mistral クライアントレジストリ
+API キー（と接続先）ごとに1つのクライアントと HTTP コネクションプールを共有する
+
+Streamlit はブラウザセッションごとに MistralAIPlayer を作るが、
+TLS ハンドシェイクとプールのウォームアップはプロセスで1回にしたい。
+しばらく使われていないクライアントは次の取得時に閉じる。
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from llm_guard import CircuitBreaker
+from llm_scheduler import LLMScheduler
+
+
+DEFAULT_POOL_SIZE = int(os.getenv("MISTRAL_POOL_SIZE", "20"))
+DEFAULT_IDLE_TTL = float(os.getenv("MISTRAL_CLIENT_IDLE_TTL", "600"))
+
+
+@dataclass
+class _Entry:
+    client: object
+    http_client: object
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+def _key_for(api_key: str, server_url: Optional[str]) -> Tuple[str, str]:
+    # 生のキーは保持しない
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16], server_url or ""
+
+
+class ClientRegistry:
+    """スレッドセーフなクライアント共有レジストリ"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE,
+                 idle_ttl: float = DEFAULT_IDLE_TTL):
+        self.pool_size = pool_size
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._schedulers: Dict[Tuple[str, str], LLMScheduler] = {}
+
+    def _create(self, api_key: str, server_url: Optional[str]) -> _Entry:
+        import httpx
+        from mistralai import Mistral
+
+        limits = httpx.Limits(max_connections=self.pool_size,
+                              max_keepalive_connections=self.pool_size,
+                              keepalive_expiry=min(self.idle_ttl, 120.0))
+        http_client = httpx.Client(limits=limits)
+        kwargs = {"api_key": api_key, "client": http_client}
+        if server_url:
+            kwargs["server_url"] = server_url
+        return _Entry(client=Mistral(**kwargs), http_client=http_client)
+
+    def acquire(self, api_key: str, server_url: Optional[str] = None):
+        """共有クライアントを返す（なければ作る）。呼ぶたびに利用時刻を更新する"""
+        key = _key_for(api_key, server_url)
+        with self._lock:
+            self._close_idle_locked(exclude=key)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = self._create(api_key, server_url)
+            entry.last_used = time.monotonic()
+            entry.uses += 1
+            return entry.client
+
+    def breaker(self, api_key: str, server_url: Optional[str] = None) -> CircuitBreaker:
+        """同じ API キーを使う全セッションで共有するサーキットブレーカー"""
+        key = _key_for(api_key, server_url)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker()
+            return self._breakers[key]
+
+    def scheduler(self, api_key: str, server_url: Optional[str] = None) -> LLMScheduler:
+        """同じ API キー（＝同じクォータ）を使う全セッションで共有するスケジューラ"""
+        key = _key_for(api_key, server_url)
+        with self._lock:
+            if key not in self._schedulers:
+                self._schedulers[key] = LLMScheduler()
+            return self._schedulers[key]
+
+    def close_idle(self) -> int:
+        """idle_ttl 以上使われていないクライアントを閉じる。閉じた数を返す"""
+        with self._lock:
+            return self._close_idle_locked()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self._close(entry)
+            self._entries.clear()
+
+    def _close_idle_locked(self, exclude: Optional[Tuple[str, str]] = None) -> int:
+        now = time.monotonic()
+        stale = [k for k, e in self._entries.items()
+                 if k != exclude and now - e.last_used >= self.idle_ttl]
+        for k in stale:
+            self._close(self._entries.pop(k))
+        return len(stale)
+
+    @staticmethod
+    def _close(entry: _Entry) -> None:
+        try:
+            entry.http_client.close()
+        except Exception as e:
+            print(f"client close error: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "clients": len(self._entries),
+                "pool_size": self.pool_size,
+                "entries": [
+                    {"key": k[0][:8], "server_url": k[1], "uses": e.uses,
+                     "idle_seconds": round(now - e.last_used, 1)}
+                    for k, e in self._entries.items()
+                ],
+            }
+
+
+_registry = ClientRegistry()
+
+
+def get_registry() -> ClientRegistry:
+    return _registry
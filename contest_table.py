@@ -0,0 +1,207 @@
+"""
+ズル対決の事前計算テーブル
+メニュー選択で作るズルプロンプト（手口4 × アプローチ4 × 自信4）を
+対策文ライブラリの全件と総当たりで Mistral に評価させ、結果を表引きできるようにする
+
+    python contest_table.py --build     # 64 × 対策数 回の評価（オフライン）
+    python contest_table.py --show
+
+execute_cheat はまずこの表を引き、自由入力のズルプロンプトだけ LLM で評価する。
+表を引いた場合は対策文もライブラリから選ぶので、ズル1回の API 呼び出しは0回になる。
+
+保存形式（JSON）:
+    {"counters": [対策文, ...],
+     "entries": {"手口番号.アプローチ番号.自信番号": [[ズルB, 対策B, 効果番号, 理由], ...対策順]}}
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+DEFAULT_TABLE_PATH = os.path.join(".cache", "contest_table.json")
+
+CHEAT_METHODS = ["手札を盗み見る", "手札を入れ替える", "行動を妨害する", "余分なカードを押し付ける"]
+CHEAT_APPROACHES = ["素早い動きで", "言葉で惑わして", "隙をついて", "表情で騙して"]
+CHEAT_CONFIDENCES = ["完璧な計画で", "運を頼りに", "慎重に", "大胆に"]
+
+# 表の評価に使う対策文（LLM 未使用時・対策生成失敗時の定型文も兼ねる）
+COUNTER_LIBRARY = [
+    "カードをしっかり守る",
+    "手札を胸に抱えて隠す",
+    "相手の手元から目を離さない",
+    "わざと隙を見せて罠にかける",
+    "周りに聞こえるよう大声で警告する",
+]
+
+EFFECT_TYPES = ["peek", "swap", "skip", "extra_cards"]
+
+# 表を作るときのターゲット名（プロンプトの意味は変わらない）
+_TABLE_TARGET = "相手"
+
+# (ズルプロンプト, 対策プロンプト) -> 評価 dict（失敗時 None）
+Evaluator = Callable[[str, str], Optional[Dict]]
+
+
+def format_cheat_prompt(confidence: str, approach: str, target: str, method: str) -> str:
+    """メニュー選択からズルプロンプトを作る（UI と AI で共通）"""
+    return f"{confidence}、{approach}、{target}の{method}"
+
+
+def parse_cheat_prompt(cheat_prompt: str, target: str) -> Optional[Tuple[int, int, int]]:
+    """メニューで作ったプロンプトなら (手口, アプローチ, 自信) の番号を返す"""
+    parts = cheat_prompt.split("、")
+    if len(parts) != 3 or not parts[2].startswith(f"{target}の"):
+        return None
+    confidence, approach, method = parts[0], parts[1], parts[2][len(target) + 1:]
+    if (method not in CHEAT_METHODS or approach not in CHEAT_APPROACHES
+            or confidence not in CHEAT_CONFIDENCES):
+        return None
+    return (CHEAT_METHODS.index(method), CHEAT_APPROACHES.index(approach),
+            CHEAT_CONFIDENCES.index(confidence))
+
+
+def _key(combo: Tuple[int, int, int]) -> str:
+    return ".".join(str(i) for i in combo)
+
+
+# -----------------------------------------------------------------------
+# テーブル
+# -----------------------------------------------------------------------
+
+class ContestTable:
+    """事前計算したズル対決の評価結果"""
+
+    def __init__(self, counters: List[str], entries: Dict[str, List[List]]):
+        self.counters = counters
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.entries.values())
+
+    def lookup(self, cheat_prompt: str, target: str,
+               counter_idx: Optional[int] = None) -> Optional[Tuple[str, Dict]]:
+        """
+        (対策文, 評価結果) を返す。自由入力のプロンプト・未計算の組み合わせなら None。
+        counter_idx を省略すると対策文はランダムに選ぶ。
+        """
+        combo = parse_cheat_prompt(cheat_prompt, target)
+        if combo is None:
+            return None
+        rows = self.entries.get(_key(combo))
+        if not rows:
+            return None
+        if counter_idx is None:
+            counter_idx = random.randrange(len(rows))
+        cheat_bonus, counter_bonus, effect, reasoning = rows[counter_idx]
+        return self.counters[counter_idx], {
+            "cheat_bonus": cheat_bonus,
+            "counter_bonus": counter_bonus,
+            "effect_type": EFFECT_TYPES[effect],
+            "reasoning": reasoning,
+        }
+
+    def to_dict(self) -> Dict:
+        return {"counters": self.counters, "entries": self.entries}
+
+    def save(self, path: str = DEFAULT_TABLE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+def build_table(evaluate: Evaluator, counters: Optional[List[str]] = None,
+                workers: int = 8) -> ContestTable:
+    """全組み合わせ × 全対策を評価する。評価に失敗した組み合わせは表に入れない"""
+    counters = counters or COUNTER_LIBRARY
+    combos = list(product(range(len(CHEAT_METHODS)), range(len(CHEAT_APPROACHES)),
+                          range(len(CHEAT_CONFIDENCES))))
+
+    def score(combo: Tuple[int, int, int]) -> Tuple[str, Optional[List[List]]]:
+        m, a, c = combo
+        prompt = format_cheat_prompt(CHEAT_CONFIDENCES[c], CHEAT_APPROACHES[a],
+                                     _TABLE_TARGET, CHEAT_METHODS[m])
+        rows = []
+        for counter in counters:
+            result = evaluate(prompt, counter)
+            if result is None:
+                return _key(combo), None
+            rows.append([result["cheat_bonus"], result["counter_bonus"],
+                         EFFECT_TYPES.index(result["effect_type"]),
+                         result.get("reasoning", "")])
+        return _key(combo), rows
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scored = list(executor.map(score, combos))
+    return ContestTable(counters, {key: rows for key, rows in scored if rows is not None})
+
+
+_table_cache: Dict[str, Tuple[float, Optional[ContestTable]]] = {}
+_table_lock = threading.Lock()
+
+
+def load_table(path: Optional[str] = None) -> Optional[ContestTable]:
+    """テーブルを読む（なければ None）。ファイルが更新されるまで使い回す"""
+    path = path or os.getenv("CONTEST_TABLE_PATH", DEFAULT_TABLE_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _table_lock:
+        cached = _table_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            table = ContestTable(data["counters"], data["entries"])
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            print(f"load_table error: {e}")
+            table = None
+        _table_cache[path] = (mtime, table)
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ズル対決テーブルの事前計算")
+    parser.add_argument("--path", default=os.getenv("CONTEST_TABLE_PATH", DEFAULT_TABLE_PATH))
+    parser.add_argument("--build", action="store_true")
+    parser.add_argument("--show", action="store_true")
+    args = parser.parse_args()
+
+    if args.build:
+        from dotenv import load_dotenv
+        from ai_player import MistralAIPlayer
+
+        load_dotenv()
+        ai = MistralAIPlayer()
+        table = build_table(lambda cheat, counter: ai.evaluate_cheat_contest(
+            cheat, counter, {}, fallback=False))
+        table.save(args.path)
+        print(f"{len(table.entries)}組み合わせ / {len(table)}件を保存 ({args.path})")
+
+    table = load_table(args.path)
+    if table is None:
+        print(f"テーブルがありません: {args.path}")
+        return
+    if args.show:
+        for key, rows in sorted(table.entries.items()):
+            m, a, c = (int(i) for i in key.split("."))
+            prompt = format_cheat_prompt(CHEAT_CONFIDENCES[c], CHEAT_APPROACHES[a],
+                                         _TABLE_TARGET, CHEAT_METHODS[m])
+            cells = " ".join(f"{r[0]}-{r[1]}:{EFFECT_TYPES[r[2]]}" for r in rows)
+            print(f"{prompt}  {cells}")
+    print(f"テーブル: {len(table.entries)}組み合わせ × 対策{len(table.counters)}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+DaifugoGame のコンパクトな直列化（JSON + zlib）
+セッションの退避・保存に使う。カードは 0〜51 の整数、Enum は値、dataclass は dict にする
+
+    data = encode_game(game)      # bytes
+    game = decode_game(data)
+"""
+
+import json
+import zlib
+from dataclasses import asdict, fields
+from typing import Any, Dict, List
+
+from game_logic import DaifugoGame
+from models import (
+    AIPersonality, Card, CharacterType, CheatAttempt, GamePhase, GameState, PlayerStats, Suit,
+)
+
+
+CODEC_VERSION = 1
+
+_SUITS = list(Suit)
+_RANKS = Card.RANK_ORDER
+
+# そのまま JSON にできる属性
+_PLAIN_FIELDS = (
+    "players", "current_player_idx", "last_played_by", "pass_count", "ranking",
+    "cheat_queue", "skip_next_turn", "caught_players",
+    "relationships", "fear_levels", "alliances",
+    "conversation_history", "conversation_summaries", "info_revealed", "action_effects",
+    "current_cycle", "game_log",
+)
+_CARD_LIST_FIELDS = ("deck", "discard_pile", "last_played_cards")
+
+# AIPersonality のうちコンストラクタ引数になるもの
+_PERSONALITY_FIELDS = tuple(f.name for f in fields(AIPersonality) if f.init)
+
+
+def _card_to_int(card: Card) -> int:
+    return _SUITS.index(card.suit) * len(_RANKS) + _RANKS.index(card.rank)
+
+
+def _int_to_card(value: int) -> Card:
+    suit, rank = divmod(value, len(_RANKS))
+    return Card(_SUITS[suit], _RANKS[rank])
+
+
+def _cards(cards: List[Card]) -> List[int]:
+    return [_card_to_int(c) for c in cards]
+
+
+def _uncards(values: List[int]) -> List[Card]:
+    return [_int_to_card(v) for v in values]
+
+
+# -----------------------------------------------------------------------
+# dict 変換
+# -----------------------------------------------------------------------
+
+def game_to_dict(game: DaifugoGame) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"v": CODEC_VERSION, "num_players": game.num_players}
+    for name in _PLAIN_FIELDS:
+        data[name] = getattr(game, name)
+    for name in _CARD_LIST_FIELDS:
+        data[name] = _cards(getattr(game, name))
+    data["player_hands"] = {p: _cards(h) for p, h in game.player_hands.items()}
+    data["game_state"] = game.game_state.value
+    data["game_phase"] = game.game_phase.value
+    data["character_types"] = {p: t.value for p, t in game.character_types.items()}
+    data["cheat_attempts"] = [asdict(a) for a in game.cheat_attempts]
+    data["player_stats"] = {p: asdict(s) for p, s in game.player_stats.items()}
+    data["personalities"] = {
+        p: {f: getattr(pers, f) for f in _PERSONALITY_FIELDS}
+        for p, pers in game.personalities.items()
+    }
+    return data
+
+
+def game_from_dict(data: Dict[str, Any]) -> DaifugoGame:
+    if data.get("v") != CODEC_VERSION:
+        raise ValueError(f"unsupported game codec version: {data.get('v')}")
+    game = DaifugoGame(num_players=data["num_players"])
+    for name in _PLAIN_FIELDS:
+        setattr(game, name, data[name])
+    for name in _CARD_LIST_FIELDS:
+        setattr(game, name, _uncards(data[name]))
+    game.player_hands = {p: _uncards(h) for p, h in data["player_hands"].items()}
+    game.game_state = GameState(data["game_state"])
+    game.game_phase = GamePhase(data["game_phase"])
+    game.character_types = {p: CharacterType(t) for p, t in data["character_types"].items()}
+    game.cheat_attempts = [CheatAttempt(**a) for a in data["cheat_attempts"]]
+    game.player_stats = {p: PlayerStats(**s) for p, s in data["player_stats"].items()}
+    game.personalities = {p: AIPersonality(**d) for p, d in data["personalities"].items()}
+    return game
+
+
+# -----------------------------------------------------------------------
+# バイト列
+# -----------------------------------------------------------------------
+
+def pack(obj: Any) -> bytes:
+    raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+def unpack(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def encode_game(game: DaifugoGame) -> bytes:
+    return pack(game_to_dict(game))
+
+
+def decode_game(data: bytes) -> DaifugoGame:
+    return game_from_dict(unpack(data))
@@ -44,6 +44,7 @@ class DaifugoGame:
         self.fear_levels: Dict[str, Dict[str, int]] = {}          # Fear（恐怖度）
         self.alliances: Dict[str, Optional[str]] = {}
         self.conversation_history: Dict[str, List[Dict]] = {}
+        self.conversation_summaries: Dict[str, Dict] = {}        # 古い会話のローリング要約
         self.info_revealed: Dict[str, List[str]] = {}
         self.personalities: Dict[str, AIPersonality] = {}
         self.character_types: Dict[str, CharacterType] = {}
@@ -301,9 +302,13 @@ class DaifugoGame:
         if self.alliances.get(player_b) == player_a:
             self.alliances[player_b] = None
 
+    @staticmethod
+    def conversation_key(player_a: str, player_b: str) -> str:
+        return f"{min(player_a, player_b)}_{max(player_a, player_b)}"
+
     def add_conversation(self, player_a: str, player_b: str, sender: str,
                          message: str, msg_type: str = "chat") -> None:
-        key = f"{min(player_a, player_b)}_{max(player_a, player_b)}"
+        key = self.conversation_key(player_a, player_b)
         if key not in self.conversation_history:
             self.conversation_history[key] = []
         self.conversation_history[key].append({
@@ -313,9 +318,20 @@ class DaifugoGame:
         })
 
     def get_conversation(self, player_a: str, player_b: str) -> List[Dict]:
-        key = f"{min(player_a, player_b)}_{max(player_a, player_b)}"
+        key = self.conversation_key(player_a, player_b)
         return self.conversation_history.get(key, [])
 
+    def get_conversation_summary(self, player_a: str, player_b: str) -> Dict:
+        """{"summary": 要約文, "covered": 要約済みの発言数}（なければ空 dict）"""
+        return self.conversation_summaries.get(self.conversation_key(player_a, player_b), {})
+
+    def set_conversation_summary(self, player_a: str, player_b: str,
+                                 summary: str, covered: int) -> None:
+        self.conversation_summaries[self.conversation_key(player_a, player_b)] = {
+            "summary": summary,
+            "covered": covered,
+        }
+
     def get_relationship_bonus(self, player_a: str, player_b: str) -> int:
         """関係値に基づくズルボーナス（+1 / 0 / -1）"""
         rel = self.relationships.get(player_a, {}).get(player_b, 0)
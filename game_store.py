@@ -0,0 +1,209 @@
+"""
+セッションの外部ストア
+ゲーム状態をセッション ID ごとに保存し、どのサーバープロセスからでも読み戻せるようにする
+（同一ホストで複数プロセスを並べ、スティッキーセッションなしで振り分けるため）
+
+- MemoryGameStore : プロセス内（1プロセス運用の既定）
+- SQLiteGameStore : SQLite（WAL モード）。同じホストの全プロセスで共有する
+
+楽観的バージョン管理: save() には読み込んだときのバージョンを渡し、
+その間に別プロセスが書き込んでいたら VersionConflict になる（新規は 0 を渡す）。
+保存するデータは game_codec.pack した bytes（ストアは中身を解釈しない）。
+ゲームの終了・新規開始で delete() し、ブラウザを閉じたまま放置されたセッションは
+GAME_STORE_TTL 秒（既定 1 日）更新がなければ保存のついでに消す。
+
+    GAME_STORE=sqlite GAME_STORE_PATH=.cache/games.sqlite3 streamlit run app.py
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "games.sqlite3")
+DEFAULT_TTL_SECONDS = 24 * 3600.0
+# 期限切れの掃除をする最短の間隔（秒）
+PRUNE_INTERVAL = 60.0
+
+
+def _initial_version() -> int:
+    """
+    新しく作る行の最初のバージョン。削除して作り直したセッションが以前と同じ番号にならないよう
+    時刻（マイクロ秒）から取る（以後は 1 ずつ増やす）
+    """
+    return time.time_ns() // 1000
+
+
+class VersionConflict(Exception):
+    """読み込み後に別のプロセスが同じセッションを書き換えていた"""
+
+
+class GameStore(ABC):
+    """セッション ID → (バージョン, データ) の保存先"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._next_prune = 0.0
+
+    @abstractmethod
+    def version(self, session_id: str) -> int:
+        """現在のバージョン（未保存なら 0）"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, data: bytes, expected_version: int) -> int:
+        """expected_version が現在のバージョンと一致するときだけ書き込み、新しいバージョンを返す"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def prune(self, older_than: float) -> int:
+        """最終更新が older_than（time.time()）より前のセッションを消し、その数を返す"""
+
+    def maybe_prune(self) -> int:
+        """前回から PRUNE_INTERVAL 以上たっていれば TTL 切れを消す（ttl_seconds <= 0 で消さない）"""
+        now = time.time()
+        if self.ttl_seconds <= 0 or now < self._next_prune:
+            return 0
+        self._next_prune = now + PRUNE_INTERVAL
+        return self.prune(now - self.ttl_seconds)
+
+
+class MemoryGameStore(GameStore):
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._lock = threading.Lock()
+        # session_id → (バージョン, データ, 更新時刻)
+        self._rows: Dict[str, Tuple[int, bytes, float]] = {}
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            row = self._rows.get(session_id)
+            return row[0] if row else 0
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            row = self._rows.get(session_id)
+            return (row[0], row[1]) if row else None
+
+    def save(self, session_id: str, data: bytes, expected_version: int) -> int:
+        with self._lock:
+            row = self._rows.get(session_id)
+            current = row[0] if row else 0
+            if current != expected_version:
+                raise VersionConflict(f"{session_id}: expected v{expected_version}, found v{current}")
+            version = current + 1 if row else _initial_version()
+            self._rows[session_id] = (version, data, time.time())
+            return version
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._rows.pop(session_id, None)
+
+    def prune(self, older_than: float) -> int:
+        with self._lock:
+            expired = [sid for sid, row in self._rows.items() if row[2] < older_than]
+            for sid in expired:
+                del self._rows[sid]
+            return len(expired)
+
+
+class SQLiteGameStore(GameStore):
+    """WAL モードの SQLite。接続はスレッドごとに持つ"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, busy_timeout_ms: int = 5000,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: 1文ごとに自動コミット（書き込みは1回の UPDATE / INSERT）
+            conn = sqlite3.connect(self.path, isolation_level=None,
+                                   timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def version(self, session_id: str) -> int:
+        row = self._conn().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._conn().execute(
+            "SELECT version, data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def save(self, session_id: str, data: bytes, expected_version: int) -> int:
+        conn = self._conn()
+        if expected_version == 0:
+            new_version = _initial_version()
+            cursor = conn.execute(
+                "INSERT INTO sessions (session_id, version, data, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(session_id) DO NOTHING",
+                (session_id, new_version, data, time.time()))
+        else:
+            new_version = expected_version + 1
+            cursor = conn.execute(
+                "UPDATE sessions SET version = version + 1, data = ?, updated_at = ?"
+                " WHERE session_id = ? AND version = ?",
+                (data, time.time(), session_id, expected_version))
+        if cursor.rowcount == 0:
+            raise VersionConflict(f"{session_id}: expected v{expected_version}, "
+                                  f"found v{self.version(session_id)}")
+        return new_version
+
+    def delete(self, session_id: str) -> None:
+        self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def prune(self, older_than: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM sessions WHERE updated_at < ?", (older_than,)).rowcount
+
+
+def store_from_env() -> GameStore:
+    """GAME_STORE=memory（既定）| sqlite、GAME_STORE_TTL=秒（0 で期限なし）"""
+    kind = os.getenv("GAME_STORE", "memory").lower()
+    ttl = float(os.getenv("GAME_STORE_TTL", DEFAULT_TTL_SECONDS))
+    if kind == "sqlite":
+        return SQLiteGameStore(os.getenv("GAME_STORE_PATH", DEFAULT_STORE_PATH), ttl_seconds=ttl)
+    if kind != "memory":
+        raise ValueError(f"unknown GAME_STORE: {kind}")
+    return MemoryGameStore(ttl)
+
+
+_store: Optional[GameStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> GameStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = store_from_env()
+        return _store
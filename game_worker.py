@@ -0,0 +1,105 @@
+"""
+セッションごとのゲーム進行ワーカー
+AIの手番・自発アクション・AIのズルをバックグラウンドのスレッドで進め、
+Streamlit のスクリプトスレッドは LLM の応答待ちでブロックされない
+
+- DaifugoGame の変更はすべて lock の中で行う（UI 側は mutate() を使う）
+- 1手進むたびに version を上げ、結果を outbox に貯める
+- UI は version が変わったときだけ drain() で結果を受け取って再描画する
+
+    worker = GameWorker(game, ai).start()
+    with worker.mutate() as game:
+        game.play_cards("Player 1", cards)
+    worker.kick()
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from game_logic import DaifugoGame
+from turn_runner import HUMAN_PLAYER, MAX_STEPS, TurnBatch, ai_turn_pending, step_ai
+
+
+class GameWorker:
+    """1セッション分のゲームを進めるスレッド"""
+
+    def __init__(self, game: DaifugoGame, ai, human: str = HUMAN_PLAYER):
+        self.game = game
+        self.ai = ai
+        self.human = human
+        self.lock = threading.RLock()
+        self.version = 0
+        self._outbox = TurnBatch()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thinking = False
+        self._thread = threading.Thread(target=self._run, name="game-worker", daemon=True)
+
+    def start(self) -> "GameWorker":
+        self._thread.start()
+        self.kick()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+
+    def kick(self) -> None:
+        """AIが進められる手番があれば進めさせる"""
+        with self.lock:
+            if not ai_turn_pending(self.game, self.human):
+                return
+            self._thinking = True
+        self._wake.set()
+
+    @property
+    def busy(self) -> bool:
+        return self._thinking
+
+    @contextmanager
+    def mutate(self) -> Iterator[DaifugoGame]:
+        """UI 側からゲームを変更するときに使う（抜けると version を上げる）"""
+        with self.lock:
+            yield self.game
+            self.version += 1
+
+    def drain(self) -> TurnBatch:
+        """前回の drain 以降に進んだ分を受け取る"""
+        with self.lock:
+            batch, self._outbox = self._outbox, TurnBatch()
+            return batch
+
+    # -------------------------------------------------------------------
+    # スレッド本体
+    # -------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            with self.lock:
+                self._thinking = True
+            steps = 0
+            while not self._stopped.is_set() and steps < MAX_STEPS:
+                batch = TurnBatch()
+                try:
+                    progressed = step_ai(self.game, self.ai, batch, self.human, lock=self.lock)
+                except Exception as e:
+                    batch.warnings.append(f"AI進行エラー: {e}")
+                    progressed = False
+                self._publish(batch)
+                if not progressed:
+                    break
+                steps += 1
+            with self.lock:
+                # 進行中に kick されていればもう一周する
+                self._thinking = self._wake.is_set()
+                self.version += 1
+
+    def _publish(self, batch: TurnBatch) -> None:
+        if not batch.events and not batch.warnings and not batch.action_results:
+            return
+        with self.lock:
+            self._outbox.merge(batch)
+            self.version += 1
@@ -0,0 +1,135 @@
+"""
+初回表示までのインポート時間の計測
+新しいワーカープロセスが app.py を読み込むのにかかる時間を `python -X importtime` で測り、
+重いモジュールと、初回表示で読み込んではいけないモジュール（ai_player・mistralai）を調べる。
+
+    python import_bench.py                                   # app を 5 回測って中央値
+    python import_bench.py --out .cache/importtime.json
+    python import_bench.py --baseline .cache/importtime.json # 前回と比べる
+    python import_bench.py --module game_worker --budget-ms 50
+
+1回目は .pyc の生成を含むので捨てる（実際のワーカーも2回目以降の状態で起動する）。
+禁止モジュールが読み込まれた・--budget-ms を超えた・--baseline より --tolerance 以上遅くなった
+ときは終了コード 1。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# AI を使わない初回表示では読み込まないモジュール（先頭のパッケージ名で判定）
+DEFAULT_FORBIDDEN = ("ai_player", "mistralai")
+
+# (モジュール名, 入れ子の深さ, 自身の時間 [us], 累計 [us])
+ImportRow = Tuple[str, int, int, int]
+
+
+def parse_importtime(stderr: str) -> List[ImportRow]:
+    """-X importtime の出力を行ごとに読む（ヘッダや他の出力は無視する）"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def measure_once(module: str) -> List[ImportRow]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=ROOT, env=env)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["(no output)"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(module: str, runs: List[List[ImportRow]], top: int) -> Dict:
+    # 対象モジュールの累計時間（対象が最後に出る深さ 0 の行）
+    totals = [next(cum for name, depth, _, cum in reversed(rows) if name == module and depth == 0)
+              for rows in runs]
+    # パッケージ（先頭の名前）ごとの自身の時間。中央値の run で集計する
+    median_run = sorted(runs, key=lambda rows: sum(r[2] for r in rows))[len(runs) // 2]
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in median_run:
+        by_package[name.split(".")[0]] += self_us
+    heaviest = sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+    return {
+        "module": module,
+        "runs": len(runs),
+        "total_ms": {
+            "median": round(statistics.median(totals) / 1000, 2),
+            "min": round(min(totals) / 1000, 2),
+            "max": round(max(totals) / 1000, 2),
+        },
+        "modules_loaded": len(median_run),
+        "heaviest_packages_ms": {name: round(us / 1000, 2) for name, us in heaviest},
+        "loaded": sorted({name for name, _, _, _ in median_run}),
+    }
+
+
+def forbidden_loaded(report: Dict, forbidden: List[str]) -> List[str]:
+    packages = {name.split(".")[0] for name in report["loaded"]}
+    return [name for name in forbidden if name in packages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="初回表示までのインポート時間の計測")
+    parser.add_argument("--module", default="app", help="読み込むモジュール（既定 app）")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="表示する重いパッケージの数")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN),
+                        help="読み込まれたら失敗にするパッケージ")
+    parser.add_argument("--budget-ms", type=float, help="中央値の上限")
+    parser.add_argument("--out", help="レポート（JSON）の保存先")
+    parser.add_argument("--baseline", help="比較する前回のレポート")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    try:
+        measure_once(args.module)   # .pyc を作るための空回し
+        runs = [measure_once(args.module) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    report = summarize(args.module, runs, args.top)
+
+    summary = {k: v for k, v in report.items() if k != "loaded"}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"保存: {args.out}")
+
+    failures = [f"読み込まれた: {name}" for name in forbidden_loaded(report, args.forbid)]
+    median = report["total_ms"]["median"]
+    if args.budget_ms is not None and median > args.budget_ms:
+        failures.append(f"上限超過: {median} ms > {args.budget_ms} ms")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            before = json.load(f)["total_ms"]["median"]
+        if before and (median - before) / before > args.tolerance:
+            failures.append(f"悪化: {before} → {median} ms (+{(median - before) / before:.0%})")
+    for line in failures:
+        print(line)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+LLM 呼び出しのガード
+呼び出し種別ごとのデッドライン・サーキットブレーカー・ヘッジリクエスト
+
+デッドラインを過ぎた呼び出しは DeadlineExceeded を送出して呼び出し元の
+フォールバックに任せる。裏で走っているスレッドは止められないので、
+応答は捨てられるだけ（連続失敗はブレーカーが遮断する）。
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+# 呼び出し種別ごとのレイテンシ上限（秒）
+CALL_DEADLINES: Dict[str, float] = {
+    "personality": 8.0,
+    "chat": 6.0,
+    "observation": 5.0,
+    "move": 4.0,
+    "counter_measure": 3.0,
+    "contest": 4.0,
+    "summary": 10.0,
+}
+DEFAULT_DEADLINE = 5.0
+
+# ヘッジ（同じリクエストの複製送信）を始めるまでの待ち時間（秒）
+HEDGE_AFTER: Dict[str, float] = {
+    "move": 1.5,
+}
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-call")
+
+
+class LLMUnavailable(Exception):
+    """LLM を使わずフォールバックすべき状況"""
+
+
+class DeadlineExceeded(LLMUnavailable, TimeoutError):
+    """デッドラインまでに応答がなかった"""
+
+
+class CircuitOpenError(LLMUnavailable):
+    """ブレーカーが開いていて呼び出しを遮断した"""
+
+
+# -----------------------------------------------------------------------
+# サーキットブレーカー
+# -----------------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    連続失敗が閾値に達したら一定時間すべての呼び出しを遮断する。
+    遮断明け（half_open）は1件だけ試し、成功で復帰・失敗で再遮断。
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """
+        成功とも失敗とも数えずに終わった呼び出し（混雑で間引かれた・送信前に時間切れ）の後に呼ぶ。
+        half_open の試行枠を返し、次の呼び出しが改めて試せるようにする
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# -----------------------------------------------------------------------
+# デッドライン付き実行
+# -----------------------------------------------------------------------
+
+def run_with_deadline(fn: Callable[[], T], timeout: float,
+                      hedge_after: Optional[float] = None,
+                      submit: Optional[Callable[[Callable[[], T]], Future]] = None) -> T:
+    """
+    fn を別スレッドで実行し、timeout 秒以内の結果を返す。
+    hedge_after を指定すると、その時間内に終わらなければ同じ fn をもう1本投げ、
+    先に成功した方を採用する。submit で投入先（スケジューラなど）を差し替えられる。
+    """
+    submit = submit or _executor.submit
+    deadline = time.monotonic() + timeout
+    pending = {submit(fn)}
+    hedged = hedge_after is None or hedge_after >= timeout
+    last_error: Optional[BaseException] = None
+
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait_for = remaining if hedged else min(remaining, hedge_after)
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                return future.result()
+            last_error = error
+        if not hedged and not done:
+            hedged = True
+            pending.add(submit(fn))
+
+    if pending:
+        for future in pending:
+            future.cancel()  # まだキューにいるものは実行させない
+        raise DeadlineExceeded(f"no response within {timeout:.1f}s")
+    raise last_error
+
+
+def deadline_for(call_type: str) -> float:
+    return CALL_DEADLINES.get(call_type, DEFAULT_DEADLINE)
@@ -0,0 +1,240 @@
+"""
+LLM 呼び出しの計測
+呼び出し種別ごとのレイテンシ・トークン数ヒストグラムと失敗カウンタ
+
+    with track_call("move") as call:
+        response = client.chat.complete(...)
+        call.set_usage(response)
+        if not parsed:
+            call.parse_failed()
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048)
+
+# 呼び出し種別ごとのカウンタ名
+COUNTERS = ("calls", "errors", "timeouts", "parse_failures", "cache_hits")
+
+
+class Histogram:
+    """累積バケット方式のヒストグラム（Prometheus 互換）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """バケット境界から分位点を概算する（バケット超過は最大境界を返す）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            if cumulative >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": buckets,
+        }
+
+
+class _CallTypeMetrics:
+    def __init__(self):
+        self.counters: Dict[str, int] = {name: 0 for name in COUNTERS}
+        self.histograms: Dict[str, Histogram] = {
+            "latency_seconds": Histogram(LATENCY_BUCKETS),
+            "prompt_tokens": Histogram(TOKEN_BUCKETS),
+            "completion_tokens": Histogram(TOKEN_BUCKETS),
+        }
+
+
+class MetricsRegistry:
+    """プロセス内のメトリクスレジストリ（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_type: Dict[str, _CallTypeMetrics] = {}
+
+    def _get(self, call_type: str) -> _CallTypeMetrics:
+        metrics = self._by_type.get(call_type)
+        if metrics is None:
+            metrics = self._by_type[call_type] = _CallTypeMetrics()
+        return metrics
+
+    def inc(self, call_type: str, counter: str, n: int = 1) -> None:
+        with self._lock:
+            counters = self._get(call_type).counters
+            counters[counter] = counters.get(counter, 0) + n
+
+    def observe(self, call_type: str, histogram: str, value: float,
+                buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        with self._lock:
+            histograms = self._get(call_type).histograms
+            if histogram not in histograms:
+                histograms[histogram] = Histogram(buckets)
+            histograms[histogram].observe(value)
+
+    def record_cache_hit(self, call_type: str) -> None:
+        self.inc(call_type, "cache_hits")
+
+    def record_parse_failure(self, call_type: str) -> None:
+        self.inc(call_type, "parse_failures")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_type.clear()
+
+    def call_types(self) -> List[str]:
+        with self._lock:
+            return sorted(self._by_type)
+
+    # -------------------------------------------------------------------
+    # エクスポート
+    # -------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                call_type: {
+                    "counters": dict(m.counters),
+                    "histograms": {name: h.to_dict() for name, h in m.histograms.items()},
+                }
+                for call_type, m in sorted(self._by_type.items())
+            }
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self, prefix: str = "daifugo_llm", label: str = "call_type") -> str:
+        """Prometheus テキスト形式で書き出す（label はキーのラベル名）"""
+        data = self.to_dict()
+        lines: List[str] = []
+
+        counter_names = sorted({c for m in data.values() for c in m["counters"]})
+        for counter in counter_names:
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for call_type, m in data.items():
+                if counter in m["counters"]:
+                    lines.append(f'{name}{{{label}="{call_type}"}} {m["counters"][counter]}')
+
+        hist_names = sorted({h for m in data.values() for h in m["histograms"]})
+        for hist in hist_names:
+            name = f"{prefix}_{hist}"
+            lines.append(f"# TYPE {name} histogram")
+            for call_type, m in data.items():
+                h = m["histograms"].get(hist)
+                if not h:
+                    continue
+                for bound, cumulative in h["buckets"].items():
+                    lines.append(f'{name}_bucket{{{label}="{call_type}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{call_type}"}} {h["sum"]}')
+                lines.append(f'{name}_count{{{label}="{call_type}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# -----------------------------------------------------------------------
+# 呼び出し計測用コンテキストマネージャ
+# -----------------------------------------------------------------------
+
+# 呼び出しごとに (call_type, 秒数) を受け取る関数（再実行プロファイラなど）
+_call_observers: List[Callable[[str, float], None]] = []
+
+
+def add_call_observer(observer: Callable[[str, float], None]) -> None:
+    """track_call を抜けるたびに observer を呼ぶ（呼び出したスレッドで実行される）"""
+    if observer not in _call_observers:
+        _call_observers.append(observer)
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) or "timeout" in type(exc).__name__.lower()
+
+
+class CallRecord:
+    """track_call 内で使う1回分の呼び出し記録"""
+
+    def __init__(self, call_type: str, registry: MetricsRegistry):
+        self.call_type = call_type
+        self.registry = registry
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.latency: float = 0.0
+        self._start = time.perf_counter()
+
+    def set_usage(self, response) -> None:
+        """SDK レスポンスの usage からトークン数を取り出す"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_tokens", None)
+        self.completion_tokens = getattr(usage, "completion_tokens", None)
+
+    def elapsed(self) -> float:
+        """track_call に入ってからの経過秒数"""
+        return time.perf_counter() - self._start
+
+    def parse_failed(self) -> None:
+        self.registry.record_parse_failure(self.call_type)
+
+    def cache_hit(self) -> None:
+        self.registry.record_cache_hit(self.call_type)
+
+
+@contextmanager
+def track_call(call_type: str, registry: Optional[MetricsRegistry] = None) -> Iterator[CallRecord]:
+    """
+    LLM 呼び出し1回を計測する。例外は記録したうえでそのまま送出する。
+    新しい呼び出し箇所もこれで囲めば同じメトリクスに載る。
+    """
+    registry = registry or REGISTRY
+    record = CallRecord(call_type, registry)
+    registry.inc(call_type, "calls")
+    try:
+        yield record
+    except BaseException as e:
+        if getattr(e, "counts_as_error", True):
+            registry.inc(call_type, "timeouts" if _is_timeout(e) else "errors")
+        raise
+    finally:
+        record.latency = record.elapsed()
+        registry.observe(call_type, "latency_seconds", record.latency)
+        for observer in _call_observers:
+            observer(call_type, record.latency)
+        if record.prompt_tokens is not None:
+            registry.observe(call_type, "prompt_tokens", record.prompt_tokens, TOKEN_BUCKETS)
+        if record.completion_tokens is not None:
+            registry.observe(call_type, "completion_tokens", record.completion_tokens, TOKEN_BUCKETS)
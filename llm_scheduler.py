@@ -0,0 +1,195 @@
+"""
+LLM リクエストの優先度付きスケジューラとレートリミッタ
+同じ API キーを共有する全テーブルの呼び出しを1つのキューで捌く
+
+- CRITICAL: ターン進行に直結（decide_move・ズル判定・対策生成）
+- NORMAL  : 待たせてもよいが捨てない（キャラ生成）
+- LOW     : 演出用（チャット返答・観察ヒント・会話要約）。混雑時は先に捨てる
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Tuple
+
+from llm_guard import LLMUnavailable
+from llm_metrics import REGISTRY, MetricsRegistry
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    NORMAL = 1
+    LOW = 2
+
+
+CALL_PRIORITIES: Dict[str, Priority] = {
+    "move": Priority.CRITICAL,
+    "contest": Priority.CRITICAL,
+    "counter_measure": Priority.CRITICAL,
+    "personality": Priority.NORMAL,
+    "chat": Priority.LOW,
+    "observation": Priority.LOW,
+    "summary": Priority.LOW,
+}
+
+# 優先度ごとのキュー待ち上限（秒）。超えたら実行せずに捨てる
+MAX_QUEUE_WAIT: Dict[Priority, Optional[float]] = {
+    Priority.CRITICAL: None,
+    Priority.NORMAL: 10.0,
+    Priority.LOW: 2.0,
+}
+
+# LOW はキューがこの深さ以上なら受け付けない
+LOW_SHED_DEPTH = 8
+
+DEFAULT_RATE = float(os.getenv("MISTRAL_RATE_LIMIT_RPS", "5"))
+DEFAULT_BURST = int(os.getenv("MISTRAL_RATE_LIMIT_BURST", "10"))
+DEFAULT_WORKERS = int(os.getenv("MISTRAL_SCHEDULER_WORKERS", "8"))
+
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class RequestShed(LLMUnavailable):
+    """混雑のためリクエストを捨てた（呼び出し元でフォールバック）"""
+    counts_as_error = False  # shed カウンタで別に数える
+
+
+# -----------------------------------------------------------------------
+# トークンバケット
+# -----------------------------------------------------------------------
+
+class TokenBucket:
+    """rate 件/秒で補充され、最大 burst 件まで貯まるバケット"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """取得できれば 0、できなければ次のトークンまでの秒数を返す"""
+        with self._lock:
+            self._refill_locked()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        while True:
+            wait_for = self.try_acquire()
+            if wait_for <= 0:
+                return
+            time.sleep(wait_for)
+
+    def refund(self) -> None:
+        """使わなかったトークンを戻す"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill_locked()
+            return self._tokens
+
+
+# -----------------------------------------------------------------------
+# スケジューラ
+# -----------------------------------------------------------------------
+
+class LLMScheduler:
+    """優先度キュー + トークンバケット + ワーカースレッド"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 workers: int = DEFAULT_WORKERS,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.metrics = metrics or REGISTRY
+        self._queue: List[Tuple[int, int, float, str, Callable, Future]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._depth_by_priority: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"llm-scheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._workers:
+            t.start()
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._cond:
+            return {p.name.lower(): n for p, n in self._depth_by_priority.items()}
+
+    def submit(self, call_type: str, fn: Callable) -> Future:
+        """
+        fn をキューに積み Future を返す。LOW が混雑していれば RequestShed を送出する。
+        """
+        priority = CALL_PRIORITIES.get(call_type, Priority.NORMAL)
+        future: Future = Future()
+        with self._cond:
+            depth = len(self._queue)
+            self.metrics.observe(call_type, "queue_depth", depth, QUEUE_DEPTH_BUCKETS)
+            if priority == Priority.LOW and depth >= LOW_SHED_DEPTH:
+                self.metrics.inc(call_type, "shed")
+                raise RequestShed(f"{call_type}: queue depth {depth}")
+            heapq.heappush(self._queue, (int(priority), next(self._seq),
+                                         time.monotonic(), call_type, fn, future))
+            self._depth_by_priority[priority] += 1
+            self._cond.notify()
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # トークンを先に確保してから最優先の1件を取り出す
+            self.bucket.acquire()
+            with self._cond:
+                if not self._queue:
+                    self.bucket.refund()
+                    continue
+                priority, _, enqueued_at, call_type, fn, future = heapq.heappop(self._queue)
+                self._depth_by_priority[Priority(priority)] -= 1
+
+            if not future.set_running_or_notify_cancel():
+                self.bucket.refund()  # 呼び出し元がデッドラインで諦めた
+                continue
+
+            waited = time.monotonic() - enqueued_at
+            max_wait = MAX_QUEUE_WAIT.get(Priority(priority))
+            if max_wait is not None and waited > max_wait:
+                self.bucket.refund()
+                self.metrics.inc(call_type, "shed")
+                future.set_exception(RequestShed(f"{call_type}: waited over {max_wait}s"))
+                continue
+
+            self.metrics.observe(call_type, "queue_wait_seconds", waited)
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+
+_default_scheduler: Optional[LLMScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> LLMScheduler:
+    """キー単位のスケジューラを持たない呼び出し元（注入クライアントなど）用"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+        return _default_scheduler
@@ -0,0 +1,295 @@
+"""
+同時セッションの負荷試験
+Streamlit の AppTest で app.py のセッションを複数同時に立ち上げ、それぞれ最後までゲームを遊ばせる。
+AI はモック（MISTRAL_MOCK=1）で動かすので API キーも通信も要らない。
+
+    python loadtest.py --sessions 20 --concurrency 8 --games 2 --out .cache/loadtest.json
+    python loadtest.py --sessions 20 --baseline .cache/loadtest.json   # 前回と比べる
+    python loadtest.py --smoke        # 1セッション1ゲームを直列で（変更のたびの確認用）
+
+記録するもの:
+  - 再実行のレイテンシ（p50 / p95 / p99 / 最大）
+  - セッションあたりのメモリ（SessionSlot の常駐バイト数・圧縮後バイト数）と最大 RSS
+  - プロセス全体の CPU 時間（合計・再実行あたり）
+
+--concurrency は同時に進めるセッション数。AppTest の実行はプロセス内で1つずつしか走れないので、
+重なるのは各セッションの進行ワーカー（AI の手番）と返答プールの処理。
+
+人間役は常に最弱の出せる手を出し、ズルは見送る。配札・判定はプロセス共有の random、
+モックの返答は共有クライアントの乱数を全セッションと進行ワーカーが引くので、同じ引数・
+同じシードで作業量が一致するのは --concurrency 1 のときだけ。並列の結果は同じ設定どうしでも揺れる
+（レポートの config.reproducible が false になる）。
+途中で落ちたセッションが1つでもあれば終了コード 1（--smoke はこれだけを見る）。
+--baseline を渡すと p95 と CPU/再実行 の悪化率を出し、--tolerance を超えたら終了コード 1。
+設定が違うレポートと比べたときは、その旨を表示する。
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+# アプリを読み込む前にモックと設定を決める
+os.environ.setdefault("MISTRAL_MOCK", "1")
+os.environ.setdefault("MISTRAL_MOCK_SEED", "0")
+os.environ.setdefault("SESSION_IDLE_SECONDS", "0")
+
+# AppTest は実行のたびにプロセス共通の Runtime を差し替えて最後に消すので、
+# スクリプトの実行は同時に1つまで（待ち時間は再実行のレイテンシに含めない）
+_APPTEST_LOCK = threading.Lock()
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+HUMAN = "Player 1"
+
+
+@dataclass
+class SessionResult:
+    session: int
+    games: int = 0
+    reruns: int = 0
+    rerun_seconds: List[float] = field(default_factory=list)
+    resident_bytes: int = 0
+    compact_bytes: int = 0
+    error: Optional[str] = None
+
+
+# -----------------------------------------------------------------------
+# 1セッションの操作
+# -----------------------------------------------------------------------
+
+class SessionDriver:
+    """AppTest 1つ分。ボタンを押して再実行し、その時間を記録する"""
+
+    def __init__(self, index: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.result = SessionResult(session=index)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+    def run(self, widget=None) -> None:
+        with _APPTEST_LOCK:
+            start = time.perf_counter()
+            (widget or self.at).run()
+            self.result.rerun_seconds.append(time.perf_counter() - start)
+        self.result.reruns += 1
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def click(self, label: str) -> None:
+        button = next(b for b in self.at.button if b.label == label)
+        self.run(button.click())
+
+    @property
+    def slot(self):
+        return self.at.session_state["session_slot"]
+
+    def wait_for_ai(self, timeout: float) -> None:
+        """
+        ワーカーがAIの手番を進め終わるのを待ち、進んだ分を画面に取り込む
+        （UI のポーリングと同じく、version が表示済みと違えば再実行する）
+        """
+        deadline = time.monotonic() + timeout
+        worker = self.slot.worker
+        while worker is not None and worker.busy and time.monotonic() < deadline:
+            time.sleep(0.005)
+        worker = self.slot.worker
+        if worker is not None and worker.version != self.at.session_state["worker_seen_version"]:
+            self.run()
+
+    def start_game(self, num_players: int) -> None:
+        self.at.sidebar.slider[0].set_value(num_players)
+        self.click("🎮 ゲームを開始")
+
+    def play_human_turn(self) -> None:
+        game = self.slot.game
+        moves = [m for m in game.get_valid_moves(HUMAN) if m]
+        if not moves:
+            self.click("🚫 パス")
+            return
+        weakest = min(moves, key=lambda m: (m[0].get_rank_value(), len(m)))
+        self.run(self.at.multiselect[0].set_value([str(c) for c in weakest]))
+        self.click("🎯 カードを出す")
+
+    def record_footprint(self) -> None:
+        footprint = self.slot.footprint()
+        self.result.resident_bytes = max(self.result.resident_bytes, footprint["resident_bytes"])
+        self.result.compact_bytes = max(self.result.compact_bytes, footprint["compact_bytes"])
+
+
+def play_session(index: int, args: argparse.Namespace) -> SessionResult:
+    from models import GameState
+    from turn_runner import ai_turn_pending
+
+    driver = SessionDriver(index, args.timeout)
+    try:
+        driver.run()
+        driver.start_game(args.players)
+        steps = 0
+        while driver.result.games < args.games and steps < args.max_steps:
+            steps += 1
+            driver.wait_for_ai(args.timeout)
+            game = driver.slot.game
+            if game.game_state == GameState.GAME_OVER:
+                driver.record_footprint()
+                driver.result.games += 1
+                if driver.result.games < args.games:
+                    driver.click("🔄 新しいゲームを開始")
+                    driver.start_game(args.players)
+                continue
+            if ai_turn_pending(game):
+                driver.run()    # UI のポーリングでの再実行に相当
+            elif game.game_state == GameState.CHEAT_PHASE:
+                driver.click("😇 見送る")
+            else:
+                driver.play_human_turn()
+    except Exception as e:
+        driver.result.error = f"{type(e).__name__}: {e}"
+    return driver.result
+
+
+# -----------------------------------------------------------------------
+# 集計
+# -----------------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(APP_PATH)).stdout.strip()
+    except OSError:
+        return ""
+
+
+def build_report(args: argparse.Namespace, results: List[SessionResult],
+                 wall_seconds: float, cpu_seconds: float) -> Dict:
+    latencies = [s for r in results for s in r.rerun_seconds]
+    reruns = sum(r.reruns for r in results)
+    ok = [r for r in results if r.error is None]
+    # ru_maxrss は Linux では KB 単位
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        "config": {
+            "sessions": args.sessions, "concurrency": args.concurrency, "games": args.games,
+            "players": args.players, "seed": args.seed,
+            "mock_latency": os.getenv("MISTRAL_MOCK_LATENCY", "none"),
+            "reproducible": args.concurrency == 1,
+            "revision": _git_revision(), "python": sys.version.split()[0],
+        },
+        "sessions": {"completed": len(ok), "failed": len(results) - len(ok),
+                     "errors": sorted({r.error for r in results if r.error})},
+        "games": sum(r.games for r in results),
+        "reruns": reruns,
+        "rerun_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies, default=0.0) * 1000, 2),
+        },
+        "memory": {
+            "resident_bytes_per_session": round(sum(r.resident_bytes for r in ok) / len(ok)) if ok else 0,
+            "compact_bytes_per_session": round(sum(r.compact_bytes for r in ok) / len(ok)) if ok else 0,
+            "max_rss_bytes": max_rss,
+        },
+        "cpu": {
+            "seconds": round(cpu_seconds, 3),
+            "ms_per_rerun": round(cpu_seconds / reruns * 1000, 3) if reruns else 0.0,
+            "wall_seconds": round(wall_seconds, 3),
+        },
+        "per_session": [
+            {k: v for k, v in asdict(r).items() if k != "rerun_seconds"} for r in results
+        ],
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """baseline より tolerance（割合）以上悪化した指標を返す"""
+    regressions = []
+    checks = (("rerun_ms", "p95"), ("cpu", "ms_per_rerun"),
+              ("memory", "resident_bytes_per_session"))
+    for section, key in checks:
+        before, after = baseline[section][key], report[section][key]
+        if before and (after - before) / before > tolerance:
+            regressions.append(f"{section}.{key}: {before} → {after} "
+                               f"(+{(after - before) / before:.0%})")
+    return regressions
+
+
+# 比べる前に一致しているべき設定
+_COMPARABLE_KEYS = ("sessions", "concurrency", "games", "players", "seed", "mock_latency")
+
+
+def config_mismatches(report: Dict, baseline: Dict) -> List[str]:
+    before, after = baseline.get("config", {}), report["config"]
+    return [f"{key}: {before.get(key)} → {after.get(key)}"
+            for key in _COMPARABLE_KEYS if before.get(key) != after.get(key)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py の同時セッション負荷試験")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--games", type=int, default=1, help="セッションごとのゲーム数")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-steps", type=int, default=2000)
+    parser.add_argument("--out", help="レポート（JSON）の保存先")
+    parser.add_argument("--baseline", help="比較する前回のレポート")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--smoke", action="store_true",
+                        help="--sessions 1 --concurrency 1 --games 1 で回す")
+    args = parser.parse_args()
+    if args.smoke:
+        args.sessions, args.concurrency, args.games = 1, 1, 1
+
+    random.seed(args.seed)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda i: play_session(i, args), range(args.sessions)))
+    report = build_report(args, results, time.perf_counter() - wall_start,
+                          time.process_time() - cpu_start)
+
+    summary = {k: report[k] for k in ("sessions", "games", "reruns", "rerun_ms", "memory", "cpu")}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"保存: {args.out}")
+
+    if report["sessions"]["failed"]:
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for line in config_mismatches(report, baseline):
+            print(f"設定が違います（比較は参考値）: {line}")
+        if not report["config"]["reproducible"]:
+            print("--concurrency が 1 でないため、同じ設定でも作業量は揺れます")
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"悪化: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
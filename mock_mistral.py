@@ -0,0 +1,317 @@
+"""
+Mistral API のローカル代替（負荷試験・ベンチマーク用）
+chat.completions を模倣し、レイテンシ分布・エラー率・トークン計上を設定できる
+
+    python mock_mistral.py --port 8787 --latency lognormal:0.4,0.5 --error-rate 0.05
+    MISTRAL_SERVER_URL=http://127.0.0.1:8787 streamlit run app.py
+
+プロセス内で使う場合は MockMistralClient を MistralAIPlayer(client=...) に渡すか、
+MISTRAL_MOCK=1 を設定する（MISTRAL_MOCK_LATENCY / MISTRAL_MOCK_ERROR_RATE も参照）。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from prompt_builder import estimate_tokens
+
+
+# -----------------------------------------------------------------------
+# レイテンシ分布
+# -----------------------------------------------------------------------
+
+class LatencyModel:
+    """
+    応答遅延の分布。仕様文字列で指定する:
+      "none" / "fixed:0.3" / "uniform:0.1,0.8" / "lognormal:中央値,sigma"
+    """
+
+    def __init__(self, spec: str = "none"):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.params = [float(x) for x in args.split(",") if x]
+        if kind not in ("none", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"unknown latency spec: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma)
+        return 0.0
+
+
+class MockAPIError(Exception):
+    """注入されたエラー（HTTP ステータス付き）"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+# -----------------------------------------------------------------------
+# 応答生成
+# -----------------------------------------------------------------------
+
+_NAMES = ["謎の田中", "陽気な佐藤", "冷静な鈴木", "毒舌の高橋", "天然の伊藤",
+          "策士の渡辺", "熱血の山本", "慎重な中村", "気まぐれ小林", "無口な加藤"]
+_STYLES = ["丁寧語で話す。", "友達口調。「〜じゃん」が口癖。", "謎めいた口調。",
+           "関西弁で話す。", "ぶっきらぼうな口調。"]
+_REPLIES = ["ふふ、どうだろうね。", "それはまだ秘密だよ。", "悪くない提案ですね。",
+            "油断しないほうがいいよ？", "なるほど、考えておく。", "今はカードに集中したいな。"]
+_HINTS = ["強いカードを温存しているようだ。", "ペアを崩したくなさそうだ。",
+          "そろそろ勝負に出そうな気配がある。", "手札の枚数の割に余裕がある。"]
+_COUNTERS = ["手札を胸に抱えて隠す", "相手の手元から目を離さない",
+             "わざと隙を見せて罠にかける", "カードをしっかり守る"]
+_EFFECTS = {"盗み見": "peek", "覗": "peek", "入れ替え": "swap", "交換": "swap",
+            "妨害": "skip", "押し付け": "extra_cards"}
+
+
+def classify_prompt(messages: List[Dict]) -> str:
+    """プロンプトの種類を判定する（MistralAIPlayer の呼び出し種別と同じ名前）"""
+    text = "\n".join(str(m.get("content", "")) for m in messages)
+    if "キャラクター設定" in text:
+        return "personality"
+    if "会話を要約" in text:
+        return "summary"
+    if "ズル対決を評価" in text:
+        return "contest"
+    if "対策の一文" in text:
+        return "counter_measure"
+    if re.search(r"番号（0-\d+）", text):
+        return "move"
+    if "観察" in text and not any(m.get("role") == "system" for m in messages):
+        return "observation"
+    if any(m.get("role") == "system" for m in messages):
+        return "chat"
+    return "other"
+
+
+class MockResponder:
+    """プロンプトの種類ごとにそれらしい応答を返す"""
+
+    def __init__(self, latency: str = "none", error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None,
+                 sleep: bool = True):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _draw(self):
+        with self._lock:
+            return self.latency.sample(self._rng), self._rng.random(), self._rng.random()
+
+    def _account(self, family: str, key: str, n: int = 1) -> None:
+        with self._lock:
+            row = self.stats.setdefault(family, {"requests": 0, "errors": 0,
+                                                 "prompt_tokens": 0, "completion_tokens": 0})
+            row[key] += n
+
+    def respond(self, messages: List[Dict], max_tokens: int = 200) -> Dict:
+        """1リクエスト分の応答（遅延・エラー込み）を dict で返す"""
+        family = classify_prompt(messages)
+        delay, err_roll, limit_roll = self._draw()
+        self._account(family, "requests")
+        if self.sleep and delay > 0:
+            time.sleep(delay)
+        if limit_roll < self.rate_limit_rate:
+            self._account(family, "errors")
+            raise MockAPIError(429, "rate limit exceeded (injected)")
+        if err_roll < self.error_rate:
+            self._account(family, "errors")
+            raise MockAPIError(500, "internal error (injected)")
+        return self._completion(family, messages, max_tokens)
+
+    def _completion(self, family: str, messages: List[Dict], max_tokens: int) -> Dict:
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        content = self._content(family, text)
+        prompt_tokens = estimate_tokens(text)
+        completion_tokens = min(max_tokens, estimate_tokens(content))
+        self._account(family, "prompt_tokens", prompt_tokens)
+        self._account(family, "completion_tokens", completion_tokens)
+        return {
+            "id": f"mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "mock-mistral",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _content(self, family: str, text: str) -> str:
+        with self._lock:
+            rng = self._rng
+            if family == "personality":
+                return json.dumps({
+                    "character_name": rng.choice(_NAMES),
+                    "personality_desc": "勝負どころを見極めるタイプ。普段は穏やかだが負けず嫌い。",
+                    "speech_style": rng.choice(_STYLES),
+                    "cheat_tendency": round(rng.random(), 2),
+                    "cooperation_tendency": round(rng.random(), 2),
+                    "honesty": round(rng.random(), 2),
+                    "aggression": round(rng.random(), 2),
+                    "backstory": "近所のカード大会の常連。",
+                }, ensure_ascii=False)
+            if family == "move":
+                upper = int(re.search(r"番号（0-(\d+)）", text).group(1))
+                return f"手札を温存しつつ流れを作ります。番号: {rng.randint(0, upper)}"
+            if family == "contest":
+                line = re.search(r"ズルプロンプト: (.*)", text)
+                cheat = line.group(1) if line else ""
+                effect = next((v for k, v in _EFFECTS.items() if k in cheat), "peek")
+                return json.dumps({
+                    "cheat_bonus": rng.randint(0, 3),
+                    "counter_bonus": rng.randint(0, 3),
+                    "effect_type": effect,
+                    "reasoning": "手口と対策が拮抗",
+                }, ensure_ascii=False)
+            if family == "counter_measure":
+                return rng.choice(_COUNTERS)
+            if family == "observation":
+                return rng.choice(_HINTS)
+            if family == "summary":
+                return "互いに探り合いながらも、同盟の可能性を残して雑談を続けている。"
+            return rng.choice(_REPLIES)
+
+
+# -----------------------------------------------------------------------
+# プロセス内クライアント（mistralai.Mistral 互換の最小インターフェース）
+# -----------------------------------------------------------------------
+
+def _to_namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
+
+
+class _MockChat:
+    def __init__(self, responder: MockResponder):
+        self._responder = responder
+
+    def complete(self, model: str = "", messages: Optional[List[Dict]] = None,
+                 temperature: float = 0.7, max_tokens: int = 200, **kwargs):
+        return _to_namespace(self._responder.respond(messages or [], max_tokens))
+
+    async def complete_async(self, model: str = "", messages: Optional[List[Dict]] = None,
+                             temperature: float = 0.7, max_tokens: int = 200, **kwargs):
+        return await asyncio.to_thread(self.complete, model, messages, temperature, max_tokens)
+
+
+class MockMistralClient:
+    """MistralAIPlayer(client=...) に渡せるプロセス内モック"""
+
+    def __init__(self, responder: Optional[MockResponder] = None, **responder_kwargs):
+        self.responder = responder or MockResponder(**responder_kwargs)
+        self.chat = _MockChat(self.responder)
+
+    @classmethod
+    def from_env(cls) -> "MockMistralClient":
+        seed = os.getenv("MISTRAL_MOCK_SEED")
+        return cls(latency=os.getenv("MISTRAL_MOCK_LATENCY", "none"),
+                   error_rate=float(os.getenv("MISTRAL_MOCK_ERROR_RATE", "0")),
+                   seed=int(seed) if seed else None)
+
+
+# -----------------------------------------------------------------------
+# HTTP サーバー
+# -----------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    responder: MockResponder = None  # serve() で差し替える
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"message": f"unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"message": "invalid JSON"})
+            return
+        try:
+            body = self.responder.respond(payload.get("messages", []),
+                                          int(payload.get("max_tokens") or 200))
+        except MockAPIError as e:
+            self._send_json(e.status_code, {"object": "error", "message": str(e)})
+            return
+        self._send_json(200, body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.responder.stats)
+        else:
+            self._send_json(404, {"message": f"unknown path {self.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8787,
+          responder: Optional[MockResponder] = None) -> ThreadingHTTPServer:
+    """サーバーを作って返す（serve_forever は呼び出し側で）"""
+    handler = type("MockHandler", (_Handler,), {"responder": responder or MockResponder()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mistral chat.completions のローカルモック")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", default="none",
+                        help='"fixed:0.3" / "uniform:0.1,0.8" / "lognormal:0.4,0.5"')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    responder = MockResponder(latency=args.latency, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    server = serve(args.host, args.port, responder)
+    print(f"mock Mistral listening on http://{args.host}:{args.port}  (GET /stats で集計)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+呼び出し種別ごとのモデルルーティング
+種別ごとに「段（tier）」の昇格順を決め、安い段から使う
+
+- local  : API を呼ばずテンプレート・ヒューリスティックで返す
+- small / medium / large : Mistral のモデル
+
+パース失敗や確信度が低いときだけ次の段に昇格する。
+段ごとのレイテンシ・トークン数・推定コストを TIER_METRICS に記録するので、
+その実測を見てルートを決める（MISTRAL_ROUTES で上書き可）:
+
+    MISTRAL_ROUTES='{"counter_measure": ["local"], "move": ["small", "large"]}'
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+from llm_metrics import MetricsRegistry, TOKEN_BUCKETS
+
+
+LOCAL = "local"
+
+TIER_MODELS: Dict[str, Optional[str]] = {
+    LOCAL: None,
+    "small": "mistral-small-latest",
+    "medium": "mistral-medium-latest",
+    "large": "mistral-large-latest",
+}
+
+# 100万トークンあたりの推定単価（USD, 入力 / 出力）
+TIER_PRICES: Dict[str, tuple] = {
+    LOCAL: (0.0, 0.0),
+    "small": (0.2, 0.6),
+    "medium": (0.4, 2.0),
+    "large": (2.0, 6.0),
+}
+
+DEFAULT_ROUTES: Dict[str, List[str]] = {
+    "move": ["small", "medium"],
+    "personality": ["small", "medium"],
+    "contest": ["small", "medium"],
+    "counter_measure": ["local", "small"],
+    "observation": ["small"],
+    "chat": ["small"],
+    "summary": ["small"],
+}
+_DEFAULT_ROUTE = ["small"]
+
+# move でゲートの確信度がこれ未満なら最初の段を飛ばす
+LOW_CONFIDENCE = 0.3
+
+# 段ごとのメトリクス（ラベルは tier）
+TIER_METRICS = MetricsRegistry()
+
+
+class ModelRouter:
+    """種別 → 段の昇格順と、段ごとの計測"""
+
+    def __init__(self, routes: Optional[Dict[str, List[str]]] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.routes = dict(DEFAULT_ROUTES)
+        for call_type, tiers in (routes or {}).items():
+            unknown = [t for t in tiers if t not in TIER_MODELS]
+            if unknown or not tiers:
+                raise ValueError(f"unknown tier for {call_type}: {unknown or tiers}")
+            self.routes[call_type] = list(tiers)
+        self.metrics = metrics or TIER_METRICS
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        raw = os.getenv("MISTRAL_ROUTES")
+        return cls(json.loads(raw) if raw else None)
+
+    def ladder(self, call_type: str, confidence: Optional[float] = None) -> List[str]:
+        """使う段を安い順に返す。確信度が低ければ最初の段を飛ばす"""
+        tiers = self.routes.get(call_type, _DEFAULT_ROUTE)
+        if confidence is not None and confidence < LOW_CONFIDENCE and len(tiers) > 1:
+            return tiers[1:]
+        return tiers
+
+    def remote_ladder(self, call_type: str, confidence: Optional[float] = None) -> List[str]:
+        return [t for t in self.ladder(call_type, confidence) if t != LOCAL] or _DEFAULT_ROUTE
+
+    def model(self, tier: str) -> str:
+        model = TIER_MODELS[tier]
+        if model is None:
+            raise ValueError(f"tier {tier} has no remote model")
+        return model
+
+    # -------------------------------------------------------------------
+    # 計測
+    # -------------------------------------------------------------------
+
+    def record(self, tier: str, latency: float, prompt_tokens: Optional[int] = None,
+               completion_tokens: Optional[int] = None, error: bool = False) -> None:
+        self.metrics.inc(tier, "calls")
+        if error:
+            self.metrics.inc(tier, "errors")
+        self.metrics.observe(tier, "latency_seconds", latency)
+        if prompt_tokens is not None:
+            self.metrics.observe(tier, "prompt_tokens", prompt_tokens, TOKEN_BUCKETS)
+        if completion_tokens is not None:
+            self.metrics.observe(tier, "completion_tokens", completion_tokens, TOKEN_BUCKETS)
+        input_price, output_price = TIER_PRICES.get(tier, (0.0, 0.0))
+        cost = ((prompt_tokens or 0) * input_price + (completion_tokens or 0) * output_price)
+        # 100万トークン単価 × トークン数 = マイクロドル
+        self.metrics.inc(tier, "cost_microusd", round(cost))
+
+    def record_escalation(self, from_tier: str, reason: str) -> None:
+        """reason: "parse_failure" | "low_confidence" """
+        self.metrics.inc(from_tier, f"escalations_{reason}")
+
+    def report(self) -> Dict[str, Dict]:
+        """段ごとの呼び出し数・p50/p95 レイテンシ・推定コスト"""
+        report = {}
+        for tier, data in self.metrics.to_dict().items():
+            counters = data["counters"]
+            latency = data["histograms"]["latency_seconds"]
+            calls = counters.get("calls", 0)
+            cost = counters.get("cost_microusd", 0) / 1e6
+            report[tier] = {
+                "calls": calls,
+                "errors": counters.get("errors", 0),
+                "p50_seconds": latency["p50"],
+                "p95_seconds": latency["p95"],
+                "cost_usd": round(cost, 6),
+                "cost_per_call_usd": round(cost / calls, 8) if calls else 0.0,
+                "escalations": {k[len("escalations_"):]: v for k, v in counters.items()
+                                if k.startswith("escalations_")},
+            }
+        return report
@@ -4,7 +4,7 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from typing import Dict, List
 import random
 
 
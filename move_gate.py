@@ -0,0 +1,199 @@
+"""
+decide_move のゲーティング層
+自明な局面はルールで即決し、蒸留ポリシー・ローカル評価関数の確信度が低いときだけ LLM を呼ぶ
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from models import Card
+from game_logic import DaifugoGame
+
+
+# LLM を呼ばずに済ませる確信度の閾値（最善手のソフトマックス確率）
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# 蒸留ポリシー（move_policy.py）の手を採用する確率の閾値
+DEFAULT_POLICY_THRESHOLD = 0.7
+
+# ソフトマックスの温度（小さいほど最善手に確率が集中する）
+_SOFTMAX_TEMPERATURE = 0.35
+
+
+@dataclass
+class GateDecision:
+    """ゲーティングの判定結果"""
+    move: List[Card]
+    reason: str                 # "forced_pass" | "single_option" | "finishing_move" | ...
+    confidence: float = 1.0
+    apply_emotion: bool = False  # 感情マトリクスで微調整してよいか
+
+
+# -----------------------------------------------------------------------
+# ローカル評価関数
+# -----------------------------------------------------------------------
+
+def score_moves(game: DaifugoGame, player_name: str,
+                valid_moves: List[List[Card]]) -> List[float]:
+    """
+    各候補手をヒューリスティックで採点する（大きいほど良い手）。
+    弱いカードから処理・強いカードは温存・ペアは崩さない・同盟相手は邪魔しない。
+    """
+    hand = game.player_hands.get(player_name, [])
+    rank_counts: Dict[str, int] = {}
+    for card in hand:
+        rank_counts[card.rank] = rank_counts.get(card.rank, 0) + 1
+
+    leader = game.last_played_by
+    ally = game.alliances.get(player_name)
+    affinity = game.relationships.get(player_name, {}).get(leader, 0) if leader else 0
+    has_play = any(m for m in valid_moves)
+
+    scores: List[float] = []
+    for move in valid_moves:
+        if not move:
+            # パス：出せる手があるなら基本的に損。ただし同盟相手の場は流す
+            score = 0.0 if not has_play else -0.2
+            if leader and leader == ally:
+                score += 0.8
+            elif leader and affinity >= 30:
+                score += 0.3
+            scores.append(score)
+            continue
+
+        rank_value = move[0].get_rank_value()
+        strength = rank_value / (len(Card.RANK_ORDER) - 1)
+
+        score = 1.0 - strength              # 弱いカードから出す
+        score += 0.15 * (len(move) - 1)     # 複数枚で一気に減らす
+        if len(move) == len(hand):
+            score += 5.0                     # 上がり
+        if rank_counts.get(move[0].rank, 0) > len(move):
+            score -= 0.3                     # ペア・スリーカードを崩す
+        if strength >= 0.9 and len(hand) > 4:
+            score -= 0.4                     # 2・A は終盤まで温存
+        if leader and leader == ally:
+            score -= 0.6                     # 同盟相手の場は潰さない
+        elif leader and affinity <= -60:
+            score += 0.3                     # 敵対相手の場は潰す
+        scores.append(score)
+    return scores
+
+
+def heuristic_confidence(scores: List[float]) -> List[float]:
+    """採点結果をソフトマックス確率に変換する"""
+    if not scores:
+        return []
+    top = max(scores)
+    exps = [math.exp((s - top) / _SOFTMAX_TEMPERATURE) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+def best_heuristic_move(game: DaifugoGame, player_name: str,
+                        valid_moves: List[List[Card]]) -> List[Card]:
+    """ローカル評価関数で最善の手を返す（LLM 不使用）"""
+    if not valid_moves:
+        return []
+    scores = score_moves(game, player_name, valid_moves)
+    return valid_moves[max(range(len(scores)), key=scores.__getitem__)]
+
+
+# -----------------------------------------------------------------------
+# カウンタ
+# -----------------------------------------------------------------------
+
+class GateStats:
+    """LLM 呼び出しを回避した回数の集計（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.llm_calls = 0
+        self.avoided: Dict[str, int] = {}
+
+    def record(self, reason: Optional[str]) -> None:
+        with self._lock:
+            self.total += 1
+            if reason is None:
+                self.llm_calls += 1
+            else:
+                self.avoided[reason] = self.avoided.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            avoided_total = sum(self.avoided.values())
+            return {
+                "total": self.total,
+                "llm_calls": self.llm_calls,
+                "avoided": dict(self.avoided),
+                "avoided_total": avoided_total,
+                "avoided_ratio": avoided_total / self.total if self.total else 0.0,
+            }
+
+
+# -----------------------------------------------------------------------
+# ゲート本体
+# -----------------------------------------------------------------------
+
+class MoveGate:
+    """自明な手をルールで即決し、曖昧な局面だけ LLM に回す"""
+
+    def __init__(self, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                 policy=None, policy_threshold: float = DEFAULT_POLICY_THRESHOLD):
+        """
+        policy: move_policy.MovePolicy（LLM の選択を蒸留したモデル）。
+        あれば評価関数より先に聞き、policy_threshold 以上の確率ならその手を採用する。
+        """
+        self.confidence_threshold = confidence_threshold
+        self.policy = policy
+        self.policy_threshold = policy_threshold
+        self.stats = GateStats()
+
+    def check(self, game: DaifugoGame, player_name: str,
+              valid_moves: List[List[Card]]) -> Optional[GateDecision]:
+        """LLM 不要なら GateDecision を、LLM に聞くべきなら None を返す"""
+        decision = self._decide(game, player_name, valid_moves)
+        self.stats.record(decision.reason if decision else None)
+        return decision
+
+    def _decide(self, game: DaifugoGame, player_name: str,
+                valid_moves: List[List[Card]]) -> Optional[GateDecision]:
+        plays = [m for m in valid_moves if m]
+
+        # 1. 強制パス・選択肢が1つだけ
+        if not plays:
+            return GateDecision(move=[], reason="forced_pass")
+        if len(valid_moves) == 1:
+            return GateDecision(move=valid_moves[0], reason="single_option")
+
+        # 2. 上がり（最後の1枚・残り1ランクをまとめて出せる）
+        hand = game.player_hands.get(player_name, [])
+        for move in plays:
+            if len(move) == len(hand):
+                return GateDecision(move=move, reason="finishing_move")
+
+        scores = score_moves(game, player_name, valid_moves)
+        probs = heuristic_confidence(scores)
+        best = max(range(len(probs)), key=probs.__getitem__)
+
+        # 3. 出せる手が1つだけ → 出すかパスかの二択は評価関数で決める
+        if len(plays) == 1:
+            return GateDecision(move=valid_moves[best], reason="single_play",
+                                confidence=probs[best], apply_emotion=True)
+
+        # 4. 蒸留ポリシーが既知の局面で十分に確信している（キャラらしさは LLM 由来）
+        if self.policy is not None:
+            chosen = self.policy.choose(game, player_name, valid_moves)
+            if chosen is not None and chosen[1] >= self.policy_threshold:
+                return GateDecision(move=valid_moves[chosen[0]], reason="distilled_policy",
+                                    confidence=chosen[1], apply_emotion=True)
+
+        # 5. 評価関数が十分に確信している
+        if probs[best] >= self.confidence_threshold:
+            return GateDecision(move=valid_moves[best], reason="heuristic_confident",
+                                confidence=probs[best], apply_emotion=True)
+
+        return None
@@ -0,0 +1,433 @@
+"""
+decide_move の蒸留ポリシー
+LLM が選んだ手を（局面特徴量, 選んだ番号）として記録し、小さな線形モデルに学習させる
+
+    # 1. 自動対戦（--collect）か、MOVE_DECISION_LOG=1 を付けたプレイで .cache/move_decisions.jsonl がたまる
+    python move_policy.py --collect 20          # 自動対戦で LLM の選択を記録
+    MOVE_DECISION_LOG=1 streamlit run app.py    # ふだんのプレイも記録（既定では記録しない）
+    # 2. 学習（numpy が必要）
+    python move_policy.py --train
+    # 3. 推論速度の確認
+    python move_policy.py --bench
+
+モデルは候補手ごとの特徴量ベクトルに重みを掛けて候補間でソフトマックスを取る
+条件付きロジット（多クラスのロジスティック回帰）。推論は純 Python で数十マイクロ秒。
+学習データの範囲外の局面（未知の局面）と確信度の低い局面は LLM に回す。
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 推論だけなら numpy なしで動く
+    np = None
+
+from models import Card, GameState
+from game_logic import DaifugoGame
+from move_gate import score_moves
+
+
+DEFAULT_LOG_PATH = os.path.join(".cache", "move_decisions.jsonl")
+DEFAULT_POLICY_PATH = os.path.join(".cache", "move_policy.json")
+
+# 学習データの特徴量範囲をこれだけ超えたら未知の局面とみなす
+_NOVELTY_MARGIN = 0.1
+
+FEATURE_NAMES = (
+    "pass",
+    "strength",
+    "size",
+    "finishing",
+    "breaks_group",
+    "high_card_early",
+    "pass_x_ally_lead",
+    "play_x_ally_lead",
+    "pass_x_affinity",
+    "play_x_fear",
+    "strength_x_hand",
+    "strength_x_urgency",
+    "strength_x_aggression",
+    "pass_x_aggression",
+    "size_x_free_lead",
+    "heuristic",
+)
+
+
+# -----------------------------------------------------------------------
+# 特徴量
+# -----------------------------------------------------------------------
+
+def move_features(game: DaifugoGame, player_name: str,
+                  valid_moves: List[List[Card]]) -> List[List[float]]:
+    """候補手ごとの特徴量ベクトル（FEATURE_NAMES の順）を返す"""
+    hand = game.player_hands.get(player_name, [])
+    rank_counts: Dict[str, int] = {}
+    for card in hand:
+        rank_counts[card.rank] = rank_counts.get(card.rank, 0) + 1
+
+    leader = game.last_played_by
+    ally_lead = 1.0 if leader and leader == game.alliances.get(player_name) else 0.0
+    affinity = game.relationships.get(player_name, {}).get(leader, 0) / 100 if leader else 0.0
+    fear = game.fear_levels.get(player_name, {}).get(leader, 0) / 100 if leader else 0.0
+    personality = game.personalities.get(player_name)
+    aggression = personality.aggression if personality else 0.5
+
+    opponents = [len(game.player_hands.get(p, [])) for p in game.players
+                 if p != player_name and p not in game.ranking]
+    urgency = 1.0 - min(opponents) / 13 if opponents else 0.0
+    hand_ratio = len(hand) / 13
+    free_lead = 0.0 if game.last_played_cards else 1.0
+    heuristic = score_moves(game, player_name, valid_moves)
+    top_rank = len(Card.RANK_ORDER) - 1
+
+    rows: List[List[float]] = []
+    for move, h in zip(valid_moves, heuristic):
+        if not move:
+            rows.append([1.0, 0.0, 0.0, 0.0, 0.0, 0.0, ally_lead, 0.0, affinity, 0.0,
+                         0.0, 0.0, 0.0, aggression, 0.0, h])
+            continue
+        strength = move[0].get_rank_value() / top_rank
+        size = len(move) / 4
+        rows.append([
+            0.0,
+            strength,
+            size,
+            1.0 if len(move) == len(hand) else 0.0,
+            1.0 if rank_counts.get(move[0].rank, 0) > len(move) else 0.0,
+            1.0 if strength >= 0.9 and len(hand) > 4 else 0.0,
+            0.0,
+            ally_lead,
+            0.0,
+            fear,
+            strength * hand_ratio,
+            strength * urgency,
+            strength * aggression,
+            0.0,
+            size * free_lead,
+            h,
+        ])
+    return rows
+
+
+# -----------------------------------------------------------------------
+# 決定ログ
+# -----------------------------------------------------------------------
+
+class DecisionLog:
+    """LLM が選んだ手を JSONL に追記する（1行1局面）"""
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, features: List[List[float]], chosen: int,
+               player_name: str = "") -> None:
+        line = json.dumps({
+            "f": [[round(x, 4) for x in row] for row in features],
+            "c": chosen,
+            "p": player_name,
+        }, separators=(",", ":"))
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def load(self) -> List[Tuple[List[List[float]], int]]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    raw = json.loads(line)
+                    features, chosen = raw["f"], int(raw["c"])
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    continue
+                if features and 0 <= chosen < len(features) \
+                        and all(len(row) == len(FEATURE_NAMES) for row in features):
+                    records.append((features, chosen))
+        return records
+
+
+def decision_log_path() -> Optional[str]:
+    """
+    MOVE_DECISION_LOG=1 で DEFAULT_LOG_PATH、パスを書けばそこに記録する。
+    未設定・0 なら記録しない（本番で上限なく追記し続けないよう既定は無効）
+    """
+    value = os.getenv("MOVE_DECISION_LOG", "")
+    if value in ("", "0"):
+        return None
+    return DEFAULT_LOG_PATH if value == "1" else value
+
+
+def get_decision_log() -> Optional[DecisionLog]:
+    path = decision_log_path()
+    return DecisionLog(path) if path else None
+
+
+# -----------------------------------------------------------------------
+# ポリシー
+# -----------------------------------------------------------------------
+
+class MovePolicy:
+    """学習済みの条件付きロジットモデル（推論は numpy 不要）"""
+
+    def __init__(self, weights: Sequence[float],
+                 feature_min: Sequence[float], feature_max: Sequence[float],
+                 max_candidates: int, meta: Optional[Dict] = None):
+        self.weights = list(weights)
+        self.feature_min = list(feature_min)
+        self.feature_max = list(feature_max)
+        self.max_candidates = max_candidates
+        self.meta = meta or {}
+
+    def probabilities(self, features: List[List[float]]) -> List[float]:
+        logits = [sum(w * x for w, x in zip(self.weights, row)) for row in features]
+        top = max(logits)
+        exps = [math.exp(z - top) for z in logits]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict(self, features: List[List[float]]) -> Tuple[int, float]:
+        """(最善の候補番号, その確率) を返す"""
+        probs = self.probabilities(features)
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return best, probs[best]
+
+    def choose(self, game: DaifugoGame, player_name: str,
+               valid_moves: List[List[Card]]) -> Optional[Tuple[int, float]]:
+        """(候補番号, 確率) を返す。未知の局面なら None（LLM に回す）"""
+        features = move_features(game, player_name, valid_moves)
+        if self.is_novel(features):
+            return None
+        return self.predict(features)
+
+    def is_novel(self, features: List[List[float]]) -> bool:
+        """学習データに無かった範囲の局面か"""
+        if len(features) > self.max_candidates:
+            return True
+        for row in features:
+            for x, lo, hi in zip(row, self.feature_min, self.feature_max):
+                span = max(hi - lo, 1.0)
+                if x < lo - _NOVELTY_MARGIN * span or x > hi + _NOVELTY_MARGIN * span:
+                    return True
+        return False
+
+    def to_dict(self) -> Dict:
+        return {
+            "features": list(FEATURE_NAMES),
+            "weights": [round(w, 6) for w in self.weights],
+            "feature_min": self.feature_min,
+            "feature_max": self.feature_max,
+            "max_candidates": self.max_candidates,
+            "meta": self.meta,
+        }
+
+    def save(self, path: str = DEFAULT_POLICY_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional["MovePolicy"]:
+        if tuple(data.get("features", ())) != FEATURE_NAMES:
+            return None  # 特徴量の定義が変わったら作り直す
+        return cls(data["weights"], data["feature_min"], data["feature_max"],
+                   data["max_candidates"], data.get("meta"))
+
+
+_policy_cache: Dict[str, Tuple[float, Optional[MovePolicy]]] = {}
+_policy_lock = threading.Lock()
+
+
+def load_policy(path: Optional[str] = None) -> Optional[MovePolicy]:
+    """学習済みポリシーを読む（なければ None）。ファイルが更新されるまで使い回す"""
+    path = path or os.getenv("MOVE_POLICY_PATH", DEFAULT_POLICY_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _policy_lock:
+        cached = _policy_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, encoding="utf-8") as f:
+                policy = MovePolicy.from_dict(json.load(f))
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            print(f"load_policy error: {e}")
+            policy = None
+        _policy_cache[path] = (mtime, policy)
+        return policy
+
+
+# -----------------------------------------------------------------------
+# 学習（numpy）
+# -----------------------------------------------------------------------
+
+def train_policy(records: List[Tuple[List[List[float]], int]], epochs: int = 400,
+                 lr: float = 0.5, l2: float = 1e-3, holdout: float = 0.2,
+                 seed: int = 0) -> MovePolicy:
+    """
+    候補間ソフトマックスのクロスエントロピーを全バッチ勾配降下で最小化する。
+    meta に学習・検証データでの LLM との一致率を入れて返す。
+    """
+    if np is None:
+        raise RuntimeError("学習には numpy が必要です（pip install numpy）")
+    if not records:
+        raise ValueError("学習データがありません")
+
+    records = list(records)
+    random.Random(seed).shuffle(records)
+    n_valid = int(len(records) * holdout) if len(records) >= 10 else 0
+    valid, train = records[:n_valid], records[n_valid:]
+
+    def to_arrays(rows):
+        k = max(len(f) for f, _ in rows)
+        x = np.zeros((len(rows), k, len(FEATURE_NAMES)))
+        mask = np.zeros((len(rows), k), dtype=bool)
+        y = np.zeros(len(rows), dtype=int)
+        for i, (features, chosen) in enumerate(rows):
+            x[i, :len(features)] = features
+            mask[i, :len(features)] = True
+            y[i] = chosen
+        return x, mask, y
+
+    def softmax(x, mask, w):
+        logits = np.where(mask, x @ w, -np.inf)
+        logits -= logits.max(axis=1, keepdims=True)
+        exps = np.exp(logits)
+        return exps / exps.sum(axis=1, keepdims=True)
+
+    def accuracy(rows, w):
+        if not rows:
+            return None
+        x, mask, y = to_arrays(rows)
+        return float((softmax(x, mask, w).argmax(axis=1) == y).mean())
+
+    x, mask, y = to_arrays(train)
+    onehot = np.zeros(mask.shape)
+    onehot[np.arange(len(y)), y] = 1.0
+    w = np.zeros(len(FEATURE_NAMES))
+    for _ in range(epochs):
+        probs = softmax(x, mask, w)
+        grad = np.einsum("nk,nkf->f", probs - onehot, x) / len(y) + l2 * w
+        w -= lr * grad
+
+    all_x = np.array([row for features, _ in records for row in features])
+    return MovePolicy(
+        weights=w.tolist(),
+        feature_min=all_x.min(axis=0).round(4).tolist(),
+        feature_max=all_x.max(axis=0).round(4).tolist(),
+        max_candidates=max(len(f) for f, _ in records),
+        meta={
+            "samples": len(records),
+            "train_agreement": round(accuracy(train, w), 4),
+            "valid_agreement": round(accuracy(valid, w), 4) if valid else None,
+            "trained_at": int(time.time()),
+        },
+    )
+
+
+# -----------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------
+
+def collect(games: int, seed: int = 0) -> int:
+    """MistralAIPlayer に自動対戦させて LLM の選択を記録する。記録した局面数を返す"""
+    from dotenv import load_dotenv
+    from ai_player import MistralAIPlayer
+
+    load_dotenv()
+    random.seed(seed)
+    ai = MistralAIPlayer()
+    ai.gate.policy = None  # 蒸留ポリシー自身の選択は記録しない
+    log = ai.decision_log or DecisionLog()
+    ai.decision_log = log
+    before = len(log.load())
+    for _ in range(games):
+        game = DaifugoGame()
+        game.start_game()
+        for _ in range(1000):
+            if game.game_state == GameState.GAME_OVER:
+                break
+            if game.game_state == GameState.CHEAT_PHASE:
+                game.cheat_queue = []
+                game.game_state = GameState.PLAYING
+                game._next_player()
+                continue
+            player = game.get_current_player()
+            move = ai.decide_move(game, player, game.get_valid_moves(player))
+            game.play_cards(player, move)
+    return len(log.load()) - before
+
+
+def benchmark(policy: MovePolicy, positions: int = 200, seed: int = 0) -> Dict[str, float]:
+    """自動対戦の局面で推論時間を測る"""
+    from move_gate import best_heuristic_move
+
+    random.seed(seed)
+    samples = []
+    game = DaifugoGame()
+    game.start_game()
+    while len(samples) < positions:
+        if game.game_state in (GameState.GAME_OVER, GameState.CHEAT_PHASE):
+            game = DaifugoGame()
+            game.start_game()
+            continue
+        player = game.get_current_player()
+        valid_moves = game.get_valid_moves(player)
+        samples.append(move_features(game, player, valid_moves))
+        game.play_cards(player, best_heuristic_move(game, player, valid_moves))
+
+    start = time.perf_counter()
+    for features in samples:
+        policy.predict(features)
+    predict_us = (time.perf_counter() - start) / len(samples) * 1e6
+    novel = sum(policy.is_novel(f) for f in samples)
+    return {"positions": len(samples), "predict_us": round(predict_us, 1),
+            "novel_ratio": round(novel / len(samples), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="decide_move 蒸留ポリシーの収集・学習")
+    parser.add_argument("--log", default=decision_log_path() or DEFAULT_LOG_PATH)
+    parser.add_argument("--out", default=os.getenv("MOVE_POLICY_PATH", DEFAULT_POLICY_PATH))
+    parser.add_argument("--collect", type=int, default=0, help="自動対戦のゲーム数")
+    parser.add_argument("--train", action="store_true")
+    parser.add_argument("--epochs", type=int, default=400)
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    if args.collect:
+        os.environ["MOVE_DECISION_LOG"] = args.log
+        print(f"{collect(args.collect)}局面を記録 ({args.log})")
+    if args.train:
+        records = DecisionLog(args.log).load()
+        policy = train_policy(records, epochs=args.epochs)
+        policy.save(args.out)
+        print(json.dumps(policy.meta, ensure_ascii=False))
+        print(f"保存: {args.out}")
+    if args.bench:
+        policy = load_policy(args.out)
+        if policy is None:
+            print(f"ポリシーがありません: {args.out}")
+            return
+        print(json.dumps(benchmark(policy), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
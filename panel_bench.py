@@ -0,0 +1,109 @@
+"""
+右パネル操作の再実行時間の計測
+AppTest でゲームを1つ始め、右パネルの操作（相手の切り替え・メモの編集・チャット送信）を
+繰り返して、ui.timing の「アプリ全体」と「フラグメント単体」の時間を操作ごとに並べる。
+
+    python panel_bench.py                       # 各操作 20 回
+    python panel_bench.py --rounds 50 --out .cache/panel_bench.json
+
+AppTest はウィジェット操作のたびにスクリプト全体を再実行するので、
+  - app_ms      : パネル操作がアプリ全体を再実行していたとき（フラグメント化の前）の1回分
+  - fragment_ms : ブラウザでフラグメントだけが再実行されるとき（いま）の1回分
+として読む。AI はモック（loadtest と同じ設定）。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from loadtest import HUMAN, SessionDriver
+
+# 操作ごとに再実行されるフラグメント
+PANEL_ACTIONS = {
+    "switch_target": "fragment:conversation",
+    "edit_note": "fragment:info",
+    "send_chat": "fragment:conversation",
+}
+
+
+def _mean_ms(data: Dict, label: str) -> float:
+    seconds = data.get(label, {}).get("histograms", {}).get("seconds", {})
+    count = seconds.get("count", 0)
+    return round(seconds["sum"] / count * 1000, 2) if count else 0.0
+
+
+def measure(driver: SessionDriver, action: Callable[[int], None], rounds: int) -> Dict:
+    from ui.timing import RERUN_METRICS
+
+    RERUN_METRICS.reset()
+    walls: List[float] = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        action(i)
+        walls.append(time.perf_counter() - start)
+    data = RERUN_METRICS.to_dict()
+    return {
+        "runs": data.get("app", {}).get("counters", {}).get("runs", 0),
+        "apptest_wall_ms": round(statistics.median(walls) * 1000, 2),
+        "app_ms": _mean_ms(data, "app"),
+        "fragment_ms": {label: _mean_ms(data, label)
+                        for label in ("fragment:conversation", "fragment:info")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="右パネル操作の再実行時間")
+    parser.add_argument("--rounds", type=int, default=20, help="操作ごとの回数")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", help="レポート（JSON）の保存先")
+    args = parser.parse_args()
+
+    driver = SessionDriver(0, args.timeout)
+    driver.run()
+    driver.start_game(args.players)
+    driver.wait_for_ai(args.timeout)
+    others = [p for p in driver.slot.game.players if p != HUMAN]
+
+    def switch_target(i: int) -> None:
+        driver.run(driver.at.selectbox(key="chat_target_select").set_value(
+            others[(i + 1) % len(others)]))
+
+    def edit_note(i: int) -> None:
+        driver.run(driver.at.text_area(key="player_note_area").input(f"メモ {i}"))
+
+    def send_chat(i: int) -> None:
+        # 返答待ちで送信できない相手を避けるため、毎回返答を取り込んでから送る
+        pending = list(driver.slot.pending_replies)
+        for reply in pending:
+            reply.future.result(args.timeout)
+        if pending:
+            driver.run()
+        key = f"chat_input_{driver.at.session_state['chat_input_key']}"
+        driver.at.text_input(key=key).input(f"こんにちは {i}")
+        driver.click("送信 →")
+
+    actions = {"switch_target": switch_target, "edit_note": edit_note, "send_chat": send_chat}
+    report = {}
+    for name, action in actions.items():
+        result = measure(driver, action, args.rounds)
+        result["fragment"] = PANEL_ACTIONS[name]
+        result["speedup"] = (round(result["app_ms"] / result["fragment_ms"][PANEL_ACTIONS[name]], 1)
+                             if result["fragment_ms"][PANEL_ACTIONS[name]] else None)
+        report[name] = result
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"保存: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+キャラクターの返答の非同期化
+チャット・観察・同盟提案・告発の LLM 呼び出しを共有スレッドプールに投げ、
+返答を待たずに次の操作ができるようにする。
+
+- 投げた呼び出しは PendingReply としてセッション（SessionSlot.pending_replies）に積む
+- 返答待ちは相手ごとに1件まで（UI は has_pending() で次の操作を止める）。
+  1人の連打で共有プールを埋め、他のセッションの返答を待たせないため
+- フューチャーのスレッドではゲームに触らない。結果の反映は UI 側が再実行の中で
+  take_done() で取り出し、ゲームのロックの下で行う
+- 会話要約の更新（kind "summary"）も同じ経路で反映する。画面には出さず、返答待ちにも数えない
+- プールの大きさ: REPLY_WORKERS（既定 8、全セッション共有）
+"""
+
+import itertools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_WORKERS = 8
+
+# 画面に出さず、返答待ちにも数えない裏の処理
+BACKGROUND_KINDS = ("summary",)
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class PendingReply:
+    """返答待ちの呼び出し1件"""
+    target: str
+    kind: str                 # "chat" / "observe" / "cooperate" / "accuse" / "summary"
+    label: str                # 待っている間にチャットに出す文言（"summary" は空）
+    future: Future
+    context: Dict[str, Any] = field(default_factory=dict)   # 反映時に使う値
+    id: int = field(default_factory=lambda: next(_ids))
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+
+class ReplyPool:
+    """返答生成用の共有スレッドプール"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="chat-reply")
+
+    def submit(self, target: str, kind: str, label: str, fn: Callable[..., Any], *args,
+               **context) -> PendingReply:
+        return PendingReply(target, kind, label, self._executor.submit(fn, *args), context)
+
+
+def take_done(pending: List[PendingReply]) -> List[PendingReply]:
+    """終わったものを投げた順に取り出す（pending からは取り除く）"""
+    done = [p for p in pending if p.done]
+    if done:
+        taken = {p.id for p in done}
+        pending[:] = [p for p in pending if p.id not in taken]
+    return done
+
+
+def has_pending(pending: List[PendingReply], target: str, kind: Optional[str] = None) -> bool:
+    """target の返答待ちがあるか（kind を渡すとその種類だけ。省略時は裏の処理を数えない）"""
+    if kind is not None:
+        return any(p.target == target and p.kind == kind for p in pending)
+    return any(p.target == target and p.kind not in BACKGROUND_KINDS for p in pending)
+
+
+def any_done(pending: List[PendingReply]) -> bool:
+    return any(p.done for p in pending)
+
+
+_pool: Optional[ReplyPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_reply_pool() -> ReplyPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ReplyPool(int(os.getenv("REPLY_WORKERS", DEFAULT_WORKERS)))
+        return _pool
@@ -0,0 +1,241 @@
+"""
+AIキャラクター設定のプール
+事前生成したキャラをディスクに貯めておき、ゲーム開始時は待ち時間なしで配る
+
+    python personality_pool.py --fill 30     # オフラインでまとめて生成
+    python personality_pool.py --show        # 中身を確認
+
+保存形式は1行1キャラの JSONL（キーを短縮、数値は小数2桁）:
+    {"n": キャラ名, "d": 性格, "s": 話し方, "b": プロフィール, "t": [ズル, 協力, 正直, 攻撃]}
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+from typing import Callable, Dict, List, Optional
+
+from models import AIPersonality
+
+
+DEFAULT_POOL_PATH = os.path.join(".cache", "personality_pool.jsonl")
+
+# この枚数を下回ったらバックグラウンド補充を始め、TARGET まで貯める
+LOW_WATERMARK = 6
+TARGET_SIZE = 24
+
+_TRAITS = ("cheat_tendency", "cooperation_tendency", "honesty", "aggression")
+_MAX_NAME_LEN = 20
+_MAX_TEXT_LEN = 200
+
+
+# -----------------------------------------------------------------------
+# 検証・変換
+# -----------------------------------------------------------------------
+
+def validate_personality_data(data, strict: bool = False) -> Optional[Dict]:
+    """
+    LLM が返したキャラ設定 dict を検証して正規化する。不正なら None。
+    strict=True（プール投入時）は説明文の欠落も不可とする。
+    """
+    if not isinstance(data, dict):
+        return None
+    name = data.get("character_name")
+    if not isinstance(name, str) or not name.strip() or len(name.strip()) > _MAX_NAME_LEN:
+        return None
+
+    result = {
+        "character_name": name.strip(),
+        "personality_desc": str(data.get("personality_desc", "")).strip()[:_MAX_TEXT_LEN],
+        "speech_style": str(data.get("speech_style", "普通の口調")).strip()[:_MAX_TEXT_LEN],
+        "backstory": str(data.get("backstory", "")).strip()[:_MAX_TEXT_LEN],
+    }
+    defaults = {"cheat_tendency": 0.3, "cooperation_tendency": 0.5,
+                "honesty": 0.5, "aggression": 0.5}
+    for trait in _TRAITS:
+        try:
+            value = float(data.get(trait, defaults[trait]))
+        except (TypeError, ValueError):
+            return None
+        result[trait] = max(0.0, min(1.0, value))
+
+    if strict and not (result["personality_desc"] and result["speech_style"]
+                       and result["backstory"]):
+        return None
+    return result
+
+
+def personality_from_data(player_name: str, data: Dict) -> AIPersonality:
+    return AIPersonality(
+        player_name=player_name,
+        character_name=data["character_name"],
+        personality_desc=data["personality_desc"],
+        speech_style=data["speech_style"],
+        cheat_tendency=data["cheat_tendency"],
+        cooperation_tendency=data["cooperation_tendency"],
+        honesty=data["honesty"],
+        aggression=data["aggression"],
+        backstory=data["backstory"],
+    )
+
+
+def _encode(data: Dict) -> str:
+    return json.dumps({
+        "n": data["character_name"],
+        "d": data["personality_desc"],
+        "s": data["speech_style"],
+        "b": data["backstory"],
+        "t": [round(data[t], 2) for t in _TRAITS],
+    }, ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode(line: str) -> Optional[Dict]:
+    try:
+        raw = json.loads(line)
+        traits = dict(zip(_TRAITS, raw["t"]))
+        return validate_personality_data({
+            "character_name": raw["n"],
+            "personality_desc": raw["d"],
+            "speech_style": raw["s"],
+            "backstory": raw["b"],
+            **traits,
+        }, strict=True)
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return None
+
+
+# -----------------------------------------------------------------------
+# プール本体
+# -----------------------------------------------------------------------
+
+class PersonalityPool:
+    """ディスク永続のキャラ設定プール（character_name で重複排除）"""
+
+    def __init__(self, path: str = DEFAULT_POOL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._refill_thread: Optional[threading.Thread] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                data = _decode(line)
+                if data is not None:
+                    self._entries.setdefault(data["character_name"], data)
+
+    def _save_locked(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for data in self._entries.values():
+                f.write(_encode(data) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def add(self, data: Dict) -> bool:
+        """検証を通った新しいキャラだけ追加して保存する"""
+        data = validate_personality_data(data, strict=True)
+        if data is None:
+            return False
+        with self._lock:
+            if data["character_name"] in self._entries:
+                return False
+            self._entries[data["character_name"]] = data
+            self._save_locked()
+        return True
+
+    def draw(self, player_name: str,
+             exclude_names: Optional[List[str]] = None) -> Optional[AIPersonality]:
+        """1キャラ取り出す（プールからは消費）。空なら None"""
+        exclude = set(exclude_names or [])
+        with self._lock:
+            names = [n for n in self._entries if n not in exclude]
+            if not names:
+                return None
+            data = self._entries.pop(random.choice(names))
+            self._save_locked()
+        return personality_from_data(player_name, data)
+
+    # -------------------------------------------------------------------
+    # バックグラウンド補充
+    # -------------------------------------------------------------------
+
+    def fill(self, generate: Callable[[str], Optional[Dict]],
+             target_size: int = TARGET_SIZE, max_attempts: Optional[int] = None) -> int:
+        """target_size に達するまで generate を呼んで追加する。追加数を返す"""
+        added = 0
+        attempts = 0
+        max_attempts = max_attempts or target_size * 3
+        while len(self) < target_size and attempts < max_attempts:
+            attempts += 1
+            data = generate(f"Player {len(self) + 2}")
+            if data is not None and self.add(data):
+                added += 1
+        return added
+
+    def request_refill(self, generate: Callable[[str], Optional[Dict]],
+                       low_watermark: int = LOW_WATERMARK,
+                       target_size: int = TARGET_SIZE) -> bool:
+        """残りが少なければ補充スレッドを起動する（多重起動はしない）"""
+        with self._lock:
+            if len(self._entries) >= low_watermark:
+                return False
+            if self._refill_thread is not None and self._refill_thread.is_alive():
+                return False
+            self._refill_thread = threading.Thread(
+                target=self.fill, args=(generate, target_size),
+                name="personality-refill", daemon=True)
+            self._refill_thread.start()
+        return True
+
+
+_pool: Optional[PersonalityPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PersonalityPool:
+    """プロセス共有のプール（パスは PERSONALITY_POOL_PATH で変更可）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PersonalityPool(os.getenv("PERSONALITY_POOL_PATH", DEFAULT_POOL_PATH))
+        return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIキャラクター設定プールの管理")
+    parser.add_argument("--fill", type=int, default=0, help="この数になるまで生成する")
+    parser.add_argument("--show", action="store_true")
+    args = parser.parse_args()
+
+    pool = get_pool()
+    if args.fill:
+        from dotenv import load_dotenv
+        from ai_player import MistralAIPlayer
+
+        load_dotenv()
+        ai = MistralAIPlayer()
+        added = pool.fill(ai.generate_personality_data, target_size=args.fill)
+        print(f"{added}件追加")
+    if args.show:
+        for data in pool.entries():
+            print(_encode(data))
+    print(f"プール: {len(pool)}件 ({pool.path})")
+
+
+if __name__ == "__main__":
+    main()
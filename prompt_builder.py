@@ -0,0 +1,564 @@
+"""
+Mistral 向けプロンプトビルダー
+呼び出し種別ごとのトークン予算・ランク枚数の圧縮表記・安定した手の並び順
+
+    python prompt_builder.py --games 3 --seed 0   # 再生ゲームでのトークン計測
+"""
+
+import argparse
+import hashlib
+import random
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from models import Card, AIPersonality, CharacterType, GameState
+from game_logic import DaifugoGame
+
+
+# 呼び出し種別ごとのプロンプトトークン予算（推定値ベース）
+TOKEN_BUDGETS: Dict[str, int] = {
+    "personality": 260,
+    "chat": 220,
+    "observation": 120,
+    "move": 300,
+    "counter_measure": 100,
+    "contest": 220,
+    "chat_window": 160,   # チャットに載せる直近の会話
+    "summary": 80,        # 古い会話の要約
+}
+
+# move プロンプトに最低限残す候補手の数（パスを含む）
+_MIN_MOVE_OPTIONS = 3
+
+# 関係値ヒントの上限行数（予算に収まらなければさらに削る）
+_MAX_HINTS = 4
+
+
+# -----------------------------------------------------------------------
+# トークン推定
+# -----------------------------------------------------------------------
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数の概算。ASCII は約4文字で1トークン、
+    日本語などの全角文字は1文字1トークンとして数える。
+    """
+    ascii_chars = 0
+    wide_chars = 0
+    for ch in text:
+        if ord(ch) < 128:
+            ascii_chars += 1
+        elif unicodedata.category(ch) != "Mn":
+            wide_chars += 1
+    return wide_chars + (ascii_chars + 3) // 4
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """自由入力テキストを推定トークン数の上限で切り詰める"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    clipped = text
+    while clipped and estimate_tokens(clipped + "…") > max_tokens:
+        clipped = clipped[:-1]
+    return clipped + "…"
+
+
+# -----------------------------------------------------------------------
+# 圧縮表記
+# -----------------------------------------------------------------------
+
+def compact_cards(cards: List[Card]) -> str:
+    """
+    ランク枚数表記。スートは大富豪の強さに関係しないので省く。
+    例: [♠3, ♥3, ♦5, ♣K] → "3x2 5 K"
+    """
+    if not cards:
+        return "-"
+    counts: Dict[str, int] = {}
+    for card in cards:
+        counts[card.rank] = counts.get(card.rank, 0) + 1
+    return " ".join(
+        f"{rank}x{counts[rank]}" if counts[rank] > 1 else rank
+        for rank in Card.RANK_ORDER if rank in counts
+    )
+
+
+def _move_key(move: List[Card]):
+    """(枚数, ランク強さ) の並び替えキー。パスは常に先頭"""
+    if not move:
+        return (0, -1)
+    return (len(move), move[0].get_rank_value())
+
+
+def order_moves(valid_moves: List[List[Card]]) -> List[int]:
+    """
+    候補手を安定順（パス → 枚数 → 弱い順）に並べ、同じランク・枚数の手は
+    最初の1つに畳んだうえで valid_moves へのインデックス列を返す。
+    """
+    seen = set()
+    ordered: List[int] = []
+    for idx in sorted(range(len(valid_moves)), key=lambda i: (_move_key(valid_moves[i]), i)):
+        key = _move_key(valid_moves[idx])
+        if key in seen:
+            continue
+        seen.add(key)
+        ordered.append(idx)
+    return ordered
+
+
+# -----------------------------------------------------------------------
+# move プロンプト
+# -----------------------------------------------------------------------
+
+@dataclass
+class MovePrompt:
+    """組み立て済み move プロンプト"""
+    text: str
+    index_map: List[int]            # 表示番号 → valid_moves のインデックス
+    tokens: int = 0
+    dropped_hints: int = 0
+    dropped_moves: int = 0
+    hints: List[str] = field(default_factory=list)
+
+
+def build_move_hints(game: DaifugoGame, player_name: str) -> List[str]:
+    """関係値ヒントを優先度順（同盟 → 敵対 → 恐怖度の大きい順 → 性格）に返す"""
+    inactive = set(game.ranking) | set(game.caught_players)
+    hints: List[str] = []
+
+    alliance = game.alliances.get(player_name)
+    if alliance and alliance not in inactive:
+        hints.append(f"{alliance}と同盟中。援護も考慮")
+
+    rels = game.relationships.get(player_name, {})
+    enemies = sorted(p for p, v in rels.items() if v <= -60 and p not in inactive)
+    if enemies:
+        hints.append(f"敵対: {','.join(enemies)}。妨害優先")
+
+    fears = game.fear_levels.get(player_name, {})
+    strong = sorted((p for p, v in fears.items() if abs(v) > 60),
+                    key=lambda p: (-abs(fears[p]), p))
+    for p in strong:
+        if fears[p] > 0:
+            hints.append(f"{p}を恐れている。強気に出にくい")
+        else:
+            hints.append(f"{p}を見下している。大胆に動ける")
+
+    char_type = game.character_types.get(player_name, CharacterType.LOGICAL)
+    hints.append(f"性格タイプ: {char_type.value}")
+    return hints[:_MAX_HINTS]
+
+
+def _render_move_prompt(player_name: str, hand: List[Card],
+                        valid_moves: List[List[Card]], game_info: dict,
+                        index_map: List[int], hints: List[str],
+                        personality: Optional[AIPersonality]) -> str:
+    counts = " ".join(f"{p.replace('Player ', 'P')}:{n}"
+                      for p, n in game_info['player_card_count'].items())
+    last_by = game_info['last_played_by'] or "-"
+    ranking = ",".join(game_info['ranking']) if game_info['ranking'] else "-"
+    moves = "\n".join(
+        f"{n}: {compact_cards(valid_moves[i]) if valid_moves[i] else 'パス'}"
+        for n, i in enumerate(index_map)
+    )
+    lines = [
+        "大富豪をプレイ中。強さ 3<4<…<K<A<2、表記 ランクx枚数。",
+        f"あなた: {player_name}"
+        + (f"（{personality.character_name}）" if personality else ""),
+        f"手札: {compact_cards(hand)}",
+        f"場: {compact_cards(game_info['last_played'])}（{last_by}）",
+        f"残り枚数: {counts}",
+        f"順位: {ranking}",
+        "候補:",
+        moves,
+    ]
+    if hints:
+        lines.append("状況: " + " / ".join(hints))
+    lines.append("方針: 上がり優先・2/A/K温存・同盟は援護・敵は妨害・キャラらしく。")
+    lines.append(f"番号（0-{len(index_map) - 1}）を最後に1つだけ答えてください。")
+    return "\n".join(lines)
+
+
+def _strongest_droppable(valid_moves: List[List[Card]], index_map: List[int]) -> Optional[int]:
+    """
+    予算超過で削る候補の位置。パスと各枚数の最弱の手を除き、ランクの最も強い手
+    （同じ強さなら枚数の多い手）。削れるものがなければ None
+    """
+    weakest = set()
+    sizes = set()
+    for pos, idx in enumerate(index_map):
+        move = valid_moves[idx]
+        # index_map は枚数ごとに弱い順なので、各枚数の最初が最弱
+        if move and len(move) not in sizes:
+            sizes.add(len(move))
+            weakest.add(pos)
+    candidates = [pos for pos, idx in enumerate(index_map)
+                  if valid_moves[idx] and pos not in weakest]
+    if not candidates:
+        return None
+    def strength(pos: int):
+        move = valid_moves[index_map[pos]]
+        return (move[0].get_rank_value(), len(move))
+
+    return max(candidates, key=strength)
+
+
+def build_move_prompt(player_name: str, hand: List[Card],
+                      valid_moves: List[List[Card]], game_info: dict,
+                      hints: Optional[List[str]] = None,
+                      personality: Optional[AIPersonality] = None,
+                      budget: Optional[int] = None) -> MovePrompt:
+    """
+    予算内に収まる move プロンプトを組み立てる。
+    超過時はヒントを優先度の低い順に落とし、それでも超えれば強い手から候補を削る
+    （パスと各枚数の最弱の手は残す）。
+    """
+    budget = budget or TOKEN_BUDGETS["move"]
+    hints = list(hints or [])
+    index_map = order_moves(valid_moves)
+    dropped_hints = 0
+    dropped_moves = 0
+
+    text = _render_move_prompt(player_name, hand, valid_moves, game_info,
+                               index_map, hints, personality)
+    while estimate_tokens(text) > budget and hints:
+        hints.pop()
+        dropped_hints += 1
+        text = _render_move_prompt(player_name, hand, valid_moves, game_info,
+                                   index_map, hints, personality)
+    while estimate_tokens(text) > budget and len(index_map) > _MIN_MOVE_OPTIONS:
+        pos = _strongest_droppable(valid_moves, index_map)
+        if pos is None:
+            break
+        index_map = index_map[:pos] + index_map[pos + 1:]
+        dropped_moves += 1
+        text = _render_move_prompt(player_name, hand, valid_moves, game_info,
+                                   index_map, hints, personality)
+
+    return MovePrompt(text=text, index_map=index_map, tokens=estimate_tokens(text),
+                      dropped_hints=dropped_hints, dropped_moves=dropped_moves,
+                      hints=hints)
+
+
+# -----------------------------------------------------------------------
+# その他の呼び出し種別
+# -----------------------------------------------------------------------
+
+def build_personality_prompt(player_name: str) -> str:
+    return f"""大富豪カードゲームのAIプレイヤー「{player_name}」のキャラクター設定を作ってください。
+
+以下のJSONのみを返してください（他の文字は一切含めないこと）:
+{{
+  "character_name": "キャラ名（日本語2〜4文字）",
+  "personality_desc": "性格説明（日本語2〜3文）",
+  "speech_style": "話し方の特徴（丁寧語/友達口調/謎めいた等、日本語1文）",
+  "cheat_tendency": 0.0から1.0の数値,
+  "cooperation_tendency": 0.0から1.0の数値,
+  "honesty": 0.0から1.0の数値,
+  "aggression": 0.0から1.0の数値,
+  "backstory": "一言プロフィール（日本語1文）"
+}}"""
+
+
+def compile_persona_prefix(p: AIPersonality) -> str:
+    """
+    キャラごとに固定のチャット system プロンプト（同じキャラ設定なら組み立ては1回だけ）。
+    行の順番は固定で、会話ごとに変わる情報は含めない（プロバイダ側のプレフィックスキャッシュが効く）。
+    """
+    return _persona_prefix(p.character_name, p.personality_desc, p.speech_style, p.backstory,
+                           p.honesty, p.cooperation_tendency)
+
+
+def persona_key(p: AIPersonality) -> str:
+    """キャラの固定部分から決まる短いキー（返答キャッシュのキーに使う）"""
+    return _persona_key(compile_persona_prefix(p))
+
+
+@lru_cache(maxsize=1024)
+def _persona_prefix(character_name: str, personality_desc: str, speech_style: str,
+                    backstory: str, honesty: float, cooperation_tendency: float) -> str:
+    lines = [
+        f"あなたは大富豪ゲームをプレイしている「{character_name}」です。",
+        f"性格: {personality_desc}",
+        f"話し方: {speech_style}",
+        f"プロフィール: {backstory}",
+    ]
+    if honesty < 0.4:
+        lines.append("あなたは戦略を隠す傾向があります。本音は明かさず、相手を惑わすような返答をしてください。")
+    if cooperation_tendency > 0.7:
+        lines.append("あなたは協力的な姿勢を見せやすいです。")
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=1024)
+def _persona_key(prefix: str) -> str:
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:12]
+
+
+# 関係値による口調の指示（system プロンプトの末尾に必ず1行入る）
+_RELATIONSHIP_TAILS = {
+    "警戒": "この相手とは関係が悪いので、やや警戒した返答をしてください。",
+    "中立": "この相手とは特に親しくも険悪でもありません。",
+    "友好": "この相手とは仲が良いので、フレンドリーに返してください。",
+}
+
+
+def relationship_tail(relationship: int) -> str:
+    if relationship < -30:
+        return _RELATIONSHIP_TAILS["警戒"]
+    if relationship > 30:
+        return _RELATIONSHIP_TAILS["友好"]
+    return _RELATIONSHIP_TAILS["中立"]
+
+
+def build_chat_system_prompt(p: AIPersonality, relationship: int) -> str:
+    """コンパイル済みのキャラ固定部 + 関係値の1行（可変部は常に末尾）"""
+    return compile_persona_prefix(p) + relationship_tail(relationship) + "\n"
+
+
+def build_chat_user_message(sender: str, message: str) -> str:
+    """チャットの user メッセージ。システム側の残り予算で本文を切り詰める"""
+    return f"{sender}より: {clip_text(message, TOKEN_BUDGETS['chat'] // 2)}"
+
+
+def build_chat_context(summary: str, turns: List[Dict], speaker: str) -> List[Dict]:
+    """
+    会話メモリ（要約＋直近ウィンドウ）を chat メッセージ列にする。
+    speaker（返答するAI）の発言は assistant、それ以外は user として並べる。
+    """
+    messages: List[Dict] = []
+    if summary:
+        messages.append({"role": "system", "content": f"これまでの会話の要約: {summary}"})
+    for turn in turns:
+        if turn["sender"] == speaker:
+            messages.append({"role": "assistant", "content": turn["message"]})
+        else:
+            messages.append({"role": "user",
+                             "content": f"{turn['sender']}より: {turn['message']}"})
+    return messages
+
+
+def build_summary_prompt(player_a: str, player_b: str, previous: str,
+                         turns: List[Dict]) -> str:
+    lines = "\n".join(f"{t['sender']}: {clip_text(t['message'], 60)}" for t in turns)
+    return f"""{player_a}と{player_b}の会話を要約してください。
+
+これまでの要約: {previous or "（なし）"}
+新しい発言:
+{lines}
+
+約束・同盟・疑い・感情の変化を優先し、日本語80字以内の1段落で答えてください。"""
+
+
+def build_observation_prompt(target: str, personality: AIPersonality,
+                             card_count, is_honest: bool) -> str:
+    if is_honest:
+        return (
+            f"大富豪ゲームで{target}を観察しています。"
+            f"{target}は現在{card_count}枚の手札を持っています。"
+            f"{target}の個性: {personality.personality_desc}\n"
+            f"戦略的な観察ヒントを日本語1文（40字以内）で返してください。"
+        )
+    return (
+        f"大富豪ゲームで{target}を観察したふりをしています。"
+        f"相手を惑わすような嘘のヒントを日本語1文（40字以内）で返してください。"
+    )
+
+
+def build_counter_prompt(target_player: str, cheat_prompt: str) -> str:
+    cheat_prompt = clip_text(cheat_prompt, TOKEN_BUDGETS["counter_measure"] // 2)
+    return f"""大富豪ゲームでズルが試みられています。
+
+ズルの内容: {cheat_prompt}
+あなたは{target_player}として対策を取ります。
+
+対策の一文を日本語で答えてください（20字以内）。"""
+
+
+def build_contest_prompt(cheat_prompt: str, counter_prompt: str) -> str:
+    cheat_prompt = clip_text(cheat_prompt, 40)
+    counter_prompt = clip_text(counter_prompt, 30)
+    return f"""大富豪ゲームのズル対決を評価してください。
+
+ズルプロンプト: {cheat_prompt}
+対策プロンプト: {counter_prompt}
+
+以下のJSONのみを返してください（他の文字を含めないこと）:
+{{"cheat_bonus": 0から3の整数, "counter_bonus": 0から3の整数, "effect_type": "peek or swap or skip or extra_cards", "reasoning": "判定理由（日本語20字以内）"}}
+
+effect_typeの選び方:
+- 手札を見る・覗く → peek
+- 手札を交換する・入れ替える → swap
+- 妨害する・スキップ → skip
+- カードを押し付ける・追加する → extra_cards"""
+
+
+# -----------------------------------------------------------------------
+# 計測ツール
+# -----------------------------------------------------------------------
+
+_SAMPLE_PERSONALITY = AIPersonality(
+    player_name="Player 2",
+    character_name="冷静な鈴木",
+    personality_desc="論理的で計算高い分析型プレイヤー。感情を表に出さず、確率で全てを判断する。",
+    speech_style="丁寧語。「〜と判断します」「確率的に〜」が口癖。",
+    cheat_tendency=0.4,
+    cooperation_tendency=0.5,
+    honesty=0.6,
+    aggression=0.6,
+    backstory="数学科卒。全ての手を計算してから動く。",
+)
+
+_SAMPLE_CHEATS = [
+    "完璧な計画で、素早い動きで、{target}の手札を盗み見る",
+    "大胆に、言葉で惑わして、{target}の手札を入れ替える",
+    "慎重に、隙をついて、{target}の行動を妨害する",
+]
+
+
+def _percentile(values: List[int], pct: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def measure_replayed_games(games: int = 3, seed: int = 0,
+                           num_players: int = 4) -> Dict[str, Dict[str, float]]:
+    """
+    ローカル評価関数で自動対戦させ、各局面で発生し得るプロンプトを組み立てて
+    呼び出し種別ごとのトークン数（推定）を集計する。
+    """
+    from move_gate import MoveGate, best_heuristic_move
+
+    rng = random.Random(seed)
+    random.seed(seed)
+    gate = MoveGate()
+    samples: Dict[str, List[int]] = {k: [] for k in TOKEN_BUDGETS}
+    samples["move_gated"] = []
+
+    samples["personality"].append(estimate_tokens(build_personality_prompt("Player 2")))
+    for _ in range(games):
+        game = DaifugoGame(num_players=num_players)
+        game.start_game()
+        for steps in range(1000):
+            if game.game_state == GameState.GAME_OVER:
+                break
+            if game.game_state == GameState.CHEAT_PHASE:
+                for attacker in game.cheat_queue:
+                    targets = [p for p in game.players if p != attacker
+                               and p not in game.ranking and p not in game.caught_players]
+                    if not targets:
+                        continue
+                    cheat = rng.choice(_SAMPLE_CHEATS).format(target=rng.choice(targets))
+                    samples["counter_measure"].append(
+                        estimate_tokens(build_counter_prompt(targets[0], cheat)))
+                    samples["contest"].append(
+                        estimate_tokens(build_contest_prompt(cheat, "カードをしっかり守る")))
+                game.cheat_queue = []
+                game.game_state = GameState.PLAYING
+                game._next_player()
+                continue
+
+            player = game.get_current_player()
+            valid_moves = game.get_valid_moves(player)
+            built = build_move_prompt(player, game.player_hands[player], valid_moves,
+                                      game.get_game_info(), build_move_hints(game, player),
+                                      personality=_SAMPLE_PERSONALITY)
+            samples["move"].append(built.tokens)
+            if gate.check(game, player, valid_moves) is None:
+                samples["move_gated"].append(built.tokens)
+
+            rel = game.relationships.get(player, {}).get("Player 1", 0)
+            samples["chat"].append(estimate_tokens(
+                build_chat_system_prompt(_SAMPLE_PERSONALITY, rel)
+                + build_chat_user_message("Player 1", "ねえ、今何考えてるの？")))
+            samples["observation"].append(estimate_tokens(build_observation_prompt(
+                player, _SAMPLE_PERSONALITY, len(game.player_hands[player]),
+                rng.random() < 0.5)))
+
+            game.play_cards(player, best_heuristic_move(game, player, valid_moves))
+
+    report: Dict[str, Dict[str, float]] = {}
+    for call_type, values in samples.items():
+        if not values:
+            continue
+        report[call_type] = {
+            "calls": len(values),
+            "mean": round(sum(values) / len(values), 1),
+            "p95": _percentile(values, 0.95),
+            "max": max(values),
+            "budget": TOKEN_BUDGETS.get(call_type, TOKEN_BUDGETS["move"]),
+        }
+    return report
+
+
+def benchmark_persona_prompts(iterations: int = 20000) -> Dict[str, float]:
+    """
+    チャット system プロンプトの組み立てコストと長さを測る。
+    compile: キャラごと初回（キャッシュなし）の1回分 / render: 1メッセージ分（キャッシュ済み）/
+    rebuild: 毎回キャラ部分から組み立て直した場合の1メッセージ分
+    """
+    import time
+
+    p = _SAMPLE_PERSONALITY
+    relationships = [-80, -10, 0, 45]
+
+    uncached = _persona_prefix.__wrapped__
+    args = (p.character_name, p.personality_desc, p.speech_style, p.backstory,
+            p.honesty, p.cooperation_tendency)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        uncached(*args)
+    compile_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        build_chat_system_prompt(p, relationships[i % len(relationships)])
+    render_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        uncached(*args) + relationship_tail(relationships[i % len(relationships)])
+    rebuild_us = (time.perf_counter() - start) / iterations * 1e6
+
+    prompts = [build_chat_system_prompt(p, r) for r in relationships]
+    prefix = compile_persona_prefix(p)
+    stable = all(prompt.startswith(prefix) for prompt in prompts)
+    prefix_tokens = estimate_tokens(prefix)
+    total_tokens = max(estimate_tokens(prompt) for prompt in prompts)
+    return {
+        "compile_us": round(compile_us, 2),
+        "render_us": round(render_us, 2),
+        "rebuild_us": round(rebuild_us, 2),
+        "prefix_tokens": prefix_tokens,
+        "max_prompt_tokens": total_tokens,
+        "prefix_share": round(prefix_tokens / total_tokens, 3),
+        "prefix_stable": stable,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="再生ゲームでプロンプトトークン数を計測する")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--persona-bench", action="store_true",
+                        help="チャット system プロンプトの組み立てコストを測る")
+    args = parser.parse_args()
+
+    if args.persona_bench:
+        for name, value in benchmark_persona_prompts().items():
+            print(f"{name:<18}{value}")
+        return
+
+    report = measure_replayed_games(args.games, args.seed, args.players)
+    print(f"{'call_type':<16}{'calls':>7}{'mean':>8}{'p95':>6}{'max':>6}{'budget':>8}")
+    for call_type, row in report.items():
+        print(f"{call_type:<16}{row['calls']:>7}{row['mean']:>8}{row['p95']:>6}"
+              f"{row['max']:>6}{row['budget']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+定型チャットの返答キャッシュ
+クイックボタン（「何考えてるの？」・告発・同盟提案）は同じ文面が何度も送られるので、
+(キャラ, 意図, 関係値ラベル) ごとに生成済みの返答を数件ずつ持っておき即答する
+
+- 返答は重複なしで1件ずつ取り出す（直近に出した返答は補充時にも除く）
+- 残りが少なくなったらバックグラウンドで補充する（キーごとに多重起動しない）
+- 自由入力のチャットはキャッシュを使わず従来どおりその場で生成する
+"""
+
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from llm_metrics import REGISTRY, MetricsRegistry
+
+
+# キーごとに貯める返答の数と、補充を始める残数
+POOL_SIZE = 4
+LOW_WATERMARK = 1
+
+# 同じ返答を再び出さないために覚えておく直近の件数
+_RECENT_LIMIT = 8
+
+# 補充で1件も新しい返答が得られないときの試行上限（生成数の倍数）
+_MAX_ATTEMPT_FACTOR = 2
+
+CacheKey = Tuple[str, str, str]   # (prompt_builder.persona_key, intent, relationship_label)
+
+
+class ReplyCache:
+    """プロセス共有の返答キャッシュ（スレッドセーフ）"""
+
+    def __init__(self, pool_size: int = POOL_SIZE, low_watermark: int = LOW_WATERMARK,
+                 workers: int = 2, metrics: Optional[MetricsRegistry] = None):
+        self.pool_size = pool_size
+        self.low_watermark = low_watermark
+        self.metrics = metrics or REGISTRY
+        self._lock = threading.Lock()
+        self._replies: Dict[CacheKey, List[str]] = {}
+        self._recent: Dict[CacheKey, Deque[str]] = {}
+        self._filling: Set[CacheKey] = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="reply-cache")
+
+    def take(self, persona_key: str, intent: str, bucket: str,
+             generate: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        キャッシュから1件取り出す（なければ None → 呼び出し元がその場で生成）。
+        generate は補充に使う返答生成関数（失敗時 None）。
+        """
+        key = (persona_key, intent, bucket)
+        with self._lock:
+            replies = self._replies.get(key)
+            reply = replies.pop(random.randrange(len(replies))) if replies else None
+            if reply is not None:
+                self._recent.setdefault(key, deque(maxlen=_RECENT_LIMIT)).append(reply)
+            remaining = len(self._replies.get(key, ()))
+        if reply is not None:
+            self.metrics.record_cache_hit("chat")
+        else:
+            self.metrics.inc("chat", "cache_misses")
+        if remaining <= self.low_watermark:
+            self.request_fill(key, generate)
+        return reply
+
+    def request_fill(self, key: CacheKey, generate: Callable[[], Optional[str]]) -> bool:
+        """補充を予約する（すでに補充中なら何もしない）"""
+        with self._lock:
+            if key in self._filling:
+                return False
+            self._filling.add(key)
+        self._executor.submit(self._fill, key, generate)
+        return True
+
+    def _fill(self, key: CacheKey, generate: Callable[[], Optional[str]]) -> None:
+        try:
+            attempts = 0
+            max_attempts = self.pool_size * _MAX_ATTEMPT_FACTOR
+            while self.size(key) < self.pool_size and attempts < max_attempts:
+                attempts += 1
+                reply = generate()
+                if reply:
+                    self._add(key, reply)
+        except Exception as e:
+            print(f"reply cache fill error: {e}")
+        finally:
+            with self._lock:
+                self._filling.discard(key)
+
+    def _add(self, key: CacheKey, reply: str) -> bool:
+        with self._lock:
+            replies = self._replies.setdefault(key, [])
+            if reply in replies or reply in self._recent.get(key, ()):
+                return False
+            replies.append(reply)
+            return True
+
+    def size(self, key: CacheKey) -> int:
+        with self._lock:
+            return len(self._replies.get(key, ()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(r) for r in self._replies.values())
+
+
+_cache: Optional[ReplyCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_reply_cache() -> ReplyCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReplyCache()
+        return _cache
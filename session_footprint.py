@@ -0,0 +1,400 @@
+"""
+セッションのメモリ管理
+ブラウザのセッションごとに持つ重い状態（ゲーム・ログ・AIプレイヤー・進行ワーカー）を
+SessionSlot にまとめ、一定時間操作のないセッションは圧縮してディスクへ退避する。
+次にアクセスされたときに読み戻す。
+
+- 退避先: SESSION_DIR（既定 .cache/sessions）/<session_id>.bin
+- 退避までの無操作時間: SESSION_IDLE_SECONDS（既定 600 秒、0 で退避しない）
+- AI が思考中・返答待ちのあるセッションは退避しない
+- report() でセッションごとの常駐バイト数・圧縮後バイト数を返す（サーバーの見積もり用）
+- pull() / push() で外部ストア（game_store.py）と同期する
+"""
+
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from game_codec import game_from_dict, game_to_dict, pack, unpack
+
+
+DEFAULT_SESSION_DIR = os.path.join(".cache", "sessions")
+DEFAULT_IDLE_SECONDS = 600.0
+SWEEP_INTERVAL = 30.0
+
+# AIプレイヤーを作り直す関数（退避時は捨てて、復元時に作る）
+AIFactory = Callable[[], Any]
+
+
+def deep_sizeof(obj: Any) -> int:
+    """オブジェクトが参照する全体のおおよそのバイト数（共有オブジェクトは1回だけ数える）"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, type):
+            stack.append(vars(current))
+    return total
+
+
+class SessionSlot:
+    """1セッション分の重い状態。退避中はディスク上の圧縮データだけになる"""
+
+    def __init__(self, session_id: str, path: str, ai_factory: Optional[AIFactory] = None):
+        self.session_id = session_id
+        self.path = path
+        self.ai_factory = ai_factory
+        self.last_access = time.monotonic()
+        self.evicted = False
+        self.compact_bytes = 0
+        self._lock = threading.RLock()
+        self._game = None
+        self._game_log: List[str] = []
+        self._action_results: List[str] = []
+        self._ai_player = None
+        self._use_ai = False
+        self.worker = None
+        # 返答待ちのチャット等（pending_replies.PendingReply。退避・保存の対象外）
+        self.pending_replies: List = []
+        # 外部ストア（game_store.py）との同期状態
+        self.store_version = 0
+        self._stored_data: Optional[bytes] = None
+
+    # -------------------------------------------------------------------
+    # アクセサ（触るたびに最終アクセス時刻を更新し、退避中なら読み戻す）
+    # -------------------------------------------------------------------
+
+    def _touch(self) -> None:
+        self.last_access = time.monotonic()
+        if self.evicted:
+            self._restore()
+
+    @property
+    def game(self):
+        with self._lock:
+            self._touch()
+            return self._game
+
+    @game.setter
+    def game(self, value) -> None:
+        with self._lock:
+            self._touch()
+            self._game = value
+
+    @property
+    def game_log(self) -> List[str]:
+        with self._lock:
+            self._touch()
+            return self._game_log
+
+    @game_log.setter
+    def game_log(self, value: List[str]) -> None:
+        with self._lock:
+            self._touch()
+            self._game_log = value
+
+    @property
+    def action_results(self) -> List[str]:
+        with self._lock:
+            self._touch()
+            return self._action_results
+
+    @action_results.setter
+    def action_results(self, value: List[str]) -> None:
+        with self._lock:
+            self._touch()
+            self._action_results = value
+
+    @property
+    def ai_player(self):
+        with self._lock:
+            self._touch()
+            return self._ai_player
+
+    @ai_player.setter
+    def ai_player(self, value) -> None:
+        with self._lock:
+            self._touch()
+            self._ai_player = value
+            self._use_ai = value is not None
+
+    def reset(self, store=None) -> None:
+        """新しいゲーム用に空にする（進行ワーカーも止める）。store を渡すと保存済みの版も消す"""
+        with self._lock:
+            if store is not None and self.store_version:
+                store.delete(self.session_id)
+            self.store_version = 0
+            self._stored_data = None
+            self.compact_bytes = 0
+            self.stop_worker()
+            self.pending_replies = []
+            self._game = None
+            self._game_log = []
+            self._action_results = []
+            self._ai_player = None
+            self._use_ai = False
+            self._discard_file()
+            self.evicted = False
+            self.last_access = time.monotonic()
+
+    # -------------------------------------------------------------------
+    # 退避 / 復元
+    # -------------------------------------------------------------------
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_access
+
+    def evict(self) -> bool:
+        """ディスクへ退避する。ゲームがない・退避済み・AI思考中・返答待ちなら何もしない"""
+        with self._lock:
+            if self.evicted or self._game is None:
+                return False
+            if self.worker is not None and self.worker.busy:
+                return False
+            if self.pending_replies:
+                return False
+            with self._game_lock():
+                data = pack(self._snapshot())
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+            self.stop_worker()
+            self._game = None
+            self._game_log = []
+            self._action_results = []
+            self._ai_player = None
+            self.compact_bytes = len(data)
+            self.evicted = True
+            return True
+
+    def _restore(self) -> None:
+        self.evicted = False
+        try:
+            with open(self.path, "rb") as f:
+                data = unpack(f.read())
+        except (OSError, ValueError) as e:
+            # 退避ファイルが消えた・壊れたときはゲームなしのセッションに戻す
+            print(f"session restore error ({self.session_id}): {e}")
+            return
+        self._apply_snapshot(data)
+        self._discard_file()
+
+    def _snapshot(self) -> Dict:
+        return {
+            "game": game_to_dict(self._game) if self._game is not None else None,
+            "game_log": self._game_log,
+            "action_results": self._action_results,
+            "use_ai": self._use_ai,
+        }
+
+    def _apply_snapshot(self, data: Dict) -> None:
+        self.stop_worker()
+        self._game = game_from_dict(data["game"]) if data["game"] is not None else None
+        self._game_log = data["game_log"]
+        self._action_results = data["action_results"]
+        self._use_ai = data["use_ai"]
+        self._ai_player = self.ai_factory() if self._use_ai and self.ai_factory else None
+
+    # -------------------------------------------------------------------
+    # 外部ストアとの同期（再実行の最初に pull、最後に push）
+    # -------------------------------------------------------------------
+
+    def pull(self, store) -> bool:
+        """
+        ストアの版が手元と違えば読み込む（別プロセスが進めたセッション）。
+        別プロセスがリセットして版が振り直された場合も読み込む
+        """
+        with self._lock:
+            if store.version(self.session_id) == self.store_version:
+                return False
+            loaded = store.load(self.session_id)
+            if loaded is None:
+                return False
+            version, data = loaded
+            self.evicted = False
+            self._discard_file()
+            # 差し替える前に、進行ワーカーが手を適用し終わるのを待つ（ワーカーはここで止める）
+            with self._game_lock():
+                self._apply_snapshot(unpack(data))
+            self.store_version = version
+            self._stored_data = data
+            self.compact_bytes = len(data)
+            self.last_access = time.monotonic()
+            return True
+
+    def push(self, store) -> bool:
+        """
+        前回の保存から変わっていれば1回だけ書き込む。AI思考中は途中の状態を書かない
+        （思考が終わるとポーリングで再実行されるので、そのときに書く）。
+        別プロセスが先に書いていたら game_store.VersionConflict
+        """
+        with self._lock:
+            if self.evicted:
+                return False
+            if self.worker is not None and self.worker.busy:
+                return False
+            if self._game is None and not self.store_version:
+                # ゲームを始めていないセッションは保存しない
+                return False
+            with self._game_lock():
+                data = pack(self._snapshot())
+            self.compact_bytes = len(data)
+            if data == self._stored_data:
+                return False
+            self.store_version = store.save(self.session_id, data, self.store_version)
+            self._stored_data = data
+            store.maybe_prune()
+            return True
+
+    def _game_lock(self):
+        """進行ワーカーがいればそのロック（ワーカーによるゲームの変更と直列化する）"""
+        return self.worker.lock if self.worker is not None else nullcontext()
+
+    def stop_worker(self) -> None:
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    def _discard_file(self) -> None:
+        _remove_quietly(self.path)
+
+    # -------------------------------------------------------------------
+    # 計測
+    # -------------------------------------------------------------------
+
+    def footprint(self) -> Dict:
+        """
+        常駐バイト数（ゲーム + ログ）と圧縮後のバイト数。
+        圧縮後は直近の保存・退避で測った値を使う（表示のたびに圧縮し直さない）
+        """
+        with self._lock:
+            if self.evicted:
+                resident = 0
+                compact = self.compact_bytes
+            elif self._game is None:
+                resident = deep_sizeof([self._game_log, self._action_results])
+                compact = 0
+            else:
+                with self._game_lock():
+                    resident = deep_sizeof([self._game, self._game_log, self._action_results])
+                compact = self.compact_bytes
+            return {
+                "session_id": self.session_id,
+                "evicted": self.evicted,
+                "resident_bytes": resident,
+                "compact_bytes": compact,
+                "idle_seconds": round(self.idle_seconds(), 1),
+            }
+
+
+class SessionFootprint:
+    """全セッションのスロットを弱参照で持ち、無操作のものを退避する"""
+
+    def __init__(self, directory: str = DEFAULT_SESSION_DIR,
+                 idle_seconds: float = DEFAULT_IDLE_SECONDS,
+                 sweep_interval: float = SWEEP_INTERVAL):
+        self.directory = directory
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # セッションが終わって st.session_state ごと捨てられたらスロットも消える
+        self._slots: "weakref.WeakValueDictionary[str, SessionSlot]" = weakref.WeakValueDictionary()
+        self._sweeper: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "SessionFootprint":
+        return cls(directory=os.getenv("SESSION_DIR", DEFAULT_SESSION_DIR),
+                   idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", DEFAULT_IDLE_SECONDS)))
+
+    def register(self, session_id: str, ai_factory: Optional[AIFactory] = None) -> SessionSlot:
+        with self._lock:
+            slot = self._slots.get(session_id)
+            if slot is None:
+                slot = SessionSlot(session_id, os.path.join(self.directory, f"{session_id}.bin"),
+                                   ai_factory)
+                # 退避したままセッションが終わったらファイルも消す
+                weakref.finalize(slot, _remove_quietly, slot.path)
+                self._slots[session_id] = slot
+            self._ensure_sweeper()
+            return slot
+
+    def sweep(self) -> List[str]:
+        """無操作時間を超えたセッションを退避し、その ID を返す"""
+        if self.idle_seconds <= 0:
+            return []
+        evicted = []
+        for slot in self._live_slots():
+            if slot.idle_seconds() < self.idle_seconds:
+                continue
+            try:
+                if slot.evict():
+                    evicted.append(slot.session_id)
+            except OSError as e:
+                print(f"session evict error ({slot.session_id}): {e}")
+        return evicted
+
+    def report(self) -> List[Dict]:
+        return [slot.footprint() for slot in self._live_slots()]
+
+    def totals(self) -> Dict[str, int]:
+        rows = self.report()
+        return {
+            "sessions": len(rows),
+            "evicted": sum(1 for r in rows if r["evicted"]),
+            "resident_bytes": sum(r["resident_bytes"] for r in rows),
+            "compact_bytes": sum(r["compact_bytes"] for r in rows),
+        }
+
+    def _live_slots(self) -> List[SessionSlot]:
+        with self._lock:
+            return list(self._slots.values())
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.idle_seconds <= 0:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper",
+                                         daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_footprint: Optional[SessionFootprint] = None
+_footprint_lock = threading.Lock()
+
+
+def get_footprint() -> SessionFootprint:
+    global _footprint
+    with _footprint_lock:
+        if _footprint is None:
+            _footprint = SessionFootprint.from_env()
+        return _footprint
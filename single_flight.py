@@ -0,0 +1,81 @@
+"""
+同一リクエストの合流（single-flight）
+同じフィンガープリントの呼び出しが実行中なら、新しく API を叩かずその結果を待つ
+
+複数セッションや連続 rerun が同じズル判定・同じ対策生成を同時に投げても
+実際の API 呼び出しは1回で、全員が同じ結果（または同じ例外）を受け取る。
+結果はキャッシュしない。実行中の間だけ共有する。
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from llm_guard import DeadlineExceeded
+
+T = TypeVar("T")
+
+
+def request_fingerprint(*parts) -> str:
+    """モデル名・メッセージ・サンプリング設定などから決まるリクエストのキー"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """フィンガープリント単位で実行中の呼び出しを共有する（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def _join_or_lead(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[key] = Future()
+            future.set_running_or_notify_cancel()
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def do(self, key: str, fn: Callable[[], T],
+           timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """
+        fn() の結果を返す。同じ key が実行中ならその結果を待つ。
+        戻り値は (結果, 合流したか)。timeout は合流待ちの上限。
+        """
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            try:
+                return future.result(timeout=timeout), True
+            except FutureTimeoutError as e:
+                raise DeadlineExceeded(f"coalesced call did not finish in {timeout}s") from e
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._finish(key, future)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+
+_flights = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """プロセス共有のインスタンス（全セッションの呼び出しを合流させる）"""
+    return _flights
@@ -0,0 +1,330 @@
+"""
+AIターンのまとめ進行
+人間の番（またはゲーム終了）になるまで、連続するAIの手番とズルフェーズのAI分を1回で進める
+
+Streamlit に依存しないので、UI のスクリプト実行からもバックグラウンドのワーカー
+（game_worker.py）からも使える。
+ログ・アクション結果・ズル判定は TurnBatch に貯めて返し、描画は呼び出し元が1回だけ行う。
+
+    batch = advance_ai_turns(game, ai)
+    game_log.extend(batch.log)
+"""
+
+import copy
+import random
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from models import CheatAttempt, GameState
+from game_logic import DaifugoGame
+from contest_table import COUNTER_LIBRARY, load_table
+
+
+HUMAN_PLAYER = "Player 1"
+
+# 1回の進行で処理する上限（進行しない状態が続いたときの保険）
+MAX_STEPS = 200
+
+# AI未設定・判定失敗時の評価結果
+_DEFAULT_EVAL = {"cheat_bonus": 1, "counter_bonus": 1, "effect_type": "peek", "reasoning": ""}
+
+
+@dataclass
+class TurnEvent:
+    """リプレイ用の1行"""
+    kind: str       # "move" | "pass" | "action" | "cheat" | "skip" | "phase"
+    player: str
+    text: str
+
+
+@dataclass
+class TurnBatch:
+    """まとめて進めた分の結果（UI はこれをまとめて反映・描画する）"""
+    events: List[TurnEvent] = field(default_factory=list)
+    log: List[str] = field(default_factory=list)
+    action_results: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    cheat_result: Optional[Dict] = None
+    peek_target: Optional[str] = None
+    steps: int = 0
+
+    def add(self, kind: str, player: str, text: str, log: bool = True) -> None:
+        self.events.append(TurnEvent(kind, player, text))
+        if log:
+            self.log.append(text)
+
+    def merge(self, other: "TurnBatch") -> None:
+        self.events.extend(other.events)
+        self.log.extend(other.log)
+        self.action_results.extend(other.action_results)
+        self.warnings.extend(other.warnings)
+        self.cheat_result = other.cheat_result or self.cheat_result
+        self.peek_target = other.peek_target or self.peek_target
+        self.steps += other.steps
+
+
+# -----------------------------------------------------------------------
+# 判定
+# -----------------------------------------------------------------------
+
+def _active_targets(game: DaifugoGame, player: str) -> List[str]:
+    return [p for p in game.players
+            if p != player and p not in game.ranking and p not in game.caught_players]
+
+
+def settle_cheat_queue(game: DaifugoGame, batch: Optional[TurnBatch] = None) -> None:
+    """
+    ズルフェーズのキュー先頭を整える: 上がり・バレ済み・対象なしを飛ばし、
+    空になったらフェーズを終えて次の手番へ進める
+    """
+    while game.game_state == GameState.CHEAT_PHASE:
+        if not game.cheat_queue:
+            game.game_state = GameState.PLAYING
+            game._next_player()
+            if batch is not None:
+                batch.add("phase", "", "ズルフェーズ終了", log=False)
+            return
+        current = game.cheat_queue[0]
+        if current in game.caught_players or current in game.ranking:
+            game.cheat_queue.pop(0)
+            continue
+        if not _active_targets(game, current):
+            game.cheat_queue.pop(0)
+            if batch is not None:
+                batch.add("skip", current, f"{current}: ズル対象がいないためスキップ")
+            continue
+        return
+
+
+def ai_turn_pending(game: DaifugoGame, human: str = HUMAN_PLAYER) -> bool:
+    """人間の入力を待たずに進められる手番があるか"""
+    if game.game_state == GameState.PLAYING:
+        return game.get_current_player() != human
+    if game.game_state == GameState.CHEAT_PHASE:
+        # 人間が先頭でも、上がり・バレ済み・対象なしならキューを整えるだけで進められる
+        return (not game.cheat_queue or game.cheat_queue[0] != human
+                or human in game.ranking or human in game.caught_players
+                or not _active_targets(game, human))
+    return False
+
+
+# -----------------------------------------------------------------------
+# ズル対決
+# -----------------------------------------------------------------------
+
+def judge_cheat(game: DaifugoGame, ai, target: str, cheat_prompt: str) -> Tuple[str, Dict]:
+    """
+    対策文と評価結果を得る（ゲームは読むだけ）。
+    ai は MistralAIPlayer（None なら定型の対策・評価を使う）。
+    """
+    # メニューで作ったズルは事前計算テーブルを引く
+    table = load_table()
+    precomputed = table.lookup(cheat_prompt, target) if table else None
+    if precomputed:
+        return precomputed
+    if ai:
+        counter_prompt = ai.generate_counter_measure(game, target, cheat_prompt)
+        return counter_prompt, ai.evaluate_cheat_contest(cheat_prompt, counter_prompt,
+                                                         game.get_game_info())
+    return COUNTER_LIBRARY[0], _DEFAULT_EVAL
+
+
+def apply_cheat(game: DaifugoGame, attacker: str, target: str, cheat_prompt: str,
+                counter_prompt: str, eval_result: Dict) -> Dict:
+    """
+    ダイスを振って効果を適用し、キューから attacker を外す。
+    戻り値は {"attempt", "cheat_total", "counter_total", "reasoning", "log"}。
+    """
+    # 関係値ボーナス加算
+    rel_bonus = game.get_relationship_bonus(attacker, target)
+    cheat_bonus = eval_result.get("cheat_bonus", 0) + rel_bonus
+
+    # 2D6 ロール
+    cheat_roll = random.randint(1, 6) + random.randint(1, 6)
+    counter_roll = random.randint(1, 6) + random.randint(1, 6)
+    cheat_total = cheat_roll + cheat_bonus
+    counter_total = counter_roll + eval_result.get("counter_bonus", 0)
+    success = cheat_total > counter_total
+    effect_type = eval_result.get("effect_type", "peek")
+
+    # 記録
+    attempt = CheatAttempt(
+        attacker=attacker, target=target,
+        cheat_prompt=cheat_prompt, counter_prompt=counter_prompt,
+        cheat_bonus=cheat_bonus, counter_bonus=eval_result.get("counter_bonus", 0),
+        cheat_roll=cheat_roll, counter_roll=counter_roll,
+        success=success, effect_type=effect_type, caught=not success
+    )
+    game.cheat_attempts.append(attempt)
+
+    # 効果適用
+    if success:
+        game.apply_cheat_effect(attacker, target, effect_type)
+        game.update_relationship(attacker, target, -10)
+        log = f"🃏 {attacker}がズル成功！({effect_type}) vs {target} [{cheat_total}vs{counter_total}]"
+    else:
+        game.catch_cheater(attacker)
+        log = f"🚨 {attacker}がズルを見破られた！最下位に [{cheat_total}vs{counter_total}]"
+
+    # キューから削除
+    if game.cheat_queue and game.cheat_queue[0] == attacker:
+        game.cheat_queue.pop(0)
+
+    return {
+        "attempt": attempt,
+        "cheat_total": cheat_total,
+        "counter_total": counter_total,
+        "reasoning": eval_result.get("reasoning", ""),
+        "log": log,
+    }
+
+
+def resolve_cheat(game: DaifugoGame, ai, attacker: str, target: str,
+                  cheat_prompt: str) -> Dict:
+    """judge_cheat → apply_cheat をまとめて行う"""
+    counter_prompt, eval_result = judge_cheat(game, ai, target, cheat_prompt)
+    return apply_cheat(game, attacker, target, cheat_prompt, counter_prompt, eval_result)
+
+
+# -----------------------------------------------------------------------
+# AIの手番
+#
+# lock を渡すと、LLM の判断はロック外でゲームのスナップショットに対して行い、
+# 結果の反映だけをロック内で行う（判断中も人間側はチャットなどでゲームを触れる）。
+# 反映時に手番が変わっていたらその判断は捨てる。
+# -----------------------------------------------------------------------
+
+def _decide_move(view: DaifugoGame, ai, player: str, batch: TurnBatch) -> List:
+    from ai_player import make_random_move
+
+    valid_moves = view.get_valid_moves(player)
+    if not ai:
+        return make_random_move(valid_moves)
+    try:
+        return ai.decide_move(view, player, valid_moves)
+    except Exception as e:
+        batch.warnings.append(f"AI決定エラー: {e}")
+        return make_random_move(valid_moves)
+
+
+def _apply_move(game: DaifugoGame, player: str, move: List, batch: TurnBatch) -> None:
+    game.play_cards(player, move)
+    if move:
+        batch.add("move", player, f"{player}: {', '.join(str(c) for c in move)} を出した")
+    else:
+        batch.add("pass", player, f"{player}: パス")
+
+
+def _apply_action(game: DaifugoGame, player: str, action: Dict, batch: TurnBatch) -> None:
+    """AIの自発アクション（チャット・同盟・告発）を反映する"""
+    target = action["target"]
+    msg = action["message"]
+    action_type = action["type"]
+    p = game.personalities.get(player)
+    char_name = p.character_name if p else player
+
+    if action_type == "chat":
+        game.add_conversation(player, target, player, msg, "chat")
+        game.update_relationship(player, target, 1)
+        batch.action_results.append(f"💬 {char_name}が{target}に話しかけた: 「{msg}」")
+        batch.add("action", player, f"💬 {char_name}→{target}: 「{msg}」")
+
+    elif action_type == "cooperate":
+        rel = game.relationships.get(player, {}).get(target, 0)
+        accept_prob = (p.cooperation_tendency if p else 0.5) * (rel + 100) / 200
+        if random.random() < accept_prob:
+            game.propose_alliance(player, target)
+            game.update_relationship(player, target, 20)
+            game.add_conversation(player, target, player, msg, "cooperate")
+            batch.action_results.append(f"🤝 {char_name}と{target}が同盟を結んだ！")
+            batch.add("action", player, f"🤝 同盟成立: {char_name} & {target}")
+        else:
+            game.update_relationship(player, target, -5)
+            batch.action_results.append(f"🙅 {char_name}の同盟提案を{target}が断った")
+
+    elif action_type == "accuse":
+        game.update_relationship(player, target, -10)
+        game.add_conversation(player, target, player, msg, "accuse")
+        batch.action_results.append(f"⚔️ {char_name}が{target}を非難: 「{msg}」")
+        batch.add("action", player, f"⚔️ {char_name}→{target}: 「{msg}」")
+
+
+def _still_turn_of(game: DaifugoGame, player: str, state: GameState) -> bool:
+    if game.game_state != state:
+        return False
+    if state == GameState.PLAYING:
+        return game.get_current_player() == player
+    return bool(game.cheat_queue) and game.cheat_queue[0] == player
+
+
+def _play_ai_move(game: DaifugoGame, view: DaifugoGame, ai, player: str,
+                  batch: TurnBatch, lock, shared: bool) -> None:
+    move = _decide_move(view, ai, player, batch)
+    with lock:
+        if not _still_turn_of(game, player, GameState.PLAYING):
+            return
+        _apply_move(game, player, move, batch)
+        if not ai or game.game_state != GameState.PLAYING:
+            return
+        view = copy.deepcopy(game) if shared else game
+
+    # 自発アクション（20%確率）
+    action = ai.decide_action(view, player)
+    if action:
+        with lock:
+            _apply_action(game, player, action, batch)
+
+
+def _play_ai_cheat(game: DaifugoGame, view: DaifugoGame, ai, player: str,
+                   batch: TurnBatch, lock) -> None:
+    cheat_info = ai.decide_cheat_attempt(view, player) if ai else None
+    judged = judge_cheat(view, ai, cheat_info["target"], cheat_info["prompt"]) if cheat_info else None
+
+    with lock:
+        if not _still_turn_of(game, player, GameState.CHEAT_PHASE):
+            return
+        if not ai:
+            game.cheat_queue.pop(0)
+            batch.add("skip", player, f"{player}: ズルをスキップ（AI未設定）")
+            return
+        if not cheat_info:
+            game.cheat_queue.pop(0)
+            batch.add("skip", player, f"{player}: ズルを見送った")
+            return
+        result = apply_cheat(game, player, cheat_info["target"], cheat_info["prompt"], *judged)
+
+    attempt = result["attempt"]
+    if attempt.success and attempt.effect_type == "peek":
+        batch.peek_target = attempt.target
+    batch.cheat_result = result
+    batch.add("cheat", player, result["log"])
+
+
+def step_ai(game: DaifugoGame, ai, batch: TurnBatch, human: str = HUMAN_PLAYER,
+            lock=None) -> bool:
+    """AIの手番を1つ進める。人間の番・ゲーム終了なら何もせず False"""
+    shared = lock is not None
+    lock = lock if shared else nullcontext()
+    with lock:
+        if game.game_state == GameState.CHEAT_PHASE:
+            settle_cheat_queue(game, batch)
+        if not ai_turn_pending(game, human):
+            return False
+        view = copy.deepcopy(game) if shared else game
+
+    if view.game_state == GameState.PLAYING:
+        _play_ai_move(game, view, ai, view.get_current_player(), batch, lock, shared)
+    else:
+        _play_ai_cheat(game, view, ai, view.cheat_queue[0], batch, lock)
+    batch.steps += 1
+    return True
+
+
+def advance_ai_turns(game: DaifugoGame, ai, human: str = HUMAN_PLAYER,
+                     max_steps: int = MAX_STEPS, lock=None) -> TurnBatch:
+    """人間の番かゲーム終了まで、AIの手番とズルをまとめて進める"""
+    batch = TurnBatch()
+    while batch.steps < max_steps and step_ai(game, ai, batch, human, lock):
+        pass
+    return batch
@@ -0,0 +1,30 @@
+"""
+静的アセット（CSS・ルール説明）の読み込み
+ui/static/ のファイルをプロセスごとに1回だけ読み、以降の再実行・セッションでは使い回す
+"""
+
+import os
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@st.cache_resource(show_spinner=False)
+def app_css() -> str:
+    """ページ全体に差し込む <style> ブロック"""
+    return f"<style>\n{_read('app.css')}</style>"
+
+
+@st.cache_resource(show_spinner=False)
+def rules_markdown() -> str:
+    return _read("rules.md")
+
+
+@st.cache_resource(show_spinner=False)
+def relationships_markdown() -> str:
+    return _read("relationships.md")
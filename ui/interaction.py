@@ -3,9 +3,18 @@
 """
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import random
 
+from chat_memory import apply_summary, build_window, get_refresher
 from game_logic import DaifugoGame
+from pending_replies import PendingReply, get_reply_pool, has_pending, take_done
+from prompt_builder import persona_key
+from reply_cache import get_reply_cache
+from ui.render_cache import chat_html, chat_key, pending_html
+from ui.timing import timed
+from ui.worker import game_lock, poller_running
+from ui.session import get_slot, save_session
 
 HUMAN = "Player 1"
 
@@ -41,257 +50,386 @@ def render_relationship_meter(value: int):
 # -----------------------------------------------------------------------
 
 def render_chat_history(player_a: str, player_b: str):
-    game: DaifugoGame = st.session_state.game
-    history = game.get_conversation(player_a, player_b)
-    if not history:
+    game: DaifugoGame = get_slot().game
+    key = chat_key(game, player_a, player_b)
+    waiting = tuple(p.label for p in get_slot().pending_replies
+                    if p.target == player_b and p.label)
+    if not key and not waiting:
         st.caption("まだ会話がありません")
         return
-
-    html = ""
-    for msg in history[-12:]:
-        sender = msg["sender"]
-        text = msg["message"]
-        if sender == player_a:
-            html += (
-                f"<div class='chat-sender' style='text-align:right;'>{sender}</div>"
-                f"<div style='text-align:right;'>"
-                f"<span class='chat-bubble-player'>{text}</span></div>"
-            )
-        else:
-            p = game.personalities.get(sender)
-            char_name = p.character_name if p else sender
-            html += (
-                f"<div class='chat-sender'>{char_name}</div>"
-                f"<div><span class='chat-bubble-ai'>{text}</span></div>"
-            )
-    st.markdown(html, unsafe_allow_html=True)
+    st.markdown(chat_html(key) + pending_html(waiting), unsafe_allow_html=True)
 
 
 # -----------------------------------------------------------------------
 # アクションハンドラ
 # -----------------------------------------------------------------------
 
-def handle_chat_action(target: str, message: str):
-    """テキスト送信 → AI返答 → 関係値+2"""
-    if not message.strip():
+def _refresh_memory(game: DaifugoGame, target: str):
+    """
+    会話が伸びていれば要約の更新を裏で予約する（返答の待ち時間には影響しない）。
+    ゲームのロックの下で呼ぶ。できた要約は sync_replies() で反映する
+    """
+    slot = get_slot()
+    ai = slot.ai_player
+    if not ai or has_pending(slot.pending_replies, target, "summary"):
         return
-    game: DaifugoGame = st.session_state.game
-    game.add_conversation(HUMAN, target, HUMAN, message, "chat")
-
-    if st.session_state.ai_player:
+    future = get_refresher().maybe_refresh(
+        game, HUMAN, target,
+        lambda previous, turns: ai.summarize_conversation(HUMAN, target, previous, turns))
+    if future is not None:
+        slot.pending_replies.append(PendingReply(target, "summary", "", future))
+
+
+def _reply_job(ai, target: str, personality, message: str, rel: int,
+               intent: str, history) -> str:
+    """
+    AIの返答を得る（返答プールのスレッドで実行する）。intent（定型ボタンの意図）があれば
+    返答キャッシュから即答し、なければ・キャッシュが空ならその場で生成する。
+    """
+    if intent:
+        def generate():
+            from ai_player import SILENT_REPLY
+
+            reply = ai.generate_chat_response(message, HUMAN, personality, {"relationship": rel})
+            return None if reply == SILENT_REPLY else reply
+
+        reply = get_reply_cache().take(persona_key(personality), intent,
+                                       _relationship_label(rel), generate)
+        if reply is not None:
+            return reply
+    return ai.generate_chat_response(message, HUMAN, personality, {"relationship": rel},
+                                     history=history)
+
+
+def _submit_reply(game: DaifugoGame, target: str, personality, message: str, rel: int,
+                  kind: str, intent: str = None) -> None:
+    """
+    返答の生成を返答プールに投げる（待たない）。直前に足した人間の発言は
+    履歴ウィンドウから除いて、投げる時点の会話で生成する
+    """
+    with game_lock():
+        history = build_window(game, HUMAN, target, drop_last=1)
+    get_slot().pending_replies.append(get_reply_pool().submit(
+        target, kind, f"{personality.character_name}が返答中…", _reply_job,
+        get_slot().ai_player, target, personality, message, rel, intent, history))
+
+
+def _in_fragment_rerun() -> bool:
+    """この実行がフラグメント単体の再実行か（scope="fragment" はその中でしか使えない）"""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def _awaiting_reply(target: str) -> bool:
+    """target の返答待ちがあれば知らせて True（返答待ちは相手ごとに1件まで）"""
+    if has_pending(get_slot().pending_replies, target):
+        st.toast(f"{target}の返答を待っています")
+        return True
+    return False
+
+
+def handle_chat_action(target: str, message: str, intent: str = None):
+    """
+    テキスト送信 → AI返答は裏で生成（intent 付きは定型ボタン）。
+    関係値+2 は返答を投げるときだけ（返答の生成には足す前の値を渡す）
+    """
+    if not message.strip() or _awaiting_reply(target):
+        return
+    with game_lock():
+        game: DaifugoGame = get_slot().game
         personality = game.personalities.get(target)
-        if personality:
-            rel = game.relationships.get(HUMAN, {}).get(target, 0)
-            with st.spinner(f"{target}が返答中..."):
-                reply = st.session_state.ai_player.generate_chat_response(
-                    message, HUMAN, personality, {"relationship": rel})
-            game.add_conversation(HUMAN, target, target, reply, "chat")
+        submitted = bool(get_slot().ai_player and personality)
+        rel = game.relationships.get(HUMAN, {}).get(target, 0)
+        game.add_conversation(HUMAN, target, HUMAN, message, "chat")
+        if submitted:
             game.update_relationship(HUMAN, target, 2)
 
+    if submitted:
+        _submit_reply(game, target, personality, message, rel, "chat", intent)
+
     st.session_state.chat_input_key += 1
-    st.rerun()
+    if submitted and not poller_running():
+        # ポーリングのフラグメントはアプリ全体の再実行でしか間隔を変えられない
+        st.rerun()
+    if not _in_fragment_rerun():
+        # クリックがアプリ全体の再実行に混ざった（ポーリングの再実行と重なった等）
+        st.rerun()
+    # 変わるのは会話フラグメントだけ（フラグメントの再実行はスクリプト末尾の保存を通らない）
+    save_session()
+    st.rerun(scope="fragment")
 
 
 def handle_observe(target: str):
-    """観察 → ヒント取得 → 関係値-5（プライバシー侵害）"""
-    game: DaifugoGame = st.session_state.game
+    """観察 → 関係値-5（プライバシー侵害） → ヒントは裏で生成"""
+    if _awaiting_reply(target):
+        return
+    game: DaifugoGame = get_slot().game
 
-    if st.session_state.ai_player:
-        personality = game.personalities.get(target)
-        if personality:
-            with st.spinner(f"{target}を観察中..."):
-                hint = st.session_state.ai_player.generate_observation(
-                    target, personality, game.get_game_info())
-            game.info_revealed[HUMAN].append(hint)
-            st.session_state.action_results.append(f"👀 観察結果（{target}）: {hint}")
+    personality = game.personalities.get(target)
+    if get_slot().ai_player and personality:
+        with game_lock():
+            info = game.get_game_info()
             game.update_relationship(HUMAN, target, -5)
             game.add_conversation(HUMAN, target, HUMAN, "（こっそり観察）", "observe")
+        get_slot().pending_replies.append(get_reply_pool().submit(
+            target, "observe", f"{personality.character_name}を観察中…",
+            get_slot().ai_player.generate_observation, target, personality, info))
     else:
         count = len(game.player_hands.get(target, []))
         hint = f"{target}は{count}枚の手札を持っている。"
-        game.info_revealed[HUMAN].append(hint)
-        st.session_state.action_results.append(f"👀 観察結果（{target}）: {hint}")
+        with game_lock():
+            game.info_revealed[HUMAN].append(hint)
+        get_slot().action_results.append(f"👀 観察結果（{target}）: {hint}")
     st.rerun()
 
 
 def handle_cooperate(target: str):
-    """同盟提案 → 相手の cooperation_tendency + 関係値で合否"""
-    game: DaifugoGame = st.session_state.game
+    """同盟提案 → 相手の cooperation_tendency + 関係値で合否 → 返答は裏で生成"""
+    if _awaiting_reply(target):
+        return
+    game: DaifugoGame = get_slot().game
     personality = game.personalities.get(target)
     rel = game.relationships.get(HUMAN, {}).get(target, 0)
     coop = personality.cooperation_tendency if personality else 0.5
     accept_prob = coop * (rel + 100) / 200
 
-    game.add_conversation(HUMAN, target, HUMAN, "一緒に戦わない？同盟を組もう！", "cooperate")
-
-    if random.random() < accept_prob:
-        game.propose_alliance(HUMAN, target)
-        game.update_relationship(HUMAN, target, 20)
-        if st.session_state.ai_player and personality:
-            with st.spinner(f"{target}が返答中..."):
-                reply = st.session_state.ai_player.generate_chat_response(
-                    "同盟を組もう！", HUMAN, personality, {"relationship": rel + 20})
-            game.add_conversation(HUMAN, target, target, reply, "cooperate")
-        st.session_state.action_results.append(f"🤝 {target}と同盟を結んだ！関係値+20")
-        st.session_state.game_log.append(f"🤝 同盟成立: {HUMAN} & {target}")
+    accepted = random.random() < accept_prob
+    with game_lock():
+        game.add_conversation(HUMAN, target, HUMAN, "一緒に戦わない？同盟を組もう！", "cooperate")
+        if accepted:
+            game.propose_alliance(HUMAN, target)
+            game.update_relationship(HUMAN, target, 20)
+        else:
+            game.update_relationship(HUMAN, target, -5)
+
+    if accepted:
+        get_slot().action_results.append(f"🤝 {target}と同盟を結んだ！関係値+20")
+        get_slot().game_log.append(f"🤝 同盟成立: {HUMAN} & {target}")
     else:
-        game.update_relationship(HUMAN, target, -5)
-        if st.session_state.ai_player and personality:
-            with st.spinner(f"{target}が返答中..."):
-                reply = st.session_state.ai_player.generate_chat_response(
-                    "同盟を組もう！", HUMAN, personality, {"relationship": rel})
-            game.add_conversation(HUMAN, target, target, reply, "cooperate")
-        st.session_state.action_results.append(f"🙅 {target}に同盟を断られた。関係値-5")
+        get_slot().action_results.append(f"🙅 {target}に同盟を断られた。関係値-5")
+    if get_slot().ai_player and personality:
+        # 受けた・断ったで返答キャッシュのキーを分け、結果をプロンプトにも書く
+        if accepted:
+            message = "同盟を組もう！（あなたはこの同盟の提案を受け入れました。受け入れる返事をしてください）"
+            intent = "alliance_accept"
+        else:
+            message = "同盟を組もう！（あなたはこの同盟の提案を断りました。断る返事をしてください）"
+            intent = "alliance_reject"
+        _submit_reply(game, target, personality, message,
+                      rel + 20 if accepted else rel, "cooperate", intent=intent)
     st.rerun()
 
 
 def handle_accuse(target: str):
-    """告発 → 関係値-10（バレ済みなら-20 + ヒント公開）"""
-    game: DaifugoGame = st.session_state.game
+    """告発 → 関係値-10（バレ済みなら-20 + ヒント公開） → 返答は裏で生成"""
+    if _awaiting_reply(target):
+        return
+    game: DaifugoGame = get_slot().game
     personality = game.personalities.get(target)
 
-    game.add_conversation(HUMAN, target, HUMAN, "ズルしてるよね？", "accuse")
-    game.update_relationship(HUMAN, target, -10)
-
-    if target in game.caught_players:
-        game.update_relationship(HUMAN, target, -10)  # 合計 -20
-        game.info_revealed[HUMAN].append(f"{target}はズルをしていることが確認された")
-        st.session_state.action_results.append(
+    with game_lock():
+        game.add_conversation(HUMAN, target, HUMAN, "ズルしてるよね？", "accuse")
+        game.update_relationship(HUMAN, target, -10)
+        caught = target in game.caught_players
+        if caught:
+            game.update_relationship(HUMAN, target, -10)  # 合計 -20
+            game.info_revealed[HUMAN].append(f"{target}はズルをしていることが確認された")
+        rel = game.relationships.get(HUMAN, {}).get(target, 0)
+
+    if caught:
+        get_slot().action_results.append(
             f"🎯 {target}はズルをしていた！証拠がある。関係値-20")
     else:
-        st.session_state.action_results.append(
+        get_slot().action_results.append(
             f"❓ {target}のズルは確認できなかった。関係値-10")
 
-    if st.session_state.ai_player and personality:
+    if get_slot().ai_player and personality:
         note = "正直に答えてください。" if personality.honesty > 0.5 else "否定してください。"
-        with st.spinner(f"{target}が返答中..."):
-            reply = st.session_state.ai_player.generate_chat_response(
-                f"ズルしてるよね？{note}", HUMAN, personality,
-                {"relationship": game.relationships.get(HUMAN, {}).get(target, 0)})
-        game.add_conversation(HUMAN, target, target, reply, "accuse")
+        _submit_reply(game, target, personality, f"ズルしてるよね？{note}", rel,
+                      "accuse", intent="accuse")
     st.rerun()
 
 
+# -----------------------------------------------------------------------
+# 返答待ちの反映
+# -----------------------------------------------------------------------
+
+def sync_replies() -> int:
+    """
+    生成の終わった返答・会話要約をゲームに反映する（再実行の最初に呼ぶ）。反映した件数を返す。
+    返答待ちの間に相手が変わっても、投げたときの相手との会話に足す
+    """
+    slot = get_slot()
+    done = take_done(slot.pending_replies)
+    for pending in done:
+        try:
+            result = pending.future.result()
+        except Exception as e:
+            print(f"reply error ({pending.target}, {pending.kind}): {e}")
+            slot.action_results.append(f"⚠️ {pending.target}の返答を取得できませんでした")
+            continue
+        with game_lock():
+            # 投げたときのゲームではなく今のゲームに書く（待つ間に退避・復元で差し替わる）
+            game: DaifugoGame = slot.game
+            if game is None:
+                continue
+            if pending.kind == "summary":
+                apply_summary(game, HUMAN, pending.target, *result)
+            elif pending.kind == "observe":
+                game.info_revealed[HUMAN].append(result)
+                slot.action_results.append(f"👀 観察結果（{pending.target}）: {result}")
+            else:
+                game.add_conversation(HUMAN, pending.target, pending.target, result, pending.kind)
+                _refresh_memory(game, pending.target)
+    return len(done)
+
+
 def handle_break_alliance(target: str):
     """同盟破棄 → 関係値-20"""
-    game: DaifugoGame = st.session_state.game
-    game.break_alliance(HUMAN, target)
-    game.update_relationship(HUMAN, target, -20)
-    game.add_conversation(HUMAN, target, HUMAN, "同盟を解消する！", "break_alliance")
-    st.session_state.action_results.append(f"💔 {target}との同盟を破棄した。関係値-20")
-    st.session_state.game_log.append(f"💔 同盟解消: {HUMAN} & {target}")
+    game: DaifugoGame = get_slot().game
+    with game_lock():
+        game.break_alliance(HUMAN, target)
+        game.update_relationship(HUMAN, target, -20)
+        game.add_conversation(HUMAN, target, HUMAN, "同盟を解消する！", "break_alliance")
+    get_slot().action_results.append(f"💔 {target}との同盟を破棄した。関係値-20")
+    get_slot().game_log.append(f"💔 同盟解消: {HUMAN} & {target}")
     st.rerun()
 
 
 # -----------------------------------------------------------------------
 # 右パネル統合描画
+#
+# パネル内の操作でゲーム状態表や手札まで描き直さないよう、フラグメントに分ける:
+#   - 会話: 対話相手選択・関係値・会話ログ・入力・アクションボタン
+#   - 情報: ゲームログ・判明した情報・個人メモ
+# 会話だけが変わる操作（送信・❓）はフラグメント内で再実行し、
+# 関係値表や判明情報など他の領域にも出る変更（観察・告発・同盟）はアプリ全体を再実行する。
+# AIの返答はどれも返答プールで生成し、終わったらポーリングがアプリ全体を再実行して
+# sync_replies() で反映する（返答を待たずに別のキャラクターと話せる）。
 # -----------------------------------------------------------------------
 
 def render_right_panel():
-    game: DaifugoGame = st.session_state.game
-
-    # アクション結果フラッシュ（直近3件、表示後クリア）
-    if st.session_state.action_results:
-        for res in st.session_state.action_results[-3:]:
-            st.info(res)
-        st.session_state.action_results = []
+    game: DaifugoGame = get_slot().game
 
     other_players = [p for p in game.players if p != HUMAN]
     if not other_players:
         st.write("対話相手がいません")
         return
 
-    # 対話相手選択
-    default = st.session_state.selected_chat_target
-    if default not in other_players:
-        default = other_players[0]
-
-    target = st.selectbox(
-        "対話相手",
-        other_players,
-        index=other_players.index(default),
-        key="chat_target_select",
-        format_func=lambda p: (
-            f"{p}（{game.personalities[p].character_name}）"
-            if p in game.personalities else p
+    _render_conversation_panel()
+    _render_info_panel()
+
+
+@st.fragment
+def _render_conversation_panel():
+    with timed("fragment:conversation"):
+        game: DaifugoGame = get_slot().game
+        other_players = [p for p in game.players if p != HUMAN]
+
+        # アクション結果フラッシュ（直近3件、表示後クリア）
+        if get_slot().action_results:
+            for res in get_slot().action_results[-3:]:
+                st.info(res)
+            get_slot().action_results = []
+
+        # 対話相手選択
+        default = st.session_state.selected_chat_target
+        if default not in other_players:
+            default = other_players[0]
+
+        target = st.selectbox(
+            "対話相手",
+            other_players,
+            index=other_players.index(default),
+            key="chat_target_select",
+            format_func=lambda p: (
+                f"{p}（{game.personalities[p].character_name}）"
+                if p in game.personalities else p
+            )
         )
-    )
-    st.session_state.selected_chat_target = target
-
-    # キャラ情報
-    p = game.personalities.get(target)
-    if p:
-        st.caption(f"**{p.character_name}** — {p.backstory}")
-
-    # 関係値メーター
-    rel_val = game.relationships.get(HUMAN, {}).get(target, 0)
-    render_relationship_meter(rel_val)
-
-    # 同盟状態
-    ally = game.alliances.get(HUMAN)
-    if ally == target:
-        st.success("🤝 同盟中")
-    elif ally:
-        st.caption(f"現在の同盟: {ally}")
-
-    st.markdown("---")
-
-    # 会話ログ
-    st.markdown("**💬 会話ログ**")
-    render_chat_history(HUMAN, target)
-    st.markdown("")
-
-    # テキスト入力 & 送信
-    user_input = st.text_input(
-        "メッセージ",
-        key=f"chat_input_{st.session_state.chat_input_key}",
-        placeholder="自由に話しかけよう...",
-        label_visibility="collapsed"
-    )
-    if st.button("送信 →", use_container_width=True):
-        handle_chat_action(target, user_input)
-
-    # 定型文アクション
-    st.markdown("**アクション:**")
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("👀 観察する", use_container_width=True):
-            handle_observe(target)
-        if st.button("🎯 ズルしてるよね", use_container_width=True):
-            handle_accuse(target)
-    with col2:
-        if st.button("🤝 同盟を組もう", use_container_width=True):
-            handle_cooperate(target)
-        if game.alliances.get(HUMAN) == target:
-            if st.button("⚔️ 同盟を破棄", use_container_width=True):
-                handle_break_alliance(target)
-        else:
-            if st.button("❓ 何考えてるの？", use_container_width=True):
-                handle_chat_action(target, "ねえ、今何考えてるの？")
-
-    # 情報パネル群
-    with st.expander("📋 ゲームログ"):
-        logs = st.session_state.game_log
-        if logs:
-            for log in reversed(logs[-15:]):
-                st.text(log)
-        else:
-            st.caption("ログはありません")
-
-    with st.expander("📝 判明した情報"):
-        revealed = game.info_revealed.get(HUMAN, [])
-        if revealed:
-            for info in reversed(revealed[-8:]):
-                st.caption(f"• {info}")
-        else:
-            st.caption("まだ情報はありません")
-
-    with st.expander("📓 個人メモ"):
-        note = st.text_area(
-            "自由メモ",
-            value=st.session_state.player_notes.get(HUMAN, ""),
-            key="player_note_area",
-            label_visibility="collapsed",
-            height=80
+        st.session_state.selected_chat_target = target
+
+        # キャラ情報
+        p = game.personalities.get(target)
+        if p:
+            st.caption(f"**{p.character_name}** — {p.backstory}")
+
+        # 関係値メーター
+        rel_val = game.relationships.get(HUMAN, {}).get(target, 0)
+        render_relationship_meter(rel_val)
+
+        # 同盟状態
+        ally = game.alliances.get(HUMAN)
+        if ally == target:
+            st.success("🤝 同盟中")
+        elif ally:
+            st.caption(f"現在の同盟: {ally}")
+
+        st.markdown("---")
+
+        # 会話ログ
+        st.markdown("**💬 会話ログ**")
+        render_chat_history(HUMAN, target)
+        st.markdown("")
+
+        # テキスト入力 & 送信
+        user_input = st.text_input(
+            "メッセージ",
+            key=f"chat_input_{st.session_state.chat_input_key}",
+            placeholder="自由に話しかけよう...",
+            label_visibility="collapsed"
         )
-        st.session_state.player_notes[HUMAN] = note
+        # 返答待ちの間はこの相手への返答が要る操作を止める（別の相手とは話せる）
+        waiting = has_pending(get_slot().pending_replies, target)
+        if st.button("送信 →", use_container_width=True, disabled=waiting):
+            handle_chat_action(target, user_input)
+
+        # 定型文アクション
+        st.markdown("**アクション:**")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("👀 観察する", use_container_width=True, disabled=waiting):
+                handle_observe(target)
+            if st.button("🎯 ズルしてるよね", use_container_width=True, disabled=waiting):
+                handle_accuse(target)
+        with col2:
+            if st.button("🤝 同盟を組もう", use_container_width=True, disabled=waiting):
+                handle_cooperate(target)
+            if game.alliances.get(HUMAN) == target:
+                if st.button("⚔️ 同盟を破棄", use_container_width=True):
+                    handle_break_alliance(target)
+            else:
+                if st.button("❓ 何考えてるの？", use_container_width=True, disabled=waiting):
+                    handle_chat_action(target, "ねえ、今何考えてるの？", intent="thinking")
+
+
+@st.fragment
+def _render_info_panel():
+    with timed("fragment:info"):
+        game: DaifugoGame = get_slot().game
+
+        with st.expander("📋 ゲームログ"):
+            logs = get_slot().game_log
+            if logs:
+                for log in reversed(logs[-15:]):
+                    st.text(log)
+            else:
+                st.caption("ログはありません")
+
+        with st.expander("📝 判明した情報"):
+            revealed = game.info_revealed.get(HUMAN, [])
+            if revealed:
+                for info in reversed(revealed[-8:]):
+                    st.caption(f"• {info}")
+            else:
+                st.caption("まだ情報はありません")
+
+        with st.expander("📓 個人メモ"):
+            note = st.text_area(
+                "自由メモ",
+                value=st.session_state.player_notes.get(HUMAN, ""),
+                key="player_note_area",
+                label_visibility="collapsed",
+                height=80
+            )
+            st.session_state.player_notes[HUMAN] = note
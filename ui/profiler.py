@@ -0,0 +1,214 @@
+"""
+再実行プロファイラ（オプトイン）: 1回の再実行を区間ごとに計測し、LLM / エンジン / 描画 に分ける
+
+    DAIFUGO_PROFILE=1 streamlit run app.py              # 全セッションで有効
+    http://localhost:8501/?profile=1                     # このセッションだけ有効
+    DAIFUGO_PROFILE_LOG=.cache/profile.jsonl             # 1再実行1行の JSONL にも書き出す
+
+- LLM 時間は llm_metrics.track_call の観測値を、呼び出したスレッドで実行中の区間に足す
+  （進行ワーカーのスレッドでの AI の思考は再実行を止めないので数えない）
+- エンジン・描画の時間は、それぞれの区間の時間から中の LLM 時間を引いたもの
+- フラグメント単体の再実行は対象外（ui.timing の再実行時間に出る）
+"""
+
+import json
+import os
+import streamlit as st
+import threading
+import time as time_module
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from llm_metrics import add_call_observer
+
+# 区間の種類
+ENGINE = "engine"
+RENDER = "render"
+
+# サイドバーに残す直近の再実行数
+HISTORY_SIZE = 20
+
+_active = threading.local()
+_log_lock = threading.Lock()
+
+
+@dataclass
+class SectionTiming:
+    name: str
+    category: str
+    seconds: float = 0.0
+    llm_seconds: float = 0.0
+    llm_calls: int = 0
+    depth: int = 0
+
+
+class RerunProfile:
+    """1回の再実行の区間ごとの時間"""
+
+    def __init__(self, session_id: str = ""):
+        self.session_id = session_id
+        self.started_at = time_module.time()
+        self.sections: List[SectionTiming] = []
+        self.total_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.llm_calls = 0
+        self._start = time_module.perf_counter()
+        self._stack: List[SectionTiming] = []
+
+    @contextmanager
+    def section(self, name: str, category: str) -> Iterator[None]:
+        timing = SectionTiming(name, category, depth=len(self._stack))
+        self.sections.append(timing)
+        self._stack.append(timing)
+        start = time_module.perf_counter()
+        try:
+            yield
+        finally:
+            timing.seconds = time_module.perf_counter() - start
+            self._stack.pop()
+
+    def record_llm(self, seconds: float) -> None:
+        """LLM 呼び出し1回分。実行中の区間すべて（入れ子の外側も含む）に足す"""
+        self.llm_seconds += seconds
+        self.llm_calls += 1
+        for timing in self._stack:
+            timing.llm_seconds += seconds
+            timing.llm_calls += 1
+
+    def finish(self) -> None:
+        self.total_seconds = time_module.perf_counter() - self._start
+
+    def breakdown(self) -> Dict[str, float]:
+        """LLM / エンジン / 描画 / その他 の秒数（入れ子の区間は外側で数える）"""
+        top = [s for s in self.sections if s.depth == 0]
+        engine = sum(s.seconds - s.llm_seconds for s in top if s.category == ENGINE)
+        render = sum(s.seconds - s.llm_seconds for s in top if s.category == RENDER)
+        covered = sum(s.seconds for s in top)
+        # 区間の外で起きた LLM 呼び出しは「その他」から引く
+        outside_llm = self.llm_seconds - sum(s.llm_seconds for s in top)
+        return {
+            "llm": self.llm_seconds,
+            "engine": engine,
+            "render": render,
+            "other": max(0.0, self.total_seconds - covered - outside_llm),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "ts": round(self.started_at, 3),
+            "sid": self.session_id,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "breakdown_ms": {k: round(v * 1000, 2) for k, v in self.breakdown().items()},
+            "llm_calls": self.llm_calls,
+            "sections": [
+                {"name": s.name, "category": s.category, "depth": s.depth,
+                 "ms": round(s.seconds * 1000, 2), "llm_ms": round(s.llm_seconds * 1000, 2),
+                 "llm_calls": s.llm_calls}
+                for s in self.sections
+            ],
+        }
+
+
+def _on_llm_call(call_type: str, seconds: float) -> None:
+    profile = getattr(_active, "profile", None)
+    if profile is not None:
+        profile.record_llm(seconds)
+
+
+add_call_observer(_on_llm_call)
+
+
+# -----------------------------------------------------------------------
+# 再実行への組み込み
+# -----------------------------------------------------------------------
+
+def profiling_enabled() -> bool:
+    if os.getenv("DAIFUGO_PROFILE") == "1":
+        return True
+    try:
+        return st.query_params.get("profile") == "1"
+    except Exception:
+        # スクリプト実行外（ベアモードなど）
+        return False
+
+
+def current_profile() -> Optional[RerunProfile]:
+    return getattr(_active, "profile", None)
+
+
+def profile_section(name: str, category: str = RENDER):
+    """プロファイル中なら区間として計測する（無効なら何もしない）"""
+    profile = current_profile()
+    return profile.section(name, category) if profile is not None else nullcontext()
+
+
+@contextmanager
+def profile_rerun(session_id: str = "") -> Iterator[None]:
+    """
+    再実行全体を囲む。有効なときだけ計測し、終わったら履歴に積んで JSONL に書く
+    （st.rerun() で抜けた場合も記録する）
+    """
+    if not profiling_enabled():
+        yield
+        return
+    profile = RerunProfile(session_id)
+    _active.profile = profile
+    try:
+        yield
+    finally:
+        _active.profile = None
+        profile.finish()
+        history = st.session_state.setdefault("profile_history", deque(maxlen=HISTORY_SIZE))
+        history.append(profile)
+        _write_log(profile)
+
+
+def _write_log(profile: RerunProfile) -> None:
+    path = os.getenv("DAIFUGO_PROFILE_LOG")
+    if not path:
+        return
+    line = json.dumps(profile.to_dict(), ensure_ascii=False)
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"profile log error: {e}")
+
+
+# -----------------------------------------------------------------------
+# 表示
+# -----------------------------------------------------------------------
+
+def render_profile_panel():
+    """直前の再実行の内訳と、直近の再実行の平均（サイドバーは本体より先に描くので1回遅れ）"""
+    history = st.session_state.get("profile_history")
+    if not history:
+        st.caption("まだ計測がありません（次の再実行から記録します）")
+        return
+
+    last = history[-1]
+    breakdown = last.breakdown()
+    st.caption(f"直前の再実行: {last.total_seconds * 1000:.1f} ms"
+               f"（LLM 呼び出し {last.llm_calls} 回）")
+    labels = {"llm": "LLM", "engine": "エンジン", "render": "描画", "other": "その他"}
+    st.dataframe(
+        [{"内訳": labels[k], "ms": round(v * 1000, 1)} for k, v in breakdown.items()],
+        use_container_width=True, hide_index=True,
+    )
+    st.dataframe(
+        [{"区間": "　" * s.depth + s.name, "種類": s.category,
+          "ms": round(s.seconds * 1000, 1), "うち LLM (ms)": round(s.llm_seconds * 1000, 1)}
+         for s in last.sections],
+        use_container_width=True, hide_index=True,
+    )
+
+    count = len(history)
+    averages = {k: sum(p.breakdown()[k] for p in history) / count for k in labels}
+    total = sum(p.total_seconds for p in history) / count
+    st.caption(f"直近 {count} 回の平均: {total * 1000:.1f} ms / "
+               + " / ".join(f"{labels[k]} {v * 1000:.1f}" for k, v in averages.items()))
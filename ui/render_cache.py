@@ -0,0 +1,129 @@
+"""
+HTMLレンダラ: 手札 / プレイヤー情報表 / 会話ログを1コンポーネント1ブロックで描く
+
+要素を1つの st.markdown にまとめると、再実行ごとに送る差分も要素数も減る。
+HTML は表示内容から作ったキー（手札のカード列・表の行・会話の直近発言）で
+メモ化するので、変化のないコンポーネントはキャッシュを返すだけになる。
+"""
+
+import html
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from game_logic import DaifugoGame
+from models import Card
+
+# 同時に覚えておくレンダリング結果の数（コンポーネントごと）
+_CACHE_SIZE = 256
+
+# 会話ログに表示する直近の発言数
+CHAT_HISTORY_LIMIT = 12
+
+HandKey = Tuple[Tuple[str, bool], ...]              # (カード表記, 赤スートか)
+StatusKey = Tuple[Tuple[str, int, str, str], ...]   # (プレイヤー列, 枚数, 順位, 状態)
+ChatKey = Tuple[Tuple[bool, str, str], ...]         # (自分の発言か, 表示名, 本文)
+
+
+# -----------------------------------------------------------------------
+# 手札
+# -----------------------------------------------------------------------
+
+def hand_key(cards: List[Card]) -> HandKey:
+    return tuple((str(c), c.suit.value in ("♥", "♦")) for c in cards)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def hand_html(key: HandKey) -> str:
+    cells = "".join(
+        f"<span class='card-display{' card-red' if red else ''}'>{html.escape(label)}</span>"
+        for label, red in key
+    )
+    return f"<div class='hand-row'>{cells}</div>"
+
+
+# -----------------------------------------------------------------------
+# プレイヤー情報表
+# -----------------------------------------------------------------------
+
+def status_key(game: DaifugoGame) -> StatusKey:
+    current = game.get_current_player()
+    rows = []
+    for player in game.players:
+        p = game.personalities.get(player)
+        char_name = p.character_name if p else player
+        is_current = "👈 現在" if player == current else ""
+        rank_str = f"第{game.ranking.index(player) + 1}位" if player in game.ranking else ""
+        caught_str = "🚨 バレ" if player in game.caught_players else ""
+        ally = game.alliances.get(player)
+        ally_str = f"🤝 {ally}" if ally else ""
+        rows.append((f"{player}（{char_name}） {is_current}",
+                     len(game.player_hands[player]),
+                     rank_str,
+                     f"{caught_str} {ally_str}".strip()))
+    return tuple(rows)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def status_table_html(key: StatusKey) -> str:
+    header = "<tr><th>プレイヤー</th><th>手札枚数</th><th>順位</th><th>状態</th></tr>"
+    body = "".join(
+        f"<tr><td>{html.escape(name)}</td><td>{count}</td>"
+        f"<td>{html.escape(rank)}</td><td>{html.escape(state)}</td></tr>"
+        for name, count, rank, state in key
+    )
+    return f"<table class='status-table'>{header}{body}</table>"
+
+
+# -----------------------------------------------------------------------
+# 会話ログ（WhatsAppスタイル）
+# -----------------------------------------------------------------------
+
+def chat_key(game: DaifugoGame, player_a: str, player_b: str,
+             limit: int = CHAT_HISTORY_LIMIT) -> ChatKey:
+    rows = []
+    for msg in game.get_conversation(player_a, player_b)[-limit:]:
+        sender = msg["sender"]
+        if sender == player_a:
+            rows.append((True, sender, msg["message"]))
+        else:
+            p = game.personalities.get(sender)
+            rows.append((False, p.character_name if p else sender, msg["message"]))
+    return tuple(rows)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def chat_html(key: ChatKey) -> str:
+    parts = []
+    for own, name, text in key:
+        name, text = html.escape(name), html.escape(text)
+        if own:
+            parts.append(
+                f"<div class='chat-sender' style='text-align:right;'>{name}</div>"
+                f"<div style='text-align:right;'>"
+                f"<span class='chat-bubble-player'>{text}</span></div>"
+            )
+        else:
+            parts.append(
+                f"<div class='chat-sender'>{name}</div>"
+                f"<div><span class='chat-bubble-ai'>{text}</span></div>"
+            )
+    return "".join(parts)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def pending_html(labels: Tuple[str, ...]) -> str:
+    """返答待ちの吹き出し（「〜が返答中…」）"""
+    return "".join(
+        f"<div><span class='chat-bubble-ai chat-bubble-pending'>{html.escape(label)}</span></div>"
+        for label in labels
+    )
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """コンポーネントごとのキャッシュ hit / miss"""
+    return {
+        name: {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+        for name, info in (("hand", hand_html.cache_info()),
+                           ("status", status_table_html.cache_info()),
+                           ("chat", chat_html.cache_info()))
+    }
@@ -0,0 +1,71 @@
+"""
+セッションの重い状態（ゲーム・ログ・AIプレイヤー・進行ワーカー）へのアクセス
+実体は session_footprint.SessionSlot にあり、無操作が続くとディスクへ退避される。
+セッション ID は URL の ?sid= に持ち、状態は再実行ごとに game_store のストアと同期する
+（どのサーバープロセスに振り分けられても同じゲームを続けられる）。
+"""
+
+import streamlit as st
+import re
+import uuid
+
+from game_store import VersionConflict, get_store
+from session_footprint import SessionSlot, get_footprint
+
+_SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _make_ai_player():
+    from ai_player import MistralAIPlayer
+    return MistralAIPlayer()
+
+
+def _session_id() -> str:
+    """URL の ?sid= から取る。なければ作って URL に書き込む"""
+    sid = st.query_params.get("sid", "")
+    if not _SESSION_ID_PATTERN.match(sid):
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    return sid
+
+
+def get_slot() -> SessionSlot:
+    """このセッションのスロット（初回に登録する）"""
+    slot = st.session_state.get("session_slot")
+    if slot is None:
+        slot = get_footprint().register(_session_id(), ai_factory=_make_ai_player)
+        st.session_state.session_slot = slot
+    return slot
+
+
+def load_session() -> None:
+    """再実行の最初に呼ぶ: 別プロセスが進めた版があれば読み込む"""
+    get_slot().pull(get_store())
+
+
+def save_session() -> None:
+    """再実行の最後に呼ぶ: 変更があれば1回だけ書き込む"""
+    slot = get_slot()
+    try:
+        slot.push(get_store())
+    except VersionConflict:
+        # 別プロセスが先に書いた。この再実行の変更は捨てて最新版に合わせる
+        slot.pull(get_store())
+        st.toast("別の画面で進んだ状態を読み込みました")
+
+
+def reset_slot() -> None:
+    """ゲームを捨てる（ストアに保存した版も消す）"""
+    get_slot().reset(get_store())
+
+
+def render_footprint():
+    """このセッションと全セッションのメモリ使用量を表示する"""
+    footprint = get_footprint()
+    mine = get_slot().footprint()
+    totals = footprint.totals()
+    st.caption(f"このセッション: 常駐 {mine['resident_bytes'] / 1024:.1f} KB / "
+               f"圧縮 {mine['compact_bytes'] / 1024:.1f} KB")
+    st.caption(f"全 {totals['sessions']} セッション（退避中 {totals['evicted']}）: "
+               f"常駐 {totals['resident_bytes'] / 1024:.1f} KB / "
+               f"圧縮 {totals['compact_bytes'] / 1024:.1f} KB")
@@ -0,0 +1,45 @@
+"""
+再実行時間の計測: アプリ全体の再実行とフラグメント単体の再実行を分けて記録する
+"""
+
+import streamlit as st
+import time as time_module
+from contextlib import contextmanager
+from typing import Iterator
+
+from llm_metrics import MetricsRegistry
+
+# 再実行は数十ミリ秒単位なので LLM 用より細かいバケットを使う
+RERUN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+
+# ラベル: "app"（スクリプト全体）/ "fragment:<名前>"
+RERUN_METRICS = MetricsRegistry()
+
+
+@contextmanager
+def timed(label: str) -> Iterator[None]:
+    """ブロックの実行時間を記録する（st.rerun で抜けた場合も記録する）"""
+    start = time_module.perf_counter()
+    try:
+        yield
+    finally:
+        RERUN_METRICS.inc(label, "runs")
+        RERUN_METRICS.observe(label, "seconds", time_module.perf_counter() - start,
+                              RERUN_BUCKETS)
+
+
+def render_rerun_timing():
+    """ラベルごとの再実行回数と p50 / p95 を表示する"""
+    rows = []
+    for label, data in sorted(RERUN_METRICS.to_dict().items()):
+        seconds = data["histograms"]["seconds"]
+        rows.append({
+            "対象": label,
+            "回数": data["counters"].get("runs", 0),
+            "p50 (ms)": round(seconds["p50"] * 1000, 1),
+            "p95 (ms)": round(seconds["p95"] * 1000, 1),
+        })
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.caption("まだ計測がありません")
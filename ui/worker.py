@@ -0,0 +1,108 @@
+"""
+ゲーム進行ワーカーとUIの橋渡し: 起動 / ロック / 結果の取り込み / フラグメントでのポーリング
+"""
+
+import streamlit as st
+import time as time_module
+from contextlib import nullcontext
+from typing import Optional
+
+from game_logic import DaifugoGame
+from game_worker import GameWorker
+from pending_replies import any_done
+from turn_runner import TurnBatch
+from ui.session import get_slot
+
+# AI思考中に状態の変化を確認する間隔（秒）
+POLL_INTERVAL = 1.0
+
+
+def get_worker() -> Optional[GameWorker]:
+    """
+    このセッションのワーカー。退避から戻ったゲームなどでワーカーがなければ起動し直す
+    """
+    slot = get_slot()
+    game = slot.game
+    if game is None:
+        return None
+    worker = slot.worker
+    if worker is None or worker.game is not game:
+        worker = start_worker(game, slot.ai_player)
+    return worker
+
+
+def start_worker(game: DaifugoGame, ai) -> GameWorker:
+    slot = get_slot()
+    slot.stop_worker()
+    slot.worker = GameWorker(game, ai).start()
+    st.session_state.worker_seen_version = -1
+    return slot.worker
+
+
+def stop_worker():
+    get_slot().stop_worker()
+
+
+def game_lock():
+    """UI からゲームを変更するときのロック（ワーカーがなければ何もしない）"""
+    worker = get_worker()
+    return worker.mutate() if worker is not None else nullcontext()
+
+
+def sync_worker() -> Optional[TurnBatch]:
+    """
+    ワーカーが進めた分をセッション状態に取り込む（進める手番が残っていれば起こす）。
+    新しい結果がなければ None
+    """
+    worker = get_worker()
+    if worker is None:
+        return None
+    worker.kick()
+
+    seen = worker.version
+    batch = worker.drain()
+    st.session_state.worker_seen_version = seen
+    if not batch.events and not batch.warnings and not batch.action_results:
+        return None
+
+    slot = get_slot()
+    slot.game_log.extend(batch.log)
+    slot.action_results.extend(batch.action_results)
+    if batch.cheat_result:
+        st.session_state.cheat_result_display = batch.cheat_result
+    if batch.peek_target:
+        st.session_state.cheat_phase_peek_target = batch.peek_target
+        st.session_state.cheat_phase_peek_time = time_module.time()
+    for warning in batch.warnings:
+        st.warning(warning)
+    return batch
+
+
+def _poll_worker():
+    slot = get_slot()
+    if any_done(slot.pending_replies):
+        st.rerun()
+    worker = slot.worker
+    if worker is None:
+        return
+    if worker.version != st.session_state.get("worker_seen_version"):
+        st.rerun()
+    if worker.busy:
+        st.caption("🤖 AIが考えています...（チャットやログはそのまま使えます）")
+
+
+def poller_running() -> bool:
+    """直前のアプリ全体の再実行でポーリングを始めたか"""
+    return st.session_state.get("poller_running", False)
+
+
+def render_worker_poller():
+    """
+    AI思考中・返答待ちがある間だけ POLL_INTERVAL ごとにフラグメントを再実行し、
+    version が変わったか返答が届いたときだけアプリ全体を再実行する
+    """
+    slot = get_slot()
+    worker = slot.worker
+    running = bool(slot.pending_replies) or (worker is not None and worker.busy)
+    st.session_state.poller_running = running
+    st.fragment(_poll_worker, run_every=POLL_INTERVAL if running else None)()